@@ -1,5 +1,9 @@
-import aiohttp
+import asyncio
+import time
 from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import aiohttp
 
 from parametres import (
     API_BASE,
@@ -7,8 +11,14 @@ from parametres import (
     ONEV1_LEADERBOARD_URL,
     ONEV1_REFRESH_MINUTES,
     OPENFRONT_API_KEY,
+    OPENFRONT_MAX_RETRIES,
+    OPENFRONT_RETRY_BASE_SECONDS,
+    OPENFRONT_RETRY_MAX_SECONDS,
     USER_AGENT,
 )
+from exporteur_metriques import OPENFRONT_REQUESTS, OPENFRONT_REQUEST_SECONDS
+from journalisation import count_event
+from traces_openfront import build_trace_config, finish_trace, new_trace
 
 
 ONEV1_CACHE = {"items": [], "fetched_at": None}
@@ -22,35 +32,97 @@ def build_api_headers():
     return headers
 
 
+OPENFRONT_TRACE_CONFIG = build_trace_config()
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def create_openfront_session(headers=None):
+    return aiohttp.ClientSession(headers=headers, trace_configs=[OPENFRONT_TRACE_CONFIG])
+
+
+def parse_retry_after(value: str):
+    # Retry-After is either delay-seconds or an HTTP-date; anything else falls back to exponential backoff.
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def retry_delay(attempt: int, retry_after=None) -> float:
+    seconds = parse_retry_after(retry_after) if retry_after else None
+    if seconds is not None:
+        return min(seconds, OPENFRONT_RETRY_MAX_SECONDS)
+    return min(OPENFRONT_RETRY_BASE_SECONDS * (2 ** attempt), OPENFRONT_RETRY_MAX_SECONDS)
+
+
+async def get_json(session, endpoint: str, url: str, params=None):
+    # endpoint is the route template (e.g. "game") so metrics stay low-cardinality.
+    # The trace dict travels with the request so the session's trace hooks can fill in the phases.
+    trace = new_trace(endpoint)
+    start = time.monotonic()
+    body_seconds = 0.0
+    status = "error"
+    try:
+        for attempt in range(OPENFRONT_MAX_RETRIES + 1):
+            last_attempt = attempt == OPENFRONT_MAX_RETRIES
+            # A status from an earlier attempt must not label a request that ended in a connection error.
+            status = "error"
+            try:
+                async with session.get(url, params=params, timeout=25, trace_request_ctx=trace) as resp:
+                    status = str(resp.status)
+                    if resp.status in RETRYABLE_STATUSES and not last_attempt:
+                        # Only note the delay here: sleeping inside the block would hold the pooled connection.
+                        delay = retry_delay(attempt, resp.headers.get("Retry-After"))
+                    else:
+                        body_start = time.monotonic()
+                        try:
+                            if resp.status != 200:
+                                text = await resp.text()
+                                trace["error"] = f"HTTP {resp.status}"
+                                raise RuntimeError(f"HTTP {resp.status}: {text[:200]}")
+                            return await resp.json()
+                        finally:
+                            body_seconds += time.monotonic() - body_start
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                trace["error"] = f"{type(exc).__name__}: {exc}"[:200]
+                if last_attempt:
+                    raise
+                delay = retry_delay(attempt)
+            await asyncio.sleep(delay)
+    finally:
+        elapsed = time.monotonic() - start
+        OPENFRONT_REQUESTS.inc(endpoint=endpoint, status=status)
+        OPENFRONT_REQUEST_SECONDS.observe(elapsed, endpoint=endpoint)
+        finish_trace(trace, elapsed, body_seconds)
+        count_event("api_calls")
+        count_event("api_ms", round(elapsed * 1000))
+        if trace["attempts"] > 1:
+            count_event("api_retries", trace["attempts"] - 1)
+
+
 async def fetch_player_sessions(player_id: str):
     url = f"{API_BASE}/player/{player_id}/sessions"
     headers = {"User-Agent": USER_AGENT}
-    async with aiohttp.ClientSession(headers=headers) as session:
-        async with session.get(url, timeout=25) as resp:
-            if resp.status != 200:
-                text = await resp.text()
-                raise RuntimeError(f"HTTP {resp.status}: {text[:200]}")
-            return await resp.json()
+    async with create_openfront_session(headers) as session:
+        return await get_json(session, "player_sessions", url)
 
 
 async def fetch_clan_sessions(session, start_iso, end_iso):
     url = f"{API_BASE}/clan/{CLAN_TAG}/sessions"
     params = {"start": start_iso, "end": end_iso}
-    async with session.get(url, params=params, timeout=25) as resp:
-        if resp.status != 200:
-            text = await resp.text()
-            raise RuntimeError(f"HTTP {resp.status}: {text[:200]}")
-        return await resp.json()
+    return await get_json(session, "clan_sessions", url, params)
 
 
 async def fetch_game_info(session, game_id):
     url = f"{API_BASE}/game/{game_id}"
-    async with session.get(url, params={"turns": "false"}, timeout=25) as resp:
-        if resp.status != 200:
-            text = await resp.text()
-            raise RuntimeError(f"HTTP {resp.status}: {text[:200]}")
-        data = await resp.json()
-        return data.get("info", {})
+    data = await get_json(session, "game", url, {"turns": "false"})
+    return data.get("info", {})
 
 
 async def fetch_games_list(session, start_iso: str, end_iso: str, max_games: int):
@@ -66,11 +138,7 @@ async def fetch_games_list(session, start_iso: str, end_iso: str, max_games: int
             "offset": str(offset),
         }
         url = f"{API_BASE}/games"
-        async with session.get(url, params=params, timeout=25) as resp:
-            if resp.status != 200:
-                text = await resp.text()
-                raise RuntimeError(f"HTTP {resp.status}: {text[:200]}")
-            batch = await resp.json()
+        batch = await get_json(session, "games", url, params)
         if not batch:
             break
         games.extend(batch)
@@ -132,14 +200,10 @@ async def fetch_official_1v1_leaderboard(limit: int):
     headers = build_api_headers()
     items = []
     page = 1
-    async with aiohttp.ClientSession(headers=headers) as session:
+    async with create_openfront_session(headers) as session:
         while len(items) < limit:
             params = {"page": str(page)}
-            async with session.get(ONEV1_LEADERBOARD_URL, params=params, timeout=25) as resp:
-                if resp.status != 200:
-                    text = await resp.text()
-                    raise RuntimeError(f"HTTP {resp.status}: {text[:200]}")
-                payload = await resp.json()
+            payload = await get_json(session, "leaderboard_1v1", ONEV1_LEADERBOARD_URL, params)
             raw_items = payload.get("1v1") or payload.get("oneVone") or _extract_list(payload)
             if not raw_items:
                 break
@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import asyncpg
+
+from parametres import (
+    DB_ACQUIRE_TIMEOUT_SECONDS,
+    DB_COMMAND_TIMEOUT_SECONDS,
+    DB_INGEST_POOL_MAX_SIZE,
+    DB_INGEST_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_MIN_SIZE,
+    DB_STATEMENT_CACHE_SIZE,
+)
+
+
+class PoolLane:
+    def __init__(self, name: str, pool: asyncpg.Pool, max_size: int):
+        self.name = name
+        self.pool = pool
+        self.max_size = max_size
+        self.in_use = 0
+        self.waiting = 0
+        self.peak_in_use = 0
+        self.acquired = 0
+        self.saturated = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def acquire(self):
+        return _LaneConnection(self)
+
+    async def close(self):
+        await self.pool.close()
+
+    def avg_wait_ms(self) -> float:
+        return self.total_wait / self.acquired * 1000 if self.acquired else 0.0
+
+    def snapshot(self):
+        return {
+            "name": self.name,
+            "in_use": self.in_use,
+            "max_size": self.max_size,
+            "idle": self.pool.get_idle_size(),
+            "waiting": self.waiting,
+            "peak_in_use": self.peak_in_use,
+            "acquired": self.acquired,
+            "saturated": self.saturated,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": self.avg_wait_ms(),
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+class _LaneConnection:
+    def __init__(self, lane: PoolLane):
+        self.lane = lane
+        self.conn = None
+
+    async def __aenter__(self) -> asyncpg.Connection:
+        lane = self.lane
+        # Every connection is either handed out or already promised to an earlier waiter.
+        if lane.in_use + lane.waiting >= lane.max_size:
+            lane.saturated += 1
+        lane.waiting += 1
+        start = time.monotonic()
+        try:
+            self.conn = await lane.pool.acquire(timeout=DB_ACQUIRE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            lane.timeouts += 1
+            raise
+        finally:
+            lane.waiting -= 1
+        wait = time.monotonic() - start
+        lane.acquired += 1
+        lane.total_wait += wait
+        lane.max_wait = max(lane.max_wait, wait)
+        lane.in_use += 1
+        lane.peak_in_use = max(lane.peak_in_use, lane.in_use)
+        return self.conn
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.lane.in_use -= 1
+        await self.lane.pool.release(self.conn)
+
+
+async def create_pool_lane(name: str, dsn: str, min_size: int, max_size: int) -> PoolLane:
+    pool = await asyncpg.create_pool(
+        dsn,
+        min_size=min_size,
+        max_size=max_size,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        command_timeout=DB_COMMAND_TIMEOUT_SECONDS,
+    )
+    return PoolLane(name, pool, max_size)
+
+
+async def create_pool_lanes(dsn: str):
+    # Interactive commands and background ingestion get their own connections so a long
+    # backfill can never starve a slash command.
+    interactive = await create_pool_lane("interactif", dsn, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE)
+    ingest = await create_pool_lane("ingestion", dsn, DB_INGEST_POOL_MIN_SIZE, DB_INGEST_POOL_MAX_SIZE)
+    return interactive, ingest
@@ -0,0 +1,78 @@
+import argparse
+import gc
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from graphiques import build_compare_chart, render_compare_png
+from parametres import CHART_DPI, CHART_HIRES_DPI
+
+
+PLAYER_A = {
+    "name": "[GAL] Vercingetorix (Verci)",
+    "stats": {"wins": 142, "losses": 97, "games": 239, "winrate": 59.4, "last10_wins": 6, "streak": 3},
+}
+PLAYER_B = {
+    "name": "[GAL] Ambiorix (Ambi)",
+    "stats": {"wins": 88, "losses": 120, "games": 208, "winrate": 42.3, "last10_wins": 4, "streak": 0},
+}
+
+
+def measure_import(module: str) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip())
+
+
+def measure_render(label, render, runs: int):
+    render()
+    timings = []
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        render()
+        timings.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    render()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    png_size = len(render())
+    print(
+        f"{label:<28} median {statistics.median(timings) * 1000:7.1f} ms | "
+        f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1] * 1000:7.1f} ms | "
+        f"peak alloc {peak / 1024 / 1024:6.1f} Mo | png {png_size / 1024:6.1f} Ko"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des renderers du graphique /compare.")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"import matplotlib.pyplot          {measure_import('matplotlib.pyplot') * 1000:7.1f} ms")
+    print(
+        "import matplotlib.figure + agg    "
+        f"{measure_import('matplotlib.figure, matplotlib.backends.backend_agg') * 1000:7.1f} ms"
+    )
+    measure_render(
+        "pyplot (160 dpi)",
+        lambda: build_compare_chart(PLAYER_A, PLAYER_B, "GAL").getvalue(),
+        args.runs,
+    )
+    measure_render(
+        f"template ({CHART_DPI} dpi)",
+        lambda: render_compare_png(PLAYER_A, PLAYER_B, "GAL", CHART_DPI),
+        args.runs,
+    )
+    measure_render(
+        f"template hi-res ({CHART_HIRES_DPI} dpi)",
+        lambda: render_compare_png(PLAYER_A, PLAYER_B, "GAL", CHART_HIRES_DPI),
+        args.runs,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,11 @@ import json
 import time
 import asyncio
 import re
+from collections import OrderedDict
 from io import BytesIO
 from typing import Optional
 from datetime import datetime, timezone, timedelta
 
-import aiohttp
-import asyncpg
 import discord
 from discord import app_commands
 from discord.ext import commands
@@ -17,6 +16,19 @@ from parametres import *  # noqa: F403
 from utilitaires import *  # noqa: F403
 from api_openfront import *  # noqa: F403
 from embeds_discord import *  # noqa: F403
+from graphiques import *  # noqa: F403
+from superviseur import *  # noqa: F403
+from filtre_bloom import *  # noqa: F403
+from depot import *  # noqa: F403
+from planificateur import *  # noqa: F403
+from file_roles import *  # noqa: F403
+from reponse_differee import *  # noqa: F403
+from metriques import *  # noqa: F403
+from exporteur_metriques import *  # noqa: F403
+from traces_openfront import *  # noqa: F403
+from journalisation import *  # noqa: F403
+from surveillance_boucle import *  # noqa: F403
+from profileur import *  # noqa: F403
 
 BOT_START_TIME = datetime.now(timezone.utc)
 LAST_HTTP_RATELIMIT_AT = None
@@ -25,11 +37,27 @@ LAST_LB_LIVE_AT = None
 NEXT_LB_LIVE_AT = None
 LAST_LB_1V1_LIVE_AT = None
 NEXT_LB_1V1_LIVE_AT = None
+STARTUP_DONE = False
 
 intents = discord.Intents.default()
-bot = commands.Bot(command_prefix="!", intents=intents)
 
-pool = None
+
+class GauloisBot(commands.Bot):
+    async def close(self):
+        await stop_metrics_server()
+        await super().close()
+
+
+bot = GauloisBot(command_prefix="!", intents=intents, tree_cls=LoggedCommandTree)
+
+PLAYER_FFA_SUMMARY_CACHE = {}
+ONEV1_LISTING_REJECTED = OrderedDict()
+ONEV1_LISTING_STATS = {"listed": 0, "rejected": 0, "fetched": 0, "fetched_not_1v1": 0}
+MOD_LOG_CHANNELS = {}
+BACKFILL_PROGRESS = {}
+OFM_BOARD_REFRESH_TASKS = {}
+OFM_BOARD_DIRTY = set()
+OFM_BOARD_LOCKS = {}
 
 
 def is_pseudo_valid(pseudo: str) -> bool:
@@ -134,6 +162,48 @@ def is_1v1_game(info):
     return False
 
 
+def get_listing_player_count(entry) -> Optional[int]:
+    for key in ("numPlayers", "playerCount", "totalPlayers", "numberOfPlayers", "players"):
+        value = entry.get(key)
+        if isinstance(value, bool) or value is None:
+            continue
+        if isinstance(value, list):
+            return len(value)
+        if isinstance(value, (int, float)):
+            return int(value)
+        if isinstance(value, str) and value.strip().isdigit():
+            return int(value.strip())
+    return None
+
+
+def classify_1v1_listing(entry) -> Optional[bool]:
+    # Mirrors is_1v1_game on the fields the /games listing exposes. False means the game can
+    # never pass is_1v1_game; None means the listing is not conclusive and the game must be fetched.
+    count = get_listing_player_count(entry)
+    if count is not None and count != 2:
+        return False
+    config = entry.get("config") or {}
+    mode = str(entry.get("mode") or entry.get("gameMode") or config.get("gameMode") or "").lower()
+    has_teams = "playerTeams" in entry or "playerTeams" in config
+    if mode and has_teams:
+        if "1v1" in mode or "solo" in mode or "team" in mode:
+            return None
+        player_teams = entry.get("playerTeams", config.get("playerTeams"))
+        if isinstance(player_teams, int) and player_teams == 1:
+            return None
+        if isinstance(player_teams, str) and player_teams.lower() in {"solo", "solos", "1v1"}:
+            return None
+        return False
+    return None
+
+
+def remember_1v1_rejected(game_id: str):
+    ONEV1_LISTING_REJECTED[game_id] = True
+    ONEV1_LISTING_REJECTED.move_to_end(game_id)
+    while len(ONEV1_LISTING_REJECTED) > ONEV1_LISTING_CACHE_SIZE:
+        ONEV1_LISTING_REJECTED.popitem(last=False)
+
+
 def extract_gal_players(info):
     names = []
     for p in info.get("players", []):
@@ -186,457 +256,8 @@ def merge_prefix_key(base_name: str):
             return None
 
 
-async def init_db():
-    global pool
-    if not DB_URL:
-        raise ValueError("DATABASE_URL manquant (Postgres).")
-    pool = await asyncpg.create_pool(DB_URL, min_size=1, max_size=5)
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS player_stats (
-                username TEXT PRIMARY KEY,
-                display_name TEXT,
-                wins_ffa INTEGER DEFAULT 0,
-                losses_ffa INTEGER DEFAULT 0,
-                wins_team INTEGER DEFAULT 0,
-                losses_team INTEGER DEFAULT 0,
-                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        columns = await conn.fetch(
-            "SELECT column_name FROM information_schema.columns WHERE table_name='player_stats'"
-        )
-        colset = {c["column_name"] for c in columns}
-        if "display_name" not in colset:
-            await conn.execute("ALTER TABLE player_stats ADD COLUMN display_name TEXT")
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS processed_games (
-                game_id TEXT PRIMARY KEY
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS backfill_state (
-                id INTEGER PRIMARY KEY,
-                cursor TEXT NOT NULL,
-                completed BOOLEAN NOT NULL DEFAULT FALSE,
-                last_attempt TEXT,
-                last_error TEXT,
-                last_sessions INTEGER DEFAULT 0,
-                last_games_processed INTEGER DEFAULT 0
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS leaderboard_message (
-                guild_id BIGINT PRIMARY KEY,
-                channel_id BIGINT NOT NULL,
-                message_id BIGINT NOT NULL
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS leaderboard_message_ffa (
-                guild_id BIGINT PRIMARY KEY,
-                channel_id BIGINT NOT NULL,
-                message_id BIGINT NOT NULL
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS leaderboard_message_1v1 (
-                guild_id BIGINT PRIMARY KEY,
-                channel_id BIGINT NOT NULL,
-                message_id BIGINT NOT NULL
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS leaderboard_message_1v1_gal (
-                guild_id BIGINT PRIMARY KEY,
-                channel_id BIGINT NOT NULL,
-                message_id BIGINT NOT NULL
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS win_notifications (
-                game_id TEXT PRIMARY KEY,
-                notified_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS ffa_win_notifications (
-                player_id TEXT NOT NULL,
-                game_id TEXT NOT NULL,
-                notified_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (player_id, game_id)
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS win_notify_state (
-                id INTEGER PRIMARY KEY,
-                last_empty_at TEXT,
-                last_scan_at TEXT,
-                last_scan_sessions INTEGER DEFAULT 0,
-                last_scan_wins INTEGER DEFAULT 0,
-                last_scan_sent INTEGER DEFAULT 0,
-                last_scan_skipped INTEGER DEFAULT 0,
-                last_scan_missing_game_id INTEGER DEFAULT 0,
-                last_scan_fetch_errors INTEGER DEFAULT 0,
-                last_scan_error TEXT
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS ofm_board_message (
-                guild_id BIGINT PRIMARY KEY,
-                channel_id BIGINT NOT NULL,
-                message_id BIGINT NOT NULL
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS ofm_participants (
-                guild_id BIGINT NOT NULL,
-                user_id BIGINT NOT NULL,
-                status TEXT NOT NULL,
-                team_role_id BIGINT,
-                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (guild_id, user_id)
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS ofm_admin_panel_message (
-                guild_id BIGINT PRIMARY KEY,
-                channel_id BIGINT NOT NULL,
-                message_id BIGINT NOT NULL
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS ofm_team_name (
-                guild_id BIGINT PRIMARY KEY,
-                name TEXT NOT NULL
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS mod_admin_panel_message (
-                guild_id BIGINT PRIMARY KEY,
-                channel_id BIGINT NOT NULL,
-                message_id BIGINT NOT NULL
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS mod_warnings (
-                id BIGSERIAL PRIMARY KEY,
-                guild_id BIGINT NOT NULL,
-                user_id BIGINT NOT NULL,
-                moderator_id BIGINT NOT NULL,
-                reason TEXT NOT NULL,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS mod_actions (
-                id BIGSERIAL PRIMARY KEY,
-                guild_id BIGINT NOT NULL,
-                user_id BIGINT NOT NULL,
-                moderator_id BIGINT NOT NULL,
-                action_type TEXT NOT NULL,
-                reason TEXT,
-                duration_seconds INTEGER,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS mod_permissions (
-                guild_id BIGINT NOT NULL,
-                role_id BIGINT NOT NULL,
-                command TEXT NOT NULL,
-                allowed BOOLEAN NOT NULL DEFAULT TRUE,
-                PRIMARY KEY (guild_id, role_id, command)
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS mod_config (
-                guild_id BIGINT PRIMARY KEY,
-                log_channel_id BIGINT,
-                default_mute_seconds INTEGER DEFAULT 3600,
-                default_ban_seconds INTEGER DEFAULT 0
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS mod_notes (
-                id BIGSERIAL PRIMARY KEY,
-                guild_id BIGINT NOT NULL,
-                user_id BIGINT NOT NULL,
-                moderator_id BIGINT NOT NULL,
-                note TEXT NOT NULL,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        columns = await conn.fetch(
-            "SELECT column_name FROM information_schema.columns WHERE table_name='win_notify_state'"
-        )
-        colset = {c["column_name"] for c in columns}
-        if "last_scan_at" not in colset:
-            await conn.execute("ALTER TABLE win_notify_state ADD COLUMN last_scan_at TEXT")
-        if "last_scan_sessions" not in colset:
-            await conn.execute("ALTER TABLE win_notify_state ADD COLUMN last_scan_sessions INTEGER DEFAULT 0")
-        if "last_scan_wins" not in colset:
-            await conn.execute("ALTER TABLE win_notify_state ADD COLUMN last_scan_wins INTEGER DEFAULT 0")
-        if "last_scan_sent" not in colset:
-            await conn.execute("ALTER TABLE win_notify_state ADD COLUMN last_scan_sent INTEGER DEFAULT 0")
-        if "last_scan_skipped" not in colset:
-            await conn.execute("ALTER TABLE win_notify_state ADD COLUMN last_scan_skipped INTEGER DEFAULT 0")
-        if "last_scan_missing_game_id" not in colset:
-            await conn.execute("ALTER TABLE win_notify_state ADD COLUMN last_scan_missing_game_id INTEGER DEFAULT 0")
-        if "last_scan_fetch_errors" not in colset:
-            await conn.execute("ALTER TABLE win_notify_state ADD COLUMN last_scan_fetch_errors INTEGER DEFAULT 0")
-        if "last_scan_error" not in colset:
-            await conn.execute("ALTER TABLE win_notify_state ADD COLUMN last_scan_error TEXT")
-        await conn.execute(
-            """
-            INSERT INTO win_notify_state (id)
-            VALUES (1)
-            ON CONFLICT (id) DO NOTHING
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS ffa_players (
-                discord_id BIGINT PRIMARY KEY,
-                pseudo TEXT NOT NULL,
-                player_id TEXT NOT NULL
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS ffa_stats (
-                player_id TEXT PRIMARY KEY,
-                pseudo TEXT NOT NULL,
-                wins_ffa INTEGER DEFAULT 0,
-                losses_ffa INTEGER DEFAULT 0,
-                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS player_stats_1v1 (
-                username TEXT PRIMARY KEY,
-                wins INTEGER DEFAULT 0,
-                losses INTEGER DEFAULT 0,
-                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS processed_games_1v1 (
-                game_id TEXT PRIMARY KEY
-            )
-            """
-        )
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS backfill_state_1v1 (
-                id INTEGER PRIMARY KEY,
-                cursor TEXT NOT NULL,
-                completed BOOLEAN NOT NULL DEFAULT FALSE,
-                last_attempt TEXT,
-                last_error TEXT
-            )
-            """
-        )
-        await conn.execute(
-            """
-            INSERT INTO backfill_state_1v1 (id, cursor, completed)
-            VALUES (1, $1, FALSE)
-            ON CONFLICT (id) DO NOTHING
-            """,
-            ONEV1_BACKFILL_START,
-        )
-        # Migrations (Postgres)
-        columns = await conn.fetch(
-            "SELECT column_name FROM information_schema.columns WHERE table_name='backfill_state'"
-        )
-        colset = {c["column_name"] for c in columns}
-        if "last_sessions" not in colset:
-            await conn.execute("ALTER TABLE backfill_state ADD COLUMN last_sessions INTEGER DEFAULT 0")
-        if "last_games_processed" not in colset:
-            await conn.execute("ALTER TABLE backfill_state ADD COLUMN last_games_processed INTEGER DEFAULT 0")
-        await conn.execute(
-            """
-            INSERT INTO backfill_state (id, cursor, completed)
-            VALUES (1, $1, FALSE)
-            ON CONFLICT (id) DO NOTHING
-            """,
-            BACKFILL_START,
-        )
-
-
-async def get_backfill_state():
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            """
-            SELECT cursor, completed, last_attempt, last_error, last_sessions, last_games_processed
-            FROM backfill_state WHERE id = 1
-            """
-        )
-    return row[0], bool(row[1]), row[2], row[3], row[4], row[5]
-
-
-async def set_backfill_state(
-    cursor,
-    completed,
-    last_attempt=None,
-    last_error=None,
-    last_sessions=0,
-    last_games_processed=0,
-):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO backfill_state (
-                id, cursor, completed, last_attempt, last_error, last_sessions, last_games_processed
-            )
-            VALUES (1, $1, $2, $3, $4, $5, $6)
-            ON CONFLICT (id) DO UPDATE SET
-                cursor = EXCLUDED.cursor,
-                completed = EXCLUDED.completed,
-                last_attempt = EXCLUDED.last_attempt,
-                last_error = EXCLUDED.last_error,
-                last_sessions = EXCLUDED.last_sessions,
-                last_games_processed = EXCLUDED.last_games_processed
-            """,
-            cursor,
-            completed,
-            last_attempt,
-            last_error,
-            last_sessions,
-            last_games_processed,
-        )
-
-
-async def is_game_processed(game_id: str) -> bool:
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT 1 FROM processed_games WHERE game_id = $1",
-            game_id,
-        )
-    return row is not None
-
-
-async def get_backfill_state_1v1():
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            """
-            SELECT cursor, completed, last_attempt, last_error
-            FROM backfill_state_1v1 WHERE id = 1
-            """
-        )
-    return row[0], bool(row[1]), row[2], row[3]
-
-
-async def set_backfill_state_1v1(
-    cursor,
-    completed,
-    last_attempt=None,
-    last_error=None,
-):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO backfill_state_1v1 (id, cursor, completed, last_attempt, last_error)
-            VALUES (1, $1, $2, $3, $4)
-            ON CONFLICT (id) DO UPDATE SET
-                cursor = EXCLUDED.cursor,
-                completed = EXCLUDED.completed,
-                last_attempt = EXCLUDED.last_attempt,
-                last_error = EXCLUDED.last_error
-            """,
-            cursor,
-            completed,
-            last_attempt,
-            last_error,
-        )
-
-
-async def mark_game_processed(game_id: str):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            "INSERT INTO processed_games (game_id) VALUES ($1) ON CONFLICT DO NOTHING",
-            game_id,
-        )
-
-
-async def upsert_player(username_key, display_name, wins_ffa, losses_ffa, wins_team, losses_team):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO player_stats (
-                username, display_name, wins_ffa, losses_ffa, wins_team, losses_team, updated_at
-            ) VALUES ($1, $2, $3, $4, $5, $6, $7)
-            ON CONFLICT(username) DO UPDATE SET
-                display_name = EXCLUDED.display_name,
-                wins_ffa = player_stats.wins_ffa + EXCLUDED.wins_ffa,
-                losses_ffa = player_stats.losses_ffa + EXCLUDED.losses_ffa,
-                wins_team = player_stats.wins_team + EXCLUDED.wins_team,
-                losses_team = player_stats.losses_team + EXCLUDED.losses_team,
-                updated_at = EXCLUDED.updated_at
-            """,
-            username_key,
-            display_name,
-            wins_ffa,
-            losses_ffa,
-            wins_team,
-            losses_team,
-            datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
-        )
-
-
 async def load_leaderboard():
-    async with pool.acquire() as conn:
-        rows = await conn.fetch(
-            """
-            SELECT username, display_name, wins_ffa, losses_ffa, wins_team, losses_team, updated_at
-            FROM player_stats
-            """
-        )
+    rows = await load_player_stats()
     aggregated = {}
     last_updated = None
     for row in rows:
@@ -734,38 +355,6 @@ async def load_leaderboard():
     return players, last_updated
 
 
-async def get_leaderboard_message(guild_id: int):
-    async with pool.acquire() as conn:
-        return await conn.fetchrow(
-            "SELECT guild_id, channel_id, message_id FROM leaderboard_message WHERE guild_id = $1",
-            guild_id,
-        )
-
-
-async def set_leaderboard_message(guild_id: int, channel_id: int, message_id: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO leaderboard_message (guild_id, channel_id, message_id)
-            VALUES ($1, $2, $3)
-            ON CONFLICT (guild_id) DO UPDATE SET
-                channel_id = EXCLUDED.channel_id,
-                message_id = EXCLUDED.message_id
-            """,
-            guild_id,
-            channel_id,
-            message_id,
-        )
-
-
-async def clear_leaderboard_message(guild_id: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            "DELETE FROM leaderboard_message WHERE guild_id = $1",
-            guild_id,
-        )
-
-
 def get_total_pages(total_items, page_size):
     if total_items <= 0:
         return 1
@@ -787,251 +376,56 @@ async def build_leaderboard_embed(guild, page: int, page_size: int):
     return build_leaderboard_embed_from_data(guild, page, page_size, top, last_updated)
 
 
-async def upsert_ffa_player(discord_id: int, pseudo: str, player_id: str):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO ffa_players (discord_id, pseudo, player_id)
-            VALUES ($1, $2, $3)
-            ON CONFLICT (discord_id) DO UPDATE SET
-                pseudo = EXCLUDED.pseudo,
-                player_id = EXCLUDED.player_id
-            """,
-            discord_id,
-            pseudo,
-            player_id,
-        )
-
-
-async def upsert_ffa_stats(player_id: str, pseudo: str, wins: int, losses: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO ffa_stats (player_id, pseudo, wins_ffa, losses_ffa, updated_at)
-            VALUES ($1, $2, $3, $4, $5)
-            ON CONFLICT (player_id) DO UPDATE SET
-                pseudo = EXCLUDED.pseudo,
-                wins_ffa = EXCLUDED.wins_ffa,
-                losses_ffa = EXCLUDED.losses_ffa,
-                updated_at = EXCLUDED.updated_at
-            """,
-            player_id,
-            pseudo,
-            wins,
-            losses,
-            datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
-        )
-
-
-async def get_ffa_players():
-    async with pool.acquire() as conn:
-        return await conn.fetch(
-            "SELECT discord_id, pseudo, player_id FROM ffa_players"
-        )
-
-
-async def get_ffa_player(discord_id: int):
-    async with pool.acquire() as conn:
-        return await conn.fetchrow(
-            "SELECT discord_id, pseudo, player_id FROM ffa_players WHERE discord_id = $1",
-            discord_id,
-        )
-
-
-async def get_ffa_player_by_player_id(player_id: str):
-    async with pool.acquire() as conn:
-        return await conn.fetchrow(
-            "SELECT discord_id, pseudo, player_id FROM ffa_players WHERE player_id = $1",
-            player_id,
-        )
-
-
-async def delete_ffa_player(discord_id: int):
-    async with pool.acquire() as conn:
-        return await conn.fetchrow(
-            "DELETE FROM ffa_players WHERE discord_id = $1 RETURNING player_id",
-            discord_id,
-        )
-
-
-async def delete_ffa_stats_by_player_id(player_id: str):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            "DELETE FROM ffa_stats WHERE player_id = $1",
-            player_id,
-        )
-
-
-async def is_game_processed_1v1(game_id: str) -> bool:
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT 1 FROM processed_games_1v1 WHERE game_id = $1",
-            game_id,
-        )
-    return row is not None
-
-
-async def mark_game_processed_1v1(game_id: str):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            "INSERT INTO processed_games_1v1 (game_id) VALUES ($1) ON CONFLICT DO NOTHING",
-            game_id,
-        )
+def seen_games_horizon(window_hours: int, cursor: Optional[str] = None, completed: bool = True) -> datetime:
+    # An ID older than both the live window and the backfill cursor can never be fetched again.
+    horizon = datetime.now(timezone.utc) - timedelta(hours=window_hours)
+    if cursor and not completed:
+        try:
+            cursor_dt = datetime.fromisoformat(cursor.replace("Z", "+00:00"))
+        except Exception:
+            cursor_dt = datetime.now(timezone.utc) - timedelta(hours=48)
+        horizon = min(horizon, cursor_dt)
+    return horizon - timedelta(hours=SEEN_GAMES_RETENTION_MARGIN_HOURS)
 
 
-async def is_win_notified(game_id: str) -> bool:
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT 1 FROM win_notifications WHERE game_id = $1",
-            game_id,
-        )
-    return row is not None
+async def rebuild_seen_games_filter(seen_filter: SeenIdsFilter):
+    count = await seen_filter.rebuild(iter_seen_game_ids(f"list_{seen_filter.name}"))
+    log_event("seen_filter_rebuilt", filter=seen_filter.name, ids=count)
 
 
-async def mark_win_notified(game_id: str):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            "INSERT INTO win_notifications (game_id) VALUES ($1) ON CONFLICT DO NOTHING",
-            game_id,
-        )
+async def load_seen_games_filters():
+    for seen_filter in (PROCESSED_GAMES_FILTER, PROCESSED_GAMES_1V1_FILTER):
+        try:
+            await rebuild_seen_games_filter(seen_filter)
+        except Exception as exc:
+            log_exception("seen_filter_rebuild_failed", exc, filter=seen_filter.name)
 
 
-async def is_ffa_win_notified(player_id: str, game_id: str) -> bool:
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT 1 FROM ffa_win_notifications WHERE player_id = $1 AND game_id = $2",
-            player_id,
-            game_id,
-        )
-    return row is not None
-
-
-async def mark_ffa_win_notified(player_id: str, game_id: str):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO ffa_win_notifications (player_id, game_id)
-            VALUES ($1, $2)
-            ON CONFLICT DO NOTHING
-            """,
-            player_id,
-            game_id,
-        )
+async def prune_processed_games() -> int:
+    cursor, completed, *_rest = await get_backfill_state()
+    horizon = seen_games_horizon(RANGE_HOURS, cursor, completed)
+    pruned = await prune_seen_games("prune_processed_games", horizon)
+    # Bloom filters cannot forget; rebuild so pruned IDs stop costing database lookups.
+    if pruned:
+        await rebuild_seen_games_filter(PROCESSED_GAMES_FILTER)
+    return pruned
 
 
-async def get_last_empty_notify():
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT last_empty_at FROM win_notify_state WHERE id = 1"
-        )
-    return row[0] if row else None
-
-
-async def set_last_empty_notify(value: str):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO win_notify_state (id, last_empty_at)
-            VALUES (1, $1)
-            ON CONFLICT (id) DO UPDATE SET
-                last_empty_at = EXCLUDED.last_empty_at
-            """,
-            value,
-        )
+async def prune_processed_games_1v1() -> int:
+    cursor, completed, *_rest = await get_backfill_state_1v1()
+    # live_1v1_loop always rescans the last 48h.
+    horizon = seen_games_horizon(48, cursor, completed)
+    pruned = await prune_seen_games("prune_processed_games_1v1", horizon)
+    if pruned:
+        await rebuild_seen_games_filter(PROCESSED_GAMES_1V1_FILTER)
+    return pruned
 
 
-async def set_last_win_notify_stats(
-    scan_at: str,
-    sessions: int,
-    wins: int,
-    sent: int,
-    skipped: int,
-    missing_game_id: int,
-    fetch_errors: int,
-    error: Optional[str] = None,
-):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO win_notify_state (
-                id,
-                last_scan_at,
-                last_scan_sessions,
-                last_scan_wins,
-                last_scan_sent,
-                last_scan_skipped,
-                last_scan_missing_game_id,
-                last_scan_fetch_errors,
-                last_scan_error
-            )
-            VALUES (1, $1, $2, $3, $4, $5, $6, $7, $8)
-            ON CONFLICT (id) DO UPDATE SET
-                last_scan_at = EXCLUDED.last_scan_at,
-                last_scan_sessions = EXCLUDED.last_scan_sessions,
-                last_scan_wins = EXCLUDED.last_scan_wins,
-                last_scan_sent = EXCLUDED.last_scan_sent,
-                last_scan_skipped = EXCLUDED.last_scan_skipped,
-                last_scan_missing_game_id = EXCLUDED.last_scan_missing_game_id,
-                last_scan_fetch_errors = EXCLUDED.last_scan_fetch_errors,
-                last_scan_error = EXCLUDED.last_scan_error
-            """,
-            scan_at,
-            sessions,
-            wins,
-            sent,
-            skipped,
-            missing_game_id,
-            fetch_errors,
-            error,
-        )
-
-
-async def get_last_win_notify_stats():
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            """
-            SELECT
-                last_scan_at,
-                last_scan_sessions,
-                last_scan_wins,
-                last_scan_sent,
-                last_scan_skipped,
-                last_scan_missing_game_id,
-                last_scan_fetch_errors,
-                last_scan_error
-            FROM win_notify_state
-            WHERE id = 1
-            """
-        )
-    if not row:
-        return None
-    return {
-        "last_scan_at": row[0],
-        "sessions": row[1],
-        "wins": row[2],
-        "sent": row[3],
-        "skipped": row[4],
-        "missing_game_id": row[5],
-        "fetch_errors": row[6],
-        "error": row[7],
-    }
-
-async def upsert_1v1_stats(username: str, wins: int, losses: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO player_stats_1v1 (username, wins, losses, updated_at)
-            VALUES ($1, $2, $3, $4)
-            ON CONFLICT(username) DO UPDATE SET
-                wins = player_stats_1v1.wins + EXCLUDED.wins,
-                losses = player_stats_1v1.losses + EXCLUDED.losses,
-                updated_at = EXCLUDED.updated_at
-            """,
-            username,
-            wins,
-            losses,
-            datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
-        )
+async def prune_win_notifications() -> int:
+    horizon = seen_games_horizon(WIN_NOTIFY_RANGE_HOURS)
+    pruned = await prune_seen_games("prune_win_notifications", horizon)
+    pruned += await prune_seen_games("prune_ffa_win_notifications", horizon)
+    return pruned
 
 
 async def load_1v1_leaderboard():
@@ -1040,14 +434,7 @@ async def load_1v1_leaderboard():
 
 
 async def load_ffa_leaderboard():
-    async with pool.acquire() as conn:
-        rows = await conn.fetch(
-            """
-            SELECT s.pseudo, s.wins_ffa, s.losses_ffa, s.updated_at, p.discord_id
-            FROM ffa_stats s
-            LEFT JOIN ffa_players p ON p.player_id = s.player_id
-            """
-        )
+    rows = await load_ffa_stats()
     players = []
     last_updated = None
     for row in rows:
@@ -1081,6 +468,7 @@ async def refresh_ffa_stats():
     for _discord_id, pseudo, player_id in players:
         try:
             sessions = await fetch_player_sessions(player_id)
+            PLAYER_FFA_SUMMARY_CACHE[player_id] = (time.monotonic(), summarize_ffa_sessions(sessions))
             wins, losses = compute_ffa_stats_from_sessions(sessions)
             await upsert_ffa_stats(player_id, pseudo, wins, losses)
             success += 1
@@ -1090,6 +478,16 @@ async def refresh_ffa_stats():
     return {"total": len(players), "success": success, "failed": failed}
 
 
+async def get_player_ffa_summary(player_id: str):
+    cached = PLAYER_FFA_SUMMARY_CACHE.get(player_id)
+    if cached and time.monotonic() - cached[0] < COMPARE_STATS_TTL_SECONDS:
+        return cached[1]
+    sessions = await fetch_player_sessions(player_id)
+    summary = summarize_ffa_sessions(sessions)
+    PLAYER_FFA_SUMMARY_CACHE[player_id] = (time.monotonic(), summary)
+    return summary
+
+
 async def build_leaderboard_ffa_embed(guild, page: int, page_size: int):
     top, last_updated = await load_ffa_leaderboard()
     if not top:
@@ -1153,20 +551,58 @@ async def build_ofm_board_embed(guild: discord.Guild):
 
 
 async def update_ofm_board(guild: discord.Guild):
+    # Serialised per guild: two renders with no board posted yet would both send a new message.
+    async with OFM_BOARD_LOCKS.setdefault(guild.id, asyncio.Lock()):
+        await render_ofm_board(guild)
+
+
+async def render_ofm_board(guild: discord.Guild):
     channel = guild.get_channel(OFM_BOARD_CHANNEL_ID)
     if not isinstance(channel, discord.TextChannel):
         return
-    record = await get_ofm_board_message(guild.id)
+    record = await get_managed_message(guild.id, MESSAGE_OFM_BOARD)
     embed = await build_ofm_board_embed(guild)
+    content_hash = embed_content_hash(embed)
     if record:
+        if record["content_hash"] == content_hash and record["channel_id"] == channel.id:
+            return
         try:
             message = await channel.fetch_message(record["message_id"])
             await message.edit(embed=embed)
+            DISCORD_MESSAGES.inc(action="edit", source="ofm_board")
+            await set_managed_message_hash(guild.id, MESSAGE_OFM_BOARD, content_hash)
             return
         except Exception:
-            await clear_ofm_board_message(guild.id)
+            await clear_managed_message(guild.id, MESSAGE_OFM_BOARD)
     message = await channel.send(embed=embed)
-    await set_ofm_board_message(guild.id, channel.id, message.id)
+    DISCORD_MESSAGES.inc(action="send", source="ofm_board")
+    await set_managed_message(guild.id, MESSAGE_OFM_BOARD, channel.id, message.id, content_hash)
+
+
+def request_ofm_board_refresh(guild: discord.Guild):
+    # Roster changes only mark the board dirty; one render per guild happens at the end of the window.
+    task = OFM_BOARD_REFRESH_TASKS.get(guild.id)
+    if task and not task.done():
+        OFM_BOARD_DIRTY.add(guild.id)
+        return
+    OFM_BOARD_REFRESH_TASKS[guild.id] = bot.loop.create_task(refresh_ofm_board_later(guild))
+
+
+async def refresh_ofm_board_later(guild: discord.Guild):
+    # The task stays registered until its last render ends, so a change during a slow render marks the
+    # board dirty for a follow-up pass instead of starting a concurrent render.
+    try:
+        while True:
+            await asyncio.sleep(OFM_BOARD_DEBOUNCE_SECONDS)
+            OFM_BOARD_DIRTY.discard(guild.id)
+            try:
+                await update_ofm_board(guild)
+            except Exception as exc:
+                log_exception("ofm_board_refresh_failed", exc, guild_id=guild.id)
+            if guild.id not in OFM_BOARD_DIRTY:
+                return
+    finally:
+        OFM_BOARD_REFRESH_TASKS.pop(guild.id, None)
 
 
 async def build_ofm_admin_panel_embed(guild: discord.Guild):
@@ -1208,17 +644,19 @@ async def update_ofm_admin_panel(guild: discord.Guild):
     channel = guild.get_channel(OFM_ADMIN_CHANNEL_ID)
     if not isinstance(channel, discord.TextChannel):
         return
-    record = await get_ofm_admin_panel_message(guild.id)
+    record = await get_managed_message(guild.id, MESSAGE_OFM_ADMIN_PANEL)
     embed = await build_ofm_admin_panel_embed(guild)
     if record:
         try:
             message = await channel.fetch_message(record["message_id"])
             await message.edit(embed=embed, view=OFMConfigView())
+            DISCORD_MESSAGES.inc(action="edit", source="ofm_admin_panel")
             return
         except Exception:
-            await clear_ofm_admin_panel_message(guild.id)
+            await clear_managed_message(guild.id, MESSAGE_OFM_ADMIN_PANEL)
     message = await channel.send(embed=embed, view=OFMConfigView())
-    await set_ofm_admin_panel_message(guild.id, channel.id, message.id)
+    DISCORD_MESSAGES.inc(action="send", source="ofm_admin_panel")
+    await set_managed_message(guild.id, MESSAGE_OFM_ADMIN_PANEL, channel.id, message.id)
 
 
 def build_mod_admin_panel_embed(
@@ -1266,34 +704,53 @@ async def update_mod_admin_panel(
     channel = guild.get_channel(ADMIN_PANEL_CHANNEL_ID)
     if not isinstance(channel, discord.TextChannel):
         return
-    record = await get_mod_admin_panel_message(guild.id)
+    record = await get_managed_message(guild.id, MESSAGE_MOD_ADMIN_PANEL)
     selected_role = guild.get_role(selected_role_id) if selected_role_id else None
     allowed_commands = None
     if selected_role:
         if selected_role.id in {FOUNDER_USER_ID, ADMIN_USER_ID}:
             allowed_commands = list(MOD_COMMANDS)
         else:
-            perms = await get_permissions_for_role(guild.id, selected_role.id)
-            allowed_commands = [p["command"] for p in perms if p["allowed"]]
+            allowed = await get_allowed_commands_for_role(guild.id, selected_role.id)
+            allowed_commands = [command for command in MOD_COMMANDS if command in allowed]
     embed = build_mod_admin_panel_embed(guild, selected_role, allowed_commands, mode)
     view = ModAdminPanelView(guild_id=guild.id, selected_role_id=selected_role_id, mode=mode)
     if record:
         try:
             message = await channel.fetch_message(record["message_id"])
             await message.edit(embed=embed, view=view)
+            DISCORD_MESSAGES.inc(action="edit", source="mod_admin_panel")
             return
         except Exception:
-            await clear_mod_admin_panel_message(guild.id)
+            await clear_managed_message(guild.id, MESSAGE_MOD_ADMIN_PANEL)
     message = await channel.send(embed=embed, view=view)
-    await set_mod_admin_panel_message(guild.id, channel.id, message.id)
+    DISCORD_MESSAGES.inc(action="send", source="mod_admin_panel")
+    await set_managed_message(guild.id, MESSAGE_MOD_ADMIN_PANEL, channel.id, message.id)
 
 
-async def send_mod_log(guild: discord.Guild, embed: discord.Embed):
+async def get_mod_log_channel(guild: discord.Guild) -> Optional[discord.TextChannel]:
     config = await get_mod_config(guild.id)
     channel_id = config["log_channel_id"] if config and config["log_channel_id"] else MOD_LOG_CHANNEL_ID
+    channel = MOD_LOG_CHANNELS.get(guild.id)
+    if channel is not None and channel.id == channel_id:
+        return channel
     channel = guild.get_channel(channel_id)
-    if isinstance(channel, discord.TextChannel):
+    if not isinstance(channel, discord.TextChannel):
+        MOD_LOG_CHANNELS.pop(guild.id, None)
+        return None
+    MOD_LOG_CHANNELS[guild.id] = channel
+    return channel
+
+
+async def send_mod_log(guild: discord.Guild, embed: discord.Embed):
+    channel = await get_mod_log_channel(guild)
+    if channel is None:
+        return
+    try:
         await channel.send(embed=embed)
+        DISCORD_MESSAGES.inc(action="send", source="mod_log")
+    except discord.NotFound:
+        MOD_LOG_CHANNELS.pop(guild.id, None)
 
 
 def build_mod_log_embed(
@@ -1318,97 +775,6 @@ def build_mod_log_embed(
     return embed
 
 
-def build_compare_chart(player_a: dict, player_b: dict, clan_tag: str) -> BytesIO:
-    import matplotlib
-    matplotlib.use("Agg")
-    import matplotlib.pyplot as plt
-
-    bg = "#0B0F1A"
-    grid = "#1E2638"
-    color_a = "#19E6FF"
-    color_b = "#FF2ED1"
-
-    stats_a = player_a["stats"]
-    stats_b = player_b["stats"]
-
-    fig = plt.figure(figsize=(12, 7), facecolor=bg)
-    fig.subplots_adjust(left=0.06, right=0.97, top=0.9, bottom=0.08)
-
-    ax_bar = fig.add_subplot(1, 2, 1)
-    ax_radar = fig.add_subplot(1, 2, 2, polar=True)
-
-    fig.text(0.02, 0.94, f"[{clan_tag}]", color=color_a, fontsize=14, fontweight="bold")
-    fig.text(0.5, 0.94, "DUEL COMPARATIF", ha="center", color="white", fontsize=16, fontweight="bold")
-    fig.text(
-        0.5,
-        0.90,
-        f"{player_a['name']}  vs  {player_b['name']}",
-        ha="center",
-        color="#B5C3D6",
-        fontsize=11,
-    )
-
-    metrics = ["Wins", "Losses", "Games", "Winrate%", "Streak"]
-    values_a = [stats_a["wins"], stats_a["losses"], stats_a["games"], stats_a["winrate"], stats_a["streak"]]
-    values_b = [stats_b["wins"], stats_b["losses"], stats_b["games"], stats_b["winrate"], stats_b["streak"]]
-
-    y = range(len(metrics))
-    ax_bar.barh([i + 0.15 for i in y], values_a, height=0.28, color=color_a, alpha=0.85, label=player_a["name"])
-    ax_bar.barh([i - 0.15 for i in y], values_b, height=0.28, color=color_b, alpha=0.85, label=player_b["name"])
-    ax_bar.set_yticks(list(y))
-    ax_bar.set_yticklabels(metrics, color="white")
-    ax_bar.tick_params(axis="x", colors="#9FB3C8")
-    ax_bar.set_facecolor(bg)
-    ax_bar.grid(axis="x", color=grid, alpha=0.4)
-    ax_bar.spines["top"].set_visible(False)
-    ax_bar.spines["right"].set_visible(False)
-    ax_bar.spines["left"].set_color(grid)
-    ax_bar.spines["bottom"].set_color(grid)
-    ax_bar.legend(loc="lower right", frameon=False, fontsize=9, labelcolor="white")
-
-    radar_labels = ["Wins", "Winrate", "Games", "Streak", "Losses"]
-    loss_max = max(stats_a["losses"], stats_b["losses"], 1)
-    radar_a = [
-        stats_a["wins"],
-        stats_a["winrate"],
-        stats_a["games"],
-        stats_a["streak"],
-        loss_max - stats_a["losses"],
-    ]
-    radar_b = [
-        stats_b["wins"],
-        stats_b["winrate"],
-        stats_b["games"],
-        stats_b["streak"],
-        loss_max - stats_b["losses"],
-    ]
-    max_vals = [max(radar_a[i], radar_b[i], 1) for i in range(len(radar_labels))]
-    norm_a = [radar_a[i] / max_vals[i] for i in range(len(radar_labels))]
-    norm_b = [radar_b[i] / max_vals[i] for i in range(len(radar_labels))]
-    angles = [n / float(len(radar_labels)) * 2 * 3.14159 for n in range(len(radar_labels))]
-    angles += angles[:1]
-    norm_a += norm_a[:1]
-    norm_b += norm_b[:1]
-
-    ax_radar.set_facecolor(bg)
-    ax_radar.set_theta_offset(3.14159 / 2)
-    ax_radar.set_theta_direction(-1)
-    ax_radar.set_xticks(angles[:-1])
-    ax_radar.set_xticklabels(radar_labels, color="white", fontsize=9)
-    ax_radar.set_yticklabels([])
-    ax_radar.grid(color=grid, alpha=0.4)
-    ax_radar.plot(angles, norm_a, color=color_a, linewidth=2)
-    ax_radar.fill(angles, norm_a, color=color_a, alpha=0.25)
-    ax_radar.plot(angles, norm_b, color=color_b, linewidth=2)
-    ax_radar.fill(angles, norm_b, color=color_b, alpha=0.25)
-
-    buffer = BytesIO()
-    fig.savefig(buffer, format="png", dpi=160, facecolor=bg)
-    plt.close(fig)
-    buffer.seek(0)
-    return buffer
-
-
 async def ensure_mod_permission(interaction: discord.Interaction, command: str) -> bool:
     if not interaction.guild:
         await interaction.response.send_message("Commande disponible uniquement sur un serveur.", ephemeral=True)
@@ -1420,463 +786,23 @@ async def ensure_mod_permission(interaction: discord.Interaction, command: str)
     return True
 
 
-async def schedule_unban(guild: discord.Guild, user_id: int, delay_seconds: int):
-    await asyncio.sleep(delay_seconds)
-    try:
-        await guild.unban(discord.Object(id=user_id), reason="Fin de ban temporaire")
-    except Exception:
+async def schedule_unban(guild: discord.Guild, user_id: int, delay_seconds: Optional[int]):
+    # A permanent ban replaces any pending temporary one.
+    if not delay_seconds:
+        await ACTION_SCHEDULER.cancel(guild.id, user_id, ACTION_UNBAN)
         return
+    await ACTION_SCHEDULER.schedule(guild.id, user_id, ACTION_UNBAN, delay_seconds)
 
 
-async def get_leaderboard_message_ffa(guild_id: int):
-    async with pool.acquire() as conn:
-        return await conn.fetchrow(
-            "SELECT guild_id, channel_id, message_id FROM leaderboard_message_ffa WHERE guild_id = $1",
-            guild_id,
-        )
-
-
-async def set_leaderboard_message_ffa(guild_id: int, channel_id: int, message_id: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO leaderboard_message_ffa (guild_id, channel_id, message_id)
-            VALUES ($1, $2, $3)
-            ON CONFLICT (guild_id) DO UPDATE SET
-                channel_id = EXCLUDED.channel_id,
-                message_id = EXCLUDED.message_id
-            """,
-            guild_id,
-            channel_id,
-            message_id,
-        )
-
-
-async def clear_leaderboard_message_ffa(guild_id: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            "DELETE FROM leaderboard_message_ffa WHERE guild_id = $1",
-            guild_id,
-        )
-
-
-async def get_leaderboard_message_1v1(guild_id: int):
-    async with pool.acquire() as conn:
-        return await conn.fetchrow(
-            "SELECT guild_id, channel_id, message_id FROM leaderboard_message_1v1 WHERE guild_id = $1",
-            guild_id,
-        )
-
-
-async def set_leaderboard_message_1v1(guild_id: int, channel_id: int, message_id: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO leaderboard_message_1v1 (guild_id, channel_id, message_id)
-            VALUES ($1, $2, $3)
-            ON CONFLICT (guild_id) DO UPDATE SET
-                channel_id = EXCLUDED.channel_id,
-                message_id = EXCLUDED.message_id
-            """,
-            guild_id,
-            channel_id,
-            message_id,
-        )
-
-
-async def clear_leaderboard_message_1v1(guild_id: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            "DELETE FROM leaderboard_message_1v1 WHERE guild_id = $1",
-            guild_id,
-        )
-
-
-async def get_leaderboard_message_1v1_gal(guild_id: int):
-    async with pool.acquire() as conn:
-        return await conn.fetchrow(
-            "SELECT guild_id, channel_id, message_id FROM leaderboard_message_1v1_gal WHERE guild_id = $1",
-            guild_id,
-        )
-
-
-async def set_leaderboard_message_1v1_gal(guild_id: int, channel_id: int, message_id: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO leaderboard_message_1v1_gal (guild_id, channel_id, message_id)
-            VALUES ($1, $2, $3)
-            ON CONFLICT (guild_id) DO UPDATE SET
-                channel_id = EXCLUDED.channel_id,
-                message_id = EXCLUDED.message_id
-            """,
-            guild_id,
-            channel_id,
-            message_id,
-        )
-
-
-async def clear_leaderboard_message_1v1_gal(guild_id: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            "DELETE FROM leaderboard_message_1v1_gal WHERE guild_id = $1",
-            guild_id,
-        )
-
-
-async def get_ofm_board_message(guild_id: int):
-    async with pool.acquire() as conn:
-        return await conn.fetchrow(
-            "SELECT guild_id, channel_id, message_id FROM ofm_board_message WHERE guild_id = $1",
-            guild_id,
-        )
-
-
-async def set_ofm_board_message(guild_id: int, channel_id: int, message_id: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO ofm_board_message (guild_id, channel_id, message_id)
-            VALUES ($1, $2, $3)
-            ON CONFLICT (guild_id) DO UPDATE SET
-                channel_id = EXCLUDED.channel_id,
-                message_id = EXCLUDED.message_id
-            """,
-            guild_id,
-            channel_id,
-            message_id,
-        )
-
-
-async def clear_ofm_board_message(guild_id: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            "DELETE FROM ofm_board_message WHERE guild_id = $1",
-            guild_id,
-        )
-
-
-async def upsert_ofm_participant(
-    guild_id: int,
-    user_id: int,
-    status: str,
-    team_role_id: Optional[int] = None,
-):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO ofm_participants (guild_id, user_id, status, team_role_id, updated_at)
-            VALUES ($1, $2, $3, $4, CURRENT_TIMESTAMP)
-            ON CONFLICT (guild_id, user_id) DO UPDATE SET
-                status = EXCLUDED.status,
-                team_role_id = EXCLUDED.team_role_id,
-                updated_at = CURRENT_TIMESTAMP
-            """,
-            guild_id,
-            user_id,
-            status,
-            team_role_id,
-        )
-
-
-async def get_ofm_participants(guild_id: int, status: Optional[str] = None):
-    async with pool.acquire() as conn:
-        if status:
-            return await conn.fetch(
-                "SELECT user_id, status, team_role_id FROM ofm_participants WHERE guild_id = $1 AND status = $2",
-                guild_id,
-                status,
-            )
-        return await conn.fetch(
-            "SELECT user_id, status, team_role_id FROM ofm_participants WHERE guild_id = $1",
-            guild_id,
-        )
-
-
-async def get_ofm_participant(guild_id: int, user_id: int):
-    async with pool.acquire() as conn:
-        return await conn.fetchrow(
-            "SELECT user_id, status, team_role_id FROM ofm_participants WHERE guild_id = $1 AND user_id = $2",
-            guild_id,
-            user_id,
-        )
-
-
-async def get_ofm_admin_panel_message(guild_id: int):
-    async with pool.acquire() as conn:
-        return await conn.fetchrow(
-            "SELECT guild_id, channel_id, message_id FROM ofm_admin_panel_message WHERE guild_id = $1",
-            guild_id,
-        )
-
-
-async def set_ofm_admin_panel_message(guild_id: int, channel_id: int, message_id: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO ofm_admin_panel_message (guild_id, channel_id, message_id)
-            VALUES ($1, $2, $3)
-            ON CONFLICT (guild_id) DO UPDATE SET
-                channel_id = EXCLUDED.channel_id,
-                message_id = EXCLUDED.message_id
-            """,
-            guild_id,
-            channel_id,
-            message_id,
-        )
-
-
-async def clear_ofm_admin_panel_message(guild_id: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            "DELETE FROM ofm_admin_panel_message WHERE guild_id = $1",
-            guild_id,
-        )
-
-
-async def get_ofm_team_name(guild_id: int) -> Optional[str]:
-    async with pool.acquire() as conn:
-        record = await conn.fetchrow(
-            "SELECT name FROM ofm_team_name WHERE guild_id = $1",
-            guild_id,
-        )
-        return record["name"] if record else None
-
-
-async def set_ofm_team_name(guild_id: int, name: str):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO ofm_team_name (guild_id, name)
-            VALUES ($1, $2)
-            ON CONFLICT (guild_id) DO UPDATE SET
-                name = EXCLUDED.name
-            """,
-            guild_id,
-            name,
-        )
-
-
-async def get_mod_admin_panel_message(guild_id: int):
-    async with pool.acquire() as conn:
-        return await conn.fetchrow(
-            "SELECT guild_id, channel_id, message_id FROM mod_admin_panel_message WHERE guild_id = $1",
-            guild_id,
-        )
-
-
-async def set_mod_admin_panel_message(guild_id: int, channel_id: int, message_id: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO mod_admin_panel_message (guild_id, channel_id, message_id)
-            VALUES ($1, $2, $3)
-            ON CONFLICT (guild_id) DO UPDATE SET
-                channel_id = EXCLUDED.channel_id,
-                message_id = EXCLUDED.message_id
-            """,
-            guild_id,
-            channel_id,
-            message_id,
-        )
-
-
-async def clear_mod_admin_panel_message(guild_id: int):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            "DELETE FROM mod_admin_panel_message WHERE guild_id = $1",
-            guild_id,
-        )
-
-
-async def add_warning(guild_id: int, user_id: int, moderator_id: int, reason: str):
-    async with pool.acquire() as conn:
-        return await conn.fetchrow(
-            """
-            INSERT INTO mod_warnings (guild_id, user_id, moderator_id, reason)
-            VALUES ($1, $2, $3, $4)
-            RETURNING id, created_at
-            """,
-            guild_id,
-            user_id,
-            moderator_id,
-            reason,
-        )
-
-
-async def list_warnings(guild_id: int, user_id: int):
-    async with pool.acquire() as conn:
-        return await conn.fetch(
-            """
-            SELECT id, moderator_id, reason, created_at
-            FROM mod_warnings
-            WHERE guild_id = $1 AND user_id = $2
-            ORDER BY id DESC
-            """,
-            guild_id,
-            user_id,
-        )
-
-
-async def delete_warning(guild_id: int, user_id: int, warn_id: int):
-    async with pool.acquire() as conn:
-        return await conn.execute(
-            "DELETE FROM mod_warnings WHERE guild_id = $1 AND user_id = $2 AND id = $3",
-            guild_id,
-            user_id,
-            warn_id,
-        )
-
-
-async def clear_all_warnings(guild_id: int, user_id: int):
-    async with pool.acquire() as conn:
-        return await conn.execute(
-            "DELETE FROM mod_warnings WHERE guild_id = $1 AND user_id = $2",
-            guild_id,
-            user_id,
-        )
-
-
-async def add_mod_action(
-    guild_id: int,
-    user_id: int,
-    moderator_id: int,
-    action_type: str,
-    reason: Optional[str] = None,
-    duration_seconds: Optional[int] = None,
-):
-    async with pool.acquire() as conn:
-        return await conn.execute(
-            """
-            INSERT INTO mod_actions (guild_id, user_id, moderator_id, action_type, reason, duration_seconds)
-            VALUES ($1, $2, $3, $4, $5, $6)
-            """,
-            guild_id,
-            user_id,
-            moderator_id,
-            action_type,
-            reason,
-            duration_seconds,
-        )
-
-
-async def list_mod_actions(guild_id: int, user_id: int):
-    async with pool.acquire() as conn:
-        return await conn.fetch(
-            """
-            SELECT action_type, reason, duration_seconds, created_at, moderator_id
-            FROM mod_actions
-            WHERE guild_id = $1 AND user_id = $2
-            ORDER BY id DESC
-            """,
-            guild_id,
-            user_id,
-        )
-
-
-async def set_mod_permission(guild_id: int, role_id: int, command: str, allowed: bool):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO mod_permissions (guild_id, role_id, command, allowed)
-            VALUES ($1, $2, $3, $4)
-            ON CONFLICT (guild_id, role_id, command) DO UPDATE SET
-                allowed = EXCLUDED.allowed
-            """,
-            guild_id,
-            role_id,
-            command,
-            allowed,
-        )
-
-
-async def get_permissions_for_role(guild_id: int, role_id: int):
-    async with pool.acquire() as conn:
-        return await conn.fetch(
-            """
-            SELECT command, allowed
-            FROM mod_permissions
-            WHERE guild_id = $1 AND role_id = $2
-            """,
-            guild_id,
-            role_id,
-        )
-
-
-async def get_allowed_roles_for_command(guild_id: int, command: str):
-    async with pool.acquire() as conn:
-        return await conn.fetch(
-            """
-            SELECT role_id
-            FROM mod_permissions
-            WHERE guild_id = $1 AND command = $2 AND allowed = TRUE
-            """,
-            guild_id,
-            command,
-        )
-
-
-async def get_mod_config(guild_id: int):
-    async with pool.acquire() as conn:
-        return await conn.fetchrow(
-            """
-            SELECT log_channel_id, default_mute_seconds, default_ban_seconds
-            FROM mod_config
-            WHERE guild_id = $1
-            """,
-            guild_id,
-        )
-
-
-async def set_mod_config(
-    guild_id: int,
-    log_channel_id: Optional[int] = None,
-    default_mute_seconds: Optional[int] = None,
-    default_ban_seconds: Optional[int] = None,
-):
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO mod_config (guild_id, log_channel_id, default_mute_seconds, default_ban_seconds)
-            VALUES ($1, $2, $3, $4)
-            ON CONFLICT (guild_id) DO UPDATE SET
-                log_channel_id = COALESCE(EXCLUDED.log_channel_id, mod_config.log_channel_id),
-                default_mute_seconds = COALESCE(EXCLUDED.default_mute_seconds, mod_config.default_mute_seconds),
-                default_ban_seconds = COALESCE(EXCLUDED.default_ban_seconds, mod_config.default_ban_seconds)
-            """,
-            guild_id,
-            log_channel_id,
-            default_mute_seconds,
-            default_ban_seconds,
-        )
-
-
-async def add_mod_note(guild_id: int, user_id: int, moderator_id: int, note: str):
-    async with pool.acquire() as conn:
-        return await conn.execute(
-            """
-            INSERT INTO mod_notes (guild_id, user_id, moderator_id, note)
-            VALUES ($1, $2, $3, $4)
-            """,
-            guild_id,
-            user_id,
-            moderator_id,
-            note,
-        )
-
-
-async def list_mod_notes(guild_id: int, user_id: int):
-    async with pool.acquire() as conn:
-        return await conn.fetch(
-            """
-            SELECT note, moderator_id, created_at
-            FROM mod_notes
-            WHERE guild_id = $1 AND user_id = $2
-            ORDER BY id DESC
-            """,
-            guild_id,
-            user_id,
-        )
+async def run_scheduled_unban(guild_id: int, user_id: int):
+    guild = bot.get_guild(guild_id)
+    if guild is None or guild.unavailable:
+        # Raising hands the unban back to the scheduler's retry/backoff instead of marking it done.
+        raise RuntimeError(f"Guild {guild_id} unavailable")
+    try:
+        await guild.unban(discord.Object(id=user_id), reason="Fin de ban temporaire")
+    except discord.NotFound:
+        return
 
 
 async def has_mod_permission(guild: discord.Guild, member: discord.Member, command: str) -> bool:
@@ -1885,8 +811,7 @@ async def has_mod_permission(guild: discord.Guild, member: discord.Member, comma
     allowed_roles = await get_allowed_roles_for_command(guild.id, command)
     if not allowed_roles:
         return False
-    allowed_set = {r["role_id"] for r in allowed_roles}
-    return any(role.id in allowed_set for role in member.roles)
+    return not allowed_roles.isdisjoint(role.id for role in member.roles)
 
 
 def can_moderate_member(actor: discord.Member, target: discord.Member, bot_member: discord.Member) -> Optional[str]:
@@ -1902,7 +827,7 @@ def can_moderate_member(actor: discord.Member, target: discord.Member, bot_membe
     return None
 
 
-class LeaderboardView(discord.ui.View):
+class LeaderboardView(InstrumentedView):
     def __init__(self, page: int, page_size: int):
         super().__init__(timeout=None)
         self.page = page
@@ -1911,26 +836,31 @@ class LeaderboardView(discord.ui.View):
     async def update(self, interaction: discord.Interaction, page: int):
         embed = await build_leaderboard_embed(interaction.guild, page, self.page_size)
         if not embed:
-            await interaction.response.send_message(
+            await send_reply(
+                interaction,
                 f"No data for {CLAN_DISPLAY}. Wait for refresh.",
                 ephemeral=True,
             )
-        return
+            return
         self.page = page
-        await interaction.response.edit_message(embed=embed, view=self)
+        # The refresh loop only re-renders page 1 when its hash changes, so forget it once paged.
+        await set_managed_message_hash(interaction.guild.id, MESSAGE_LEADERBOARD, None)
+        await edit_reply(interaction, embed=embed, view=self)
 
     @discord.ui.button(label="?", style=discord.ButtonStyle.secondary, custom_id="lb_prev")
+    @deferrable()
     async def prev(self, interaction: discord.Interaction, _button: discord.ui.Button):
         await self.update(interaction, max(1, self.page - 1))
 
     @discord.ui.button(label="?", style=discord.ButtonStyle.secondary, custom_id="lb_next")
+    @deferrable()
     async def next(self, interaction: discord.Interaction, _button: discord.ui.Button):
         top, _ = await get_top_players()
         total_pages = get_total_pages(len(top), self.page_size)
         await self.update(interaction, min(total_pages, self.page + 1))
 
 
-class LeaderboardFfaView(discord.ui.View):
+class LeaderboardFfaView(InstrumentedView):
     def __init__(self, page: int, page_size: int):
         super().__init__(timeout=None)
         self.page = page
@@ -1939,26 +869,31 @@ class LeaderboardFfaView(discord.ui.View):
     async def update(self, interaction: discord.Interaction, page: int):
         embed = await build_leaderboard_ffa_embed(interaction.guild, page, self.page_size)
         if not embed:
-            await interaction.response.send_message(
+            await send_reply(
+                interaction,
                 f"No data for FFA {CLAN_DISPLAY}.",
                 ephemeral=True,
             )
-        return
+            return
         self.page = page
-        await interaction.response.edit_message(embed=embed, view=self)
+        # The refresh loop only re-renders page 1 when its hash changes, so forget it once paged.
+        await set_managed_message_hash(interaction.guild.id, MESSAGE_LEADERBOARD_FFA, None)
+        await edit_reply(interaction, embed=embed, view=self)
 
     @discord.ui.button(label="?", style=discord.ButtonStyle.secondary, custom_id="ffa_prev")
+    @deferrable()
     async def prev(self, interaction: discord.Interaction, _button: discord.ui.Button):
         await self.update(interaction, max(1, self.page - 1))
 
     @discord.ui.button(label="?", style=discord.ButtonStyle.secondary, custom_id="ffa_next")
+    @deferrable()
     async def next(self, interaction: discord.Interaction, _button: discord.ui.Button):
         top, _ = await load_ffa_leaderboard()
         total_pages = get_total_pages(len(top), self.page_size)
         await self.update(interaction, min(total_pages, self.page + 1))
 
 
-class Leaderboard1v1View(discord.ui.View):
+class Leaderboard1v1View(InstrumentedView):
     def __init__(self, page: int, page_size: int):
         super().__init__(timeout=None)
         self.page = page
@@ -1967,33 +902,63 @@ class Leaderboard1v1View(discord.ui.View):
     async def update(self, interaction: discord.Interaction, page: int):
         embed = await build_leaderboard_1v1_embed(interaction.guild, page, self.page_size)
         if not embed:
-            await interaction.response.send_message(
+            await send_reply(
+                interaction,
                 "No data for 1v1.",
                 ephemeral=True,
             )
             return
         self.page = page
-        await interaction.response.edit_message(embed=embed, view=self)
+        # The refresh loop only re-renders page 1 when its hash changes, so forget it once paged.
+        await set_managed_message_hash(interaction.guild.id, MESSAGE_LEADERBOARD_1V1, None)
+        await edit_reply(interaction, embed=embed, view=self)
 
     @discord.ui.button(label="?", style=discord.ButtonStyle.secondary, custom_id="1v1_prev")
+    @deferrable()
     async def prev(self, interaction: discord.Interaction, _button: discord.ui.Button):
         await self.update(interaction, max(1, self.page - 1))
 
     @discord.ui.button(label="?", style=discord.ButtonStyle.secondary, custom_id="1v1_next")
+    @deferrable()
     async def next(self, interaction: discord.Interaction, _button: discord.ui.Button):
         top, _ = await load_1v1_leaderboard()
         total_pages = get_total_pages(len(top), self.page_size)
         await self.update(interaction, min(total_pages, self.page + 1))
 
 
-class OFMConfirmView(discord.ui.View):
+OFM_CANDIDATURE_TOPIC_PREFIX = "OFM candidature: "
+
+
+def parse_ofm_candidature_topic(topic: Optional[str]) -> Optional[int]:
+    if not topic or not topic.startswith(OFM_CANDIDATURE_TOPIC_PREFIX):
+        return None
+    raw = topic[len(OFM_CANDIDATURE_TOPIC_PREFIX) :].strip()
+    if not raw.isdigit():
+        return None
+    return int(raw)
+
+
+async def reconcile_ofm_channels(guild: discord.Guild):
+    # Channels created or deleted while the bot was offline are picked up once at startup.
+    channels = {}
+    for channel in guild.text_channels:
+        user_id = parse_ofm_candidature_topic(channel.topic)
+        if user_id is not None:
+            channels.setdefault(user_id, channel.id)
+    if channels != OFM_CHANNELS.get(guild.id, {}):
+        await replace_ofm_channels(guild.id, channels)
+    return len(channels)
+
+
+class OFMConfirmView(InstrumentedView):
     def __init__(self, user_id: int):
         super().__init__(timeout=180)
         self.user_id = user_id
 
     async def _ensure_user(self, interaction: discord.Interaction) -> bool:
         if interaction.user.id != self.user_id:
-            await interaction.response.send_message(
+            await send_reply(
+                interaction,
                 "Ce bouton ne t'est pas destin\u00e9.",
                 ephemeral=True,
             )
@@ -2010,28 +975,29 @@ class OFMConfirmView(discord.ui.View):
         return name[:60].strip("-") or fallback
 
     @discord.ui.button(label="Confirmer", style=discord.ButtonStyle.success, custom_id="ofm_confirm")
+    @deferrable(ephemeral=True)
     async def confirm(self, interaction: discord.Interaction, _button: discord.ui.Button):
         if not await self._ensure_user(interaction):
             return
         if not interaction.guild:
-            await interaction.response.send_message("Commande disponible uniquement sur un serveur.", ephemeral=True)
+            await send_reply(interaction, "Commande disponible uniquement sur un serveur.", ephemeral=True)
             return
         role = interaction.guild.get_role(OFM_ROLE_ID)
         if not role:
-            await interaction.response.send_message("R\u00f4le OFM introuvable.", ephemeral=True)
+            await send_reply(interaction, "R\u00f4le OFM introuvable.", ephemeral=True)
             return
         member = interaction.guild.get_member(interaction.user.id)
         if not member:
             member = await interaction.guild.fetch_member(interaction.user.id)
         if role in member.roles:
-            await interaction.response.send_message("Tu as d\u00e9j\u00e0 le r\u00f4le OFM.", ephemeral=True)
+            await send_reply(interaction, "Tu as d\u00e9j\u00e0 le r\u00f4le OFM.", ephemeral=True)
             return
         bot_member = interaction.guild.me
         if not bot_member or not bot_member.guild_permissions.manage_roles:
-            await interaction.response.send_message("Je n'ai pas la permission de g\u00e9rer les r\u00f4les.", ephemeral=True)
+            await send_reply(interaction, "Je n'ai pas la permission de g\u00e9rer les r\u00f4les.", ephemeral=True)
             return
         if bot_member.top_role <= role:
-            await interaction.response.send_message("Je ne peux pas attribuer ce r\u00f4le (hi\u00e9rarchie).", ephemeral=True)
+            await send_reply(interaction, "Je ne peux pas attribuer ce r\u00f4le (hi\u00e9rarchie).", ephemeral=True)
             return
         await member.add_roles(role, reason="Inscription OFM")
         channel = None
@@ -2039,31 +1005,36 @@ class OFMConfirmView(discord.ui.View):
         manager_role = interaction.guild.get_role(OFM_MANAGER_ROLE_ID)
         category = interaction.guild.get_channel(OFM_CATEGORY_ID)
         if not isinstance(category, discord.CategoryChannel):
-            await interaction.response.send_message(
+            await send_reply(
+                interaction,
                 "\u2705 Inscription valid\u00e9e. R\u00f4le OFM attribu\u00e9.\n"
                 "\u26a0\ufe0f Cat\u00e9gorie OFM introuvable pour cr\u00e9er le salon priv\u00e9.",
                 ephemeral=True,
             )
             return
         if not manager_role:
-            await interaction.response.send_message(
+            await send_reply(
+                interaction,
                 "\u2705 Inscription valid\u00e9e. R\u00f4le OFM attribu\u00e9.\n"
                 "\u26a0\ufe0f R\u00f4le OFM manager introuvable pour cr\u00e9er le salon priv\u00e9.",
                 ephemeral=True,
             )
             return
         if not bot_member.guild_permissions.manage_channels:
-            await interaction.response.send_message(
+            await send_reply(
+                interaction,
                 "\u2705 Inscription valid\u00e9e. R\u00f4le OFM attribu\u00e9.\n"
                 "\u26a0\ufe0f Je n'ai pas la permission de g\u00e9rer les salons.",
                 ephemeral=True,
             )
             return
-        topic = f"OFM candidature: {interaction.user.id}"
-        for existing in interaction.guild.text_channels:
-            if existing.topic == topic:
-                channel = existing
-                break
+        topic = f"{OFM_CANDIDATURE_TOPIC_PREFIX}{interaction.user.id}"
+        channel_id = await get_ofm_channel_id(interaction.guild.id, interaction.user.id)
+        if channel_id:
+            channel = interaction.guild.get_channel(channel_id)
+            if not isinstance(channel, discord.TextChannel):
+                channel = None
+                await clear_ofm_channel(interaction.guild.id, channel_id)
         if not channel:
             overwrites = {
                 interaction.guild.default_role: discord.PermissionOverwrite(view_channel=False),
@@ -2093,6 +1064,7 @@ class OFMConfirmView(discord.ui.View):
                 topic=topic,
                 reason="Cr\u00e9ation salon candidature OFM",
             )
+            await set_ofm_channel(interaction.guild.id, interaction.user.id, channel.id)
             channel_created = True
         team_role = interaction.guild.get_role(OFM_TEAM_ROLE_ID)
         await upsert_ofm_participant(
@@ -2101,14 +1073,15 @@ class OFMConfirmView(discord.ui.View):
             "pending",
             team_role.id if team_role else None,
         )
-        await update_ofm_board(interaction.guild)
+        request_ofm_board_refresh(interaction.guild)
         if channel_created:
             await channel.send(
                 f"{manager_role.mention} Nouvelle candidature OFM pour {member.mention}.",
                 view=OFMReviewView(),
             )
         channel_line = f"Salon priv\u00e9: {channel.mention}" if channel else ""
-        await interaction.response.send_message(
+        await send_reply(
+            interaction,
             "\u2705 Inscription valid\u00e9e. R\u00f4le OFM attribu\u00e9."
             + (f"\n{channel_line}" if channel_line else ""),
             ephemeral=True,
@@ -2121,7 +1094,7 @@ class OFMConfirmView(discord.ui.View):
         await interaction.response.send_message("Inscription annul\u00e9e.", ephemeral=True)
 
 
-class OFMInscriptionView(discord.ui.View):
+class OFMInscriptionView(InstrumentedView):
     def __init__(self):
         super().__init__(timeout=None)
 
@@ -2145,7 +1118,18 @@ class OFMInscriptionView(discord.ui.View):
         )
 
 
-class OFMReviewView(discord.ui.View):
+def ofm_roles(guild: discord.Guild, *role_ids) -> list:
+    # The team role doubles as the manager role on some servers: it is never handed out with the
+    # participant roles, or every accepted player would become an OFM manager, nor stripped from managers.
+    roles = [guild.get_role(role_id) for role_id in role_ids if role_id]
+    return [role for role in roles if role and role.id != OFM_MANAGER_ROLE_ID]
+
+
+def ofm_participant_roles(guild: discord.Guild) -> list:
+    return ofm_roles(guild, OFM_ROLE_ID, OFM_TEAM_ROLE_ID)
+
+
+class OFMReviewView(InstrumentedView):
     def __init__(self):
         super().__init__(timeout=None)
 
@@ -2167,15 +1151,9 @@ class OFMReviewView(discord.ui.View):
 
     def _extract_candidate_id(self, interaction: discord.Interaction) -> Optional[int]:
         channel = interaction.channel
-        if not isinstance(channel, discord.TextChannel) or not channel.topic:
-            return None
-        prefix = "OFM candidature: "
-        if not channel.topic.startswith(prefix):
+        if not isinstance(channel, discord.TextChannel):
             return None
-        raw = channel.topic[len(prefix) :].strip()
-        if not raw.isdigit():
-            return None
-        return int(raw)
+        return parse_ofm_candidature_topic(channel.topic)
 
     async def _get_candidate_member(self, interaction: discord.Interaction) -> Optional[discord.Member]:
         candidate_id = self._extract_candidate_id(interaction)
@@ -2206,28 +1184,23 @@ class OFMReviewView(discord.ui.View):
         member = await self._get_candidate_member(interaction)
         if not member:
             return
-        existing = await get_ofm_participant(interaction.guild.id, member.id)
-        if existing and existing["status"] in ("accepted", "refused"):
-            await interaction.response.send_message(
-                "Cette candidature a déjà été traitée.",
-                ephemeral=True,
-            )
-            return
-        role = interaction.guild.get_role(OFM_ROLE_ID)
-        if role and role not in member.roles:
-            await member.add_roles(role, reason="Candidature OFM acceptée")
         team_role = interaction.guild.get_role(OFM_TEAM_ROLE_ID)
-        manager_role = interaction.guild.get_role(OFM_MANAGER_ROLE_ID)
-        if team_role and team_role not in member.roles:
-            if not manager_role or team_role.id != manager_role.id:
-                await member.add_roles(team_role, reason="Équipe OFM attribuée")
-        await upsert_ofm_participant(
+        previous = await decide_ofm_participant(
             interaction.guild.id,
             member.id,
             "accepted",
             team_role.id if team_role else None,
         )
-        await update_ofm_board(interaction.guild)
+        if previous:
+            await interaction.response.send_message(
+                "Cette candidature a déjà été traitée.",
+                ephemeral=True,
+            )
+            return
+        roles = [role for role in ofm_participant_roles(interaction.guild) if role not in member.roles]
+        if roles:
+            await member.add_roles(*roles, reason="Candidature OFM acceptée")
+        request_ofm_board_refresh(interaction.guild)
         embed = discord.Embed(
             title="✅ Candidature OFM",
             description=f"Statut : **Acceptée**\nCandidat : {member.mention}",
@@ -2236,6 +1209,7 @@ class OFMReviewView(discord.ui.View):
         await interaction.response.send_message(embed=embed)
         if interaction.channel:
             await interaction.channel.delete(reason="Candidature OFM acceptée")
+            await clear_ofm_channel(interaction.guild.id, interaction.channel.id)
 
     @discord.ui.button(label="Refuser", style=discord.ButtonStyle.danger, custom_id="ofm_review_refuse")
     async def refuse(self, interaction: discord.Interaction, _button: discord.ui.Button):
@@ -2244,28 +1218,23 @@ class OFMReviewView(discord.ui.View):
         member = await self._get_candidate_member(interaction)
         if not member:
             return
-        existing = await get_ofm_participant(interaction.guild.id, member.id)
-        if existing and existing["status"] in ("accepted", "refused"):
-            await interaction.response.send_message(
-                "Cette candidature a déjà été traitée.",
-                ephemeral=True,
-            )
-            return
-        role = interaction.guild.get_role(OFM_ROLE_ID)
-        if role and role in member.roles:
-            await member.remove_roles(role, reason="Candidature OFM refusée")
         team_role = interaction.guild.get_role(OFM_TEAM_ROLE_ID)
-        manager_role = interaction.guild.get_role(OFM_MANAGER_ROLE_ID)
-        if team_role and team_role in member.roles:
-            if not manager_role or team_role.id != manager_role.id:
-                await member.remove_roles(team_role, reason="Candidature OFM refusée")
-        await upsert_ofm_participant(
+        previous = await decide_ofm_participant(
             interaction.guild.id,
             member.id,
             "refused",
             team_role.id if team_role else None,
         )
-        await update_ofm_board(interaction.guild)
+        if previous:
+            await interaction.response.send_message(
+                "Cette candidature a déjà été traitée.",
+                ephemeral=True,
+            )
+            return
+        roles = [role for role in ofm_participant_roles(interaction.guild) if role in member.roles]
+        if roles:
+            await member.remove_roles(*roles, reason="Candidature OFM refusée")
+        request_ofm_board_refresh(interaction.guild)
         embed = discord.Embed(
             title="❌ Candidature OFM",
             description=f"Statut : **Refusée**\nCandidat : {member.mention}",
@@ -2274,6 +1243,7 @@ class OFMReviewView(discord.ui.View):
         await interaction.response.send_message(embed=embed)
         if interaction.channel:
             await interaction.channel.delete(reason="Candidature OFM refusée")
+            await clear_ofm_channel(interaction.guild.id, interaction.channel.id)
 
     @discord.ui.button(label="En attente", style=discord.ButtonStyle.secondary, custom_id="ofm_review_pending")
     async def pending(self, interaction: discord.Interaction, _button: discord.ui.Button):
@@ -2289,7 +1259,7 @@ class OFMReviewView(discord.ui.View):
             "pending",
             team_role.id if team_role else None,
         )
-        await update_ofm_board(interaction.guild)
+        request_ofm_board_refresh(interaction.guild)
         embed = discord.Embed(
             title="⏳ Candidature OFM",
             description=f"Statut : **En attente d'examen**\nCandidat : {member.mention}",
@@ -2298,7 +1268,144 @@ class OFMReviewView(discord.ui.View):
         await interaction.response.send_message(embed=embed)
 
 
-class OFMMemberIdModal(discord.ui.Modal):
+def parse_member_ids(raw: str) -> list:
+    user_ids = []
+    for token in re.findall(r"\d{15,21}", raw):
+        user_id = int(token)
+        if user_id not in user_ids:
+            user_ids.append(user_id)
+    return user_ids
+
+
+async def resolve_members(guild: discord.Guild, user_ids) -> list:
+    # Members missing from the cache are requested over the gateway 100 at a time instead of one
+    # REST fetch_member call each.
+    members = {}
+    missing = []
+    for user_id in user_ids:
+        member = guild.get_member(user_id)
+        if member:
+            members[user_id] = member
+        else:
+            missing.append(user_id)
+    for start in range(0, len(missing), 100):
+        chunk = missing[start : start + 100]
+        try:
+            found = await guild.query_members(user_ids=chunk, limit=len(chunk), cache=True)
+        except asyncio.TimeoutError:
+            continue
+        for member in found:
+            members[member.id] = member
+    return [members[user_id] for user_id in user_ids if user_id in members]
+
+
+async def delete_ofm_candidature_channels(guild: discord.Guild, user_ids, reason: str):
+    for user_id in user_ids:
+        channel_id = await get_ofm_channel_id(guild.id, user_id)
+        channel = guild.get_channel(channel_id) if channel_id else None
+        if not isinstance(channel, discord.TextChannel):
+            continue
+        try:
+            await channel.delete(reason=reason)
+        except discord.HTTPException:
+            continue
+        await clear_ofm_channel(guild.id, channel_id)
+        await asyncio.sleep(OFM_ROLE_CHANGE_INTERVAL_SECONDS)
+
+
+def format_bulk_result(label: str, count: int, applied: int, failed: list, missing: int = 0) -> str:
+    lines = [f"✅ {label} : {count} participant(s).", f"Rôles modifiés : {applied}"]
+    if failed:
+        lines.append(f"⚠️ Échecs rôles : {', '.join(member.mention for member in failed[:20])}")
+    if missing:
+        lines.append(f"⚠️ Membres introuvables : {missing}")
+    return "\n".join(lines)
+
+
+async def accept_pending_ofm_participants(guild: discord.Guild) -> str:
+    team_role = guild.get_role(OFM_TEAM_ROLE_ID)
+    pending = [p["user_id"] for p in await get_ofm_participants(guild.id, status="pending")]
+    if not pending:
+        return "Aucune candidature en attente."
+    members = await resolve_members(guild, pending)
+    accepted = [member.id for member in members]
+    await set_ofm_participants(guild.id, accepted, "accepted", team_role.id if team_role else None)
+    request_ofm_board_refresh(guild)
+    roles = ofm_participant_roles(guild)
+    applied, failed = await ROLE_CHANGE_QUEUE.apply(
+        [(member, roles, []) for member in members],
+        "OFM: acceptation groupée",
+    )
+    await delete_ofm_candidature_channels(guild, accepted, "Candidature OFM acceptée")
+    return format_bulk_result("Candidatures acceptées", len(accepted), applied, failed, len(pending) - len(accepted))
+
+
+async def import_ofm_participants(guild: discord.Guild, user_ids) -> str:
+    team_role = guild.get_role(OFM_TEAM_ROLE_ID)
+    members = await resolve_members(guild, user_ids)
+    imported = [member.id for member in members]
+    await set_ofm_participants(guild.id, imported, "accepted", team_role.id if team_role else None)
+    request_ofm_board_refresh(guild)
+    roles = ofm_participant_roles(guild)
+    applied, failed = await ROLE_CHANGE_QUEUE.apply(
+        [(member, roles, []) for member in members],
+        "OFM: import groupé",
+    )
+    return format_bulk_result("Participants importés", len(imported), applied, failed, len(user_ids) - len(imported))
+
+
+async def reset_ofm_tournament(guild: discord.Guild) -> str:
+    roles = ofm_roles(guild, OFM_ROLE_ID, OFM_TEAM_ROLE_ID, OFM_LEADER_ROLE_ID, OFM_SUB_ROLE_ID)
+    # role.members is nearly empty without the members intent, so the roster rows are the source of who
+    # holds the tournament roles.
+    user_ids = [p["user_id"] for p in await get_ofm_participants(guild.id)]
+    channels = await get_ofm_channels(guild.id)
+    cleared = await clear_ofm_participants(guild.id)
+    request_ofm_board_refresh(guild)
+    await delete_ofm_candidature_channels(guild, list(channels), "Réinitialisation du tournoi OFM")
+    # Rows whose channel could not be deleted go too; reconcile_ofm_channels picks those back up at startup.
+    await replace_ofm_channels(guild.id, {})
+    members = await resolve_members(guild, user_ids)
+    applied, failed = await ROLE_CHANGE_QUEUE.apply(
+        [(member, [], roles) for member in members],
+        "OFM: réinitialisation du tournoi",
+    )
+    return format_bulk_result("Tournoi réinitialisé", cleared, applied, failed)
+
+
+class OFMBulkImportModal(InstrumentedModal):
+    def __init__(self):
+        super().__init__(title="Importer des participants")
+        self.user_ids = discord.ui.TextInput(
+            label="IDs Discord",
+            placeholder="Un ID par ligne (ou séparés par des espaces/virgules)",
+            style=discord.TextStyle.paragraph,
+            required=True,
+            max_length=4000,
+        )
+        self.add_item(self.user_ids)
+
+    async def on_submit(self, interaction: discord.Interaction):
+        if not interaction.guild:
+            await interaction.response.send_message("Commande disponible uniquement sur un serveur.", ephemeral=True)
+            return
+        manager_role = interaction.guild.get_role(OFM_MANAGER_ROLE_ID)
+        if not manager_role or manager_role not in interaction.user.roles:
+            await interaction.response.send_message("Accès réservé aux OFM managers.", ephemeral=True)
+            return
+        user_ids = parse_member_ids(str(self.user_ids.value))
+        if not user_ids:
+            await interaction.response.send_message("Aucun ID valide.", ephemeral=True)
+            return
+        if len(user_ids) > OFM_BULK_IMPORT_MAX:
+            await interaction.response.send_message(f"Maximum {OFM_BULK_IMPORT_MAX} IDs par import.", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        summary = await import_ofm_participants(interaction.guild, user_ids)
+        await interaction.followup.send(summary, ephemeral=True)
+
+
+class OFMMemberIdModal(InstrumentedModal):
     def __init__(self, title: str, action_key: str):
         super().__init__(title=title)
         self.action_key = action_key
@@ -2346,7 +1453,7 @@ class OFMMemberIdModal(discord.ui.Modal):
                 "accepted",
                 team_role.id if team_role else None,
             )
-            await update_ofm_board(interaction.guild)
+            request_ofm_board_refresh(interaction.guild)
             await interaction.response.send_message(f"✅ {member.mention} ajouté.", ephemeral=True)
             return
 
@@ -2365,7 +1472,7 @@ class OFMMemberIdModal(discord.ui.Modal):
                 "removed",
                 team_role.id if team_role else None,
             )
-            await update_ofm_board(interaction.guild)
+            request_ofm_board_refresh(interaction.guild)
             await interaction.response.send_message(f"✅ {member.mention} retiré.", ephemeral=True)
             return
 
@@ -2406,7 +1513,7 @@ class OFMMemberIdModal(discord.ui.Modal):
             return
 
 
-class OFMTeamNameModal(discord.ui.Modal):
+class OFMTeamNameModal(InstrumentedModal):
     def __init__(self):
         super().__init__(title="Changer le nom de l'équipe")
         self.team_name = discord.ui.TextInput(
@@ -2431,10 +1538,11 @@ class OFMTeamNameModal(discord.ui.Modal):
             return
         await set_ofm_team_name(interaction.guild.id, new_name)
         await update_ofm_admin_panel(interaction.guild)
+        request_ofm_board_refresh(interaction.guild)
         await interaction.response.send_message("✅ Nom d'équipe mis à jour.", ephemeral=True)
 
 
-class OFMReplacementModal(discord.ui.Modal):
+class OFMReplacementModal(InstrumentedModal):
     def __init__(self):
         super().__init__(title="Définir un remplaçant")
         self.absent_id = discord.ui.TextInput(
@@ -2490,7 +1598,7 @@ class OFMReplacementModal(discord.ui.Modal):
             "accepted",
             team_role.id if team_role else None,
         )
-        await update_ofm_board(interaction.guild)
+        request_ofm_board_refresh(interaction.guild)
 
         absent_line = ""
         raw_absent = str(self.absent_id.value).strip()
@@ -2503,7 +1611,7 @@ class OFMReplacementModal(discord.ui.Modal):
         )
 
 
-class OFMConfigView(discord.ui.View):
+class OFMConfigView(InstrumentedView):
     def __init__(self, section: str = "members"):
         super().__init__(timeout=None)
         self.section = section
@@ -2561,6 +1669,11 @@ class OFMConfigView(discord.ui.View):
         self._add_button("Promouvoir", "🔝", discord.ButtonStyle.primary, "ofm_promote", self._promote, 2)
         self._add_button("Rétrograder", "⬇️", discord.ButtonStyle.secondary, "ofm_demote", self._demote, 2)
         self._add_button("Voir la liste", "📋", discord.ButtonStyle.secondary, "ofm_list_members", self._list_members, 3)
+        self._add_button("Importer des IDs", "📥", discord.ButtonStyle.primary, "ofm_bulk_import", self._bulk_import, 3)
+        self._add_button(
+            "Accepter les en attente", "✅", discord.ButtonStyle.success, "ofm_accept_pending", self._accept_pending, 3
+        )
+        self._add_button("Réinitialiser le tournoi", "♻️", discord.ButtonStyle.danger, "ofm_reset", self._reset, 4)
 
     def _add_team_buttons(self):
         self._add_button("Changer le nom", "✏️", discord.ButtonStyle.primary, "ofm_team_name", self._change_team_name, 1)
@@ -2613,6 +1726,33 @@ class OFMConfigView(discord.ui.View):
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    async def _bulk_import(self, interaction: discord.Interaction):
+        if not await self._ensure_manager(interaction):
+            return
+        await interaction.response.send_modal(OFMBulkImportModal())
+
+    async def _accept_pending(self, interaction: discord.Interaction):
+        if not await self._ensure_manager(interaction):
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        summary = await accept_pending_ofm_participants(interaction.guild)
+        await interaction.followup.send(summary, ephemeral=True)
+
+    async def _reset(self, interaction: discord.Interaction):
+        if not await self._ensure_manager(interaction):
+            return
+
+        async def do_reset(confirm_interaction: discord.Interaction):
+            await confirm_interaction.response.defer(ephemeral=True, thinking=True)
+            summary = await reset_ofm_tournament(confirm_interaction.guild)
+            await confirm_interaction.followup.send(summary, ephemeral=True)
+
+        await interaction.response.send_message(
+            "Réinitialiser le tournoi ? Tous les participants et leurs rôles OFM seront retirés.",
+            view=ModConfirmView(interaction.user.id, do_reset),
+            ephemeral=True,
+        )
+
     async def _change_team_name(self, interaction: discord.Interaction):
         if not await self._ensure_manager(interaction):
             return
@@ -2629,7 +1769,7 @@ class OFMConfigView(discord.ui.View):
         await interaction.response.send_modal(OFMReplacementModal())
 
 
-class ModDefaultsModal(discord.ui.Modal):
+class ModDefaultsModal(InstrumentedModal):
     def __init__(self):
         super().__init__(title="Configurer les durées par défaut")
         self.default_mute = discord.ui.TextInput(
@@ -2667,7 +1807,7 @@ class ModDefaultsModal(discord.ui.Modal):
         await interaction.response.send_message("✅ Durées mises à jour.", ephemeral=True)
 
 
-class ModConfirmView(discord.ui.View):
+class ModConfirmView(InstrumentedView):
     def __init__(self, requester_id: int, on_confirm):
         super().__init__(timeout=60)
         self.requester_id = requester_id
@@ -2692,7 +1832,7 @@ class ModConfirmView(discord.ui.View):
         await interaction.response.send_message("Action annulée.", ephemeral=True)
 
 
-class ModWarnModal(discord.ui.Modal):
+class ModWarnModal(InstrumentedModal):
     def __init__(self):
         super().__init__(title="Warn un membre")
         self.user_id = discord.ui.TextInput(label="ID Discord", required=True, max_length=32)
@@ -2716,8 +1856,13 @@ class ModWarnModal(discord.ui.Modal):
         if err:
             await interaction.response.send_message(err, ephemeral=True)
             return
-        record = await add_warning(interaction.guild.id, member.id, interaction.user.id, str(self.reason.value))
-        await add_mod_action(interaction.guild.id, member.id, interaction.user.id, "warn", str(self.reason.value))
+        async with transaction() as conn:
+            record = await add_warning(
+                interaction.guild.id, member.id, interaction.user.id, str(self.reason.value), conn=conn
+            )
+            await add_mod_action(
+                interaction.guild.id, member.id, interaction.user.id, "warn", str(self.reason.value), conn=conn
+            )
         await send_mod_log(
             interaction.guild,
             build_mod_log_embed("warn", member, interaction.user, str(self.reason.value)),
@@ -2725,7 +1870,7 @@ class ModWarnModal(discord.ui.Modal):
         await interaction.response.send_message(f"✅ Warn ajouté (ID {record['id']}).", ephemeral=True)
 
 
-class ModWarnListModal(discord.ui.Modal):
+class ModWarnListModal(InstrumentedModal):
     def __init__(self):
         super().__init__(title="Warnlist")
         self.user_id = discord.ui.TextInput(label="ID Discord", required=True, max_length=32)
@@ -2757,7 +1902,7 @@ class ModWarnListModal(discord.ui.Modal):
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
-class ModClearWarnModal(discord.ui.Modal):
+class ModClearWarnModal(InstrumentedModal):
     def __init__(self):
         super().__init__(title="Clearwarn")
         self.user_id = discord.ui.TextInput(label="ID Discord", required=True, max_length=32)
@@ -2781,8 +1926,11 @@ class ModClearWarnModal(discord.ui.Modal):
             if not warn_raw.isdigit():
                 await interaction.response.send_message("ID warn invalide.", ephemeral=True)
                 return
-            await delete_warning(interaction.guild.id, user_id, int(warn_raw))
-            await add_mod_action(interaction.guild.id, user_id, interaction.user.id, "clearwarn", f"warn_id={warn_raw}")
+            async with transaction() as conn:
+                await delete_warning(interaction.guild.id, user_id, int(warn_raw), conn=conn)
+                await add_mod_action(
+                    interaction.guild.id, user_id, interaction.user.id, "clearwarn", f"warn_id={warn_raw}", conn=conn
+                )
             await send_mod_log(
                 interaction.guild,
                 build_mod_log_embed("clearwarn", discord.Object(id=user_id), interaction.user, f"warn_id={warn_raw}"),
@@ -2791,8 +1939,11 @@ class ModClearWarnModal(discord.ui.Modal):
             return
 
         async def do_clear(confirm_interaction: discord.Interaction):
-            await clear_all_warnings(confirm_interaction.guild.id, user_id)
-            await add_mod_action(confirm_interaction.guild.id, user_id, confirm_interaction.user.id, "clearwarn", "all")
+            async with transaction() as conn:
+                await clear_all_warnings(confirm_interaction.guild.id, user_id, conn=conn)
+                await add_mod_action(
+                    confirm_interaction.guild.id, user_id, confirm_interaction.user.id, "clearwarn", "all", conn=conn
+                )
             await send_mod_log(
                 confirm_interaction.guild,
                 build_mod_log_embed("clearwarn", discord.Object(id=user_id), confirm_interaction.user, "all"),
@@ -2806,7 +1957,7 @@ class ModClearWarnModal(discord.ui.Modal):
         )
 
 
-class ModMuteModal(discord.ui.Modal):
+class ModMuteModal(InstrumentedModal):
     def __init__(self):
         super().__init__(title="Mute/Timeout")
         self.user_id = discord.ui.TextInput(label="ID Discord", required=True, max_length=32)
@@ -2847,7 +1998,7 @@ class ModMuteModal(discord.ui.Modal):
         await interaction.response.send_message("✅ Mute appliqué.", ephemeral=True)
 
 
-class ModKickModal(discord.ui.Modal):
+class ModKickModal(InstrumentedModal):
     def __init__(self):
         super().__init__(title="Kick")
         self.user_id = discord.ui.TextInput(label="ID Discord", required=True, max_length=32)
@@ -2889,7 +2040,7 @@ class ModKickModal(discord.ui.Modal):
         )
 
 
-class ModBanModal(discord.ui.Modal):
+class ModBanModal(InstrumentedModal):
     def __init__(self):
         super().__init__(title="Ban")
         self.user_id = discord.ui.TextInput(label="ID Discord", required=True, max_length=32)
@@ -2931,8 +2082,7 @@ class ModBanModal(discord.ui.Modal):
                 confirm_interaction.guild,
                 build_mod_log_embed("ban", member, confirm_interaction.user, reason, seconds or None),
             )
-            if seconds:
-                bot.loop.create_task(schedule_unban(confirm_interaction.guild, member.id, seconds))
+            await schedule_unban(confirm_interaction.guild, member.id, seconds)
             await confirm_interaction.response.send_message("✅ Membre banni.", ephemeral=True)
 
         await interaction.response.send_message(
@@ -2942,7 +2092,7 @@ class ModBanModal(discord.ui.Modal):
         )
 
 
-class ModUnbanModal(discord.ui.Modal):
+class ModUnbanModal(InstrumentedModal):
     def __init__(self):
         super().__init__(title="Unban")
         self.user_id = discord.ui.TextInput(label="ID Discord", required=True, max_length=32)
@@ -2965,6 +2115,7 @@ class ModUnbanModal(discord.ui.Modal):
 
         async def do_unban(confirm_interaction: discord.Interaction):
             await confirm_interaction.guild.unban(discord.Object(id=target_id), reason=reason or "Unban")
+            await ACTION_SCHEDULER.cancel(confirm_interaction.guild.id, target_id, ACTION_UNBAN)
             await add_mod_action(confirm_interaction.guild.id, target_id, confirm_interaction.user.id, "unban", reason)
             await send_mod_log(
                 confirm_interaction.guild,
@@ -2979,7 +2130,7 @@ class ModUnbanModal(discord.ui.Modal):
         )
 
 
-class ModCaseModal(discord.ui.Modal):
+class ModCaseModal(InstrumentedModal):
     def __init__(self):
         super().__init__(title="Casier")
         self.user_id = discord.ui.TextInput(label="ID Discord", required=True, max_length=32)
@@ -3022,7 +2173,7 @@ class ModCaseModal(discord.ui.Modal):
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
-class ModNoteModal(discord.ui.Modal):
+class ModNoteModal(InstrumentedModal):
     def __init__(self):
         super().__init__(title="Note interne")
         self.user_id = discord.ui.TextInput(label="ID Discord", required=True, max_length=32)
@@ -3049,7 +2200,7 @@ class ModNoteModal(discord.ui.Modal):
             build_mod_log_embed("note", member, interaction.user, note_text),
         )
         await interaction.response.send_message("✅ Note ajoutée.", ephemeral=True)
-class ModAdminPanelView(discord.ui.View):
+class ModAdminPanelView(InstrumentedView):
     def __init__(
         self,
         guild_id: Optional[int] = None,
@@ -3207,8 +2358,8 @@ class ModAdminPanelView(discord.ui.View):
         if not self.selected_role_id:
             await interaction.response.send_message("Sélectionne un rôle.", ephemeral=True)
             return
-        perms = await get_permissions_for_role(interaction.guild.id, self.selected_role_id)
-        allowed = [p["command"] for p in perms if p["allowed"]]
+        allowed_set = await get_allowed_commands_for_role(interaction.guild.id, self.selected_role_id)
+        allowed = [command for command in MOD_COMMANDS if command in allowed_set]
         allowed_text = ", ".join(allowed) if allowed else "Aucune"
         await interaction.response.send_message(
             f"Permissions: {allowed_text}",
@@ -3270,23 +2421,29 @@ async def update_leaderboard_message():
     if not bot.guilds:
         return
     for guild in bot.guilds:
-        record = await get_leaderboard_message(guild.id)
+        record = await get_managed_message(guild.id, MESSAGE_LEADERBOARD)
         if not record:
             continue
         channel_id = record["channel_id"]
         message_id = record["message_id"]
         try:
+            embed = await build_leaderboard_embed(guild, 1, 20)
+            if not embed:
+                continue
+            content_hash = embed_content_hash(embed)
+            if content_hash == record["content_hash"]:
+                continue
             channel = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
             message = await channel.fetch_message(message_id)
-            embed = await build_leaderboard_embed(guild, 1, 20)
-            if embed:
-                await message.edit(embed=embed, view=LeaderboardView(1, 20))
+            await message.edit(embed=embed, view=LeaderboardView(1, 20))
+            DISCORD_MESSAGES.inc(action="edit", source="leaderboard")
+            await set_managed_message_hash(guild.id, MESSAGE_LEADERBOARD, content_hash)
         except Exception:
-            await clear_leaderboard_message(guild.id)
+            await clear_managed_message(guild.id, MESSAGE_LEADERBOARD)
 
 
 async def update_leaderboard_message_for_guild(guild: discord.Guild):
-    record = await get_leaderboard_message(guild.id)
+    record = await get_managed_message(guild.id, MESSAGE_LEADERBOARD)
     if not record:
         return {"updated": False, "error": "no_record"}
     channel_id = record["channel_id"]
@@ -3298,6 +2455,8 @@ async def update_leaderboard_message_for_guild(guild: discord.Guild):
         if not embed:
             return {"updated": False, "error": "no_embed"}
         await message.edit(embed=embed, view=LeaderboardView(1, 20))
+        DISCORD_MESSAGES.inc(action="edit", source="leaderboard")
+        await set_managed_message_hash(guild.id, MESSAGE_LEADERBOARD, embed_content_hash(embed))
         return {"updated": True, "error": None}
     except Exception as exc:
         return {"updated": False, "error": str(exc)[:200]}
@@ -3307,23 +2466,29 @@ async def update_leaderboard_message_ffa():
     if not bot.guilds:
         return
     for guild in bot.guilds:
-        record = await get_leaderboard_message_ffa(guild.id)
+        record = await get_managed_message(guild.id, MESSAGE_LEADERBOARD_FFA)
         if not record:
             continue
         channel_id = record["channel_id"]
         message_id = record["message_id"]
         try:
+            embed = await build_leaderboard_ffa_embed(guild, 1, 20)
+            if not embed:
+                continue
+            content_hash = embed_content_hash(embed)
+            if content_hash == record["content_hash"]:
+                continue
             channel = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
             message = await channel.fetch_message(message_id)
-            embed = await build_leaderboard_ffa_embed(guild, 1, 20)
-            if embed:
-                await message.edit(embed=embed, view=LeaderboardFfaView(1, 20))
+            await message.edit(embed=embed, view=LeaderboardFfaView(1, 20))
+            DISCORD_MESSAGES.inc(action="edit", source="leaderboard_ffa")
+            await set_managed_message_hash(guild.id, MESSAGE_LEADERBOARD_FFA, content_hash)
         except Exception:
-            await clear_leaderboard_message_ffa(guild.id)
+            await clear_managed_message(guild.id, MESSAGE_LEADERBOARD_FFA)
 
 
 async def update_leaderboard_message_ffa_for_guild(guild: discord.Guild):
-    record = await get_leaderboard_message_ffa(guild.id)
+    record = await get_managed_message(guild.id, MESSAGE_LEADERBOARD_FFA)
     if not record:
         return {"updated": False, "error": "no_record"}
     channel_id = record["channel_id"]
@@ -3335,6 +2500,8 @@ async def update_leaderboard_message_ffa_for_guild(guild: discord.Guild):
         if not embed:
             return {"updated": False, "error": "no_embed"}
         await message.edit(embed=embed, view=LeaderboardFfaView(1, 20))
+        DISCORD_MESSAGES.inc(action="edit", source="leaderboard_ffa")
+        await set_managed_message_hash(guild.id, MESSAGE_LEADERBOARD_FFA, embed_content_hash(embed))
         return {"updated": True, "error": None}
     except Exception as exc:
         return {"updated": False, "error": str(exc)[:200]}
@@ -3350,7 +2517,7 @@ async def recover_ffa_leaderboard_record(guild: discord.Guild):
                     continue
                 title = msg.embeds[0].title or ""
                 if "Leaderboard FFA" in title:
-                    await set_leaderboard_message_ffa(guild.id, channel.id, msg.id)
+                    await set_managed_message(guild.id, MESSAGE_LEADERBOARD_FFA, channel.id, msg.id)
                     return {"recovered": True, "channel_id": channel.id, "message_id": msg.id}
         except Exception:
             continue
@@ -3373,46 +2540,50 @@ async def update_leaderboard_message_1v1():
     if not bot.guilds:
         return
     for guild in bot.guilds:
-        record = await get_leaderboard_message_1v1(guild.id)
+        record = await get_managed_message(guild.id, MESSAGE_LEADERBOARD_1V1)
         if not record:
             continue
         channel_id = record["channel_id"]
         message_id = record["message_id"]
         try:
+            embed = await build_leaderboard_1v1_embed(guild, 1, 20)
+            if not embed:
+                continue
+            content_hash = embed_content_hash(embed)
+            if content_hash == record["content_hash"]:
+                continue
             channel = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
             message = await channel.fetch_message(message_id)
-            embed = await build_leaderboard_1v1_embed(guild, 1, 20)
-            if embed:
-                await message.edit(embed=embed, view=Leaderboard1v1View(1, 20))
+            await message.edit(embed=embed, view=Leaderboard1v1View(1, 20))
+            DISCORD_MESSAGES.inc(action="edit", source="leaderboard_1v1")
+            await set_managed_message_hash(guild.id, MESSAGE_LEADERBOARD_1V1, content_hash)
         except Exception:
-            await clear_leaderboard_message_1v1(guild.id)
+            await clear_managed_message(guild.id, MESSAGE_LEADERBOARD_1V1)
 
 
 async def update_leaderboard_message_1v1_gal():
     if not bot.guilds:
         return
     for guild in bot.guilds:
-        record = await get_leaderboard_message_1v1_gal(guild.id)
+        record = await get_managed_message(guild.id, MESSAGE_LEADERBOARD_1V1_GAL)
         if not record:
             continue
         channel_id = record["channel_id"]
         message_id = record["message_id"]
         try:
+            embed = await build_leaderboard_1v1_gal_embed(guild)
+            if not embed:
+                continue
+            content_hash = embed_content_hash(embed)
+            if content_hash == record["content_hash"]:
+                continue
             channel = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
             message = await channel.fetch_message(message_id)
-            embed = await build_leaderboard_1v1_gal_embed(guild)
-            if embed:
-                await message.edit(embed=embed)
+            await message.edit(embed=embed)
+            DISCORD_MESSAGES.inc(action="edit", source="leaderboard_1v1_gal")
+            await set_managed_message_hash(guild.id, MESSAGE_LEADERBOARD_1V1_GAL, content_hash)
         except Exception:
-            await clear_leaderboard_message_1v1_gal(guild.id)
-
-
-async def get_latest_ffa_updated_at():
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT MAX(updated_at) AS last_updated FROM ffa_stats"
-        )
-        return row["last_updated"] if row else None
+            await clear_managed_message(guild.id, MESSAGE_LEADERBOARD_1V1_GAL)
 
 
 async def resync_leaderboards(guild: discord.Guild):
@@ -3439,26 +2610,6 @@ async def resync_leaderboards(guild: discord.Guild):
     }
 
 
-async def get_progress_stats():
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            """
-            SELECT
-                COUNT(*) AS players,
-                COALESCE(SUM(wins_ffa + wins_team), 0) AS wins_total,
-                COALESCE(SUM(losses_ffa + losses_team), 0) AS losses_total
-            FROM player_stats
-            """
-        )
-        games_row = await conn.fetchrow("SELECT COUNT(*) FROM processed_games")
-    return {
-        "players": row[0] if row else 0,
-        "wins_total": row[1] if row else 0,
-        "losses_total": row[2] if row else 0,
-        "games_processed": games_row[0] if games_row else 0,
-    }
-
-
 def compute_next_backfill_eta(last_attempt):
     if not last_attempt:
         return "inconnu"
@@ -3476,7 +2627,7 @@ def compute_next_backfill_eta(last_attempt):
     return f"{minutes}m {seconds}s"
 
 
-def process_game(info, clan_has_won):
+async def process_game(info, clan_has_won):
     mode = game_mode(info).lower()
     is_ffa = "free for all" in mode or mode == "ffa"
     is_team = "team" in mode
@@ -3493,14 +2644,14 @@ def process_game(info, clan_has_won):
 
         if is_ffa:
             if clan_has_won:
-                asyncio.create_task(upsert_player(username_key, display_name, 1, 0, 0, 0))
+                await upsert_player(username_key, display_name, 1, 0, 0, 0)
             else:
-                asyncio.create_task(upsert_player(username_key, display_name, 0, 1, 0, 0))
+                await upsert_player(username_key, display_name, 0, 1, 0, 0)
         elif is_team:
             if clan_has_won:
-                asyncio.create_task(upsert_player(username_key, display_name, 0, 0, 1, 0))
+                await upsert_player(username_key, display_name, 0, 0, 1, 0)
             else:
-                asyncio.create_task(upsert_player(username_key, display_name, 0, 0, 0, 1))
+                await upsert_player(username_key, display_name, 0, 0, 0, 1)
 
 
 async def refresh_from_range(start_dt, end_dt):
@@ -3508,7 +2659,7 @@ async def refresh_from_range(start_dt, end_dt):
     end_iso = end_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
 
     headers = {"User-Agent": USER_AGENT}
-    async with aiohttp.ClientSession(headers=headers) as session:
+    async with create_openfront_session(headers) as session:
         sessions = await fetch_clan_sessions(session, start_iso, end_iso)
         sessions = sessions[:MAX_SESSIONS]
 
@@ -3522,10 +2673,15 @@ async def refresh_from_range(start_dt, end_dt):
             try:
                 info = await fetch_game_info(session, game_id)
             except Exception:
+                count_event("fetch_errors")
                 continue
             clan_has_won = bool(s.get("hasWon"))
-            process_game(info, clan_has_won)
+            # Awaited so the game is only marked once its stats are stored, and ingestion
+            # never holds more connections than the ingest pool allows.
+            await process_game(info, clan_has_won)
             await mark_game_processed(game_id)
+            GAMES_INGESTED.inc(pipeline="team")
+            count_event("games")
             processed_in_step += 1
 
         return len(sessions), processed_in_step
@@ -3536,20 +2692,33 @@ async def refresh_1v1_from_range(start_dt, end_dt):
     end_iso = end_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
 
     headers = {"User-Agent": USER_AGENT}
-    async with aiohttp.ClientSession(headers=headers) as session:
+    async with create_openfront_session(headers) as session:
         games = await fetch_games_list(session, start_iso, end_iso, ONEV1_MAX_GAMES)
         processed_in_step = 0
         for g in games:
             game_id = g.get("game")
             if not game_id:
                 continue
+            ONEV1_LISTING_STATS["listed"] += 1
+            if game_id in ONEV1_LISTING_REJECTED:
+                ONEV1_LISTING_STATS["rejected"] += 1
+                continue
+            # Listing-rejected games are only remembered in memory: they stay rejected on every
+            # pass, so they need no row in processed_games_1v1.
+            if classify_1v1_listing(g) is False:
+                remember_1v1_rejected(game_id)
+                ONEV1_LISTING_STATS["rejected"] += 1
+                continue
             if await is_game_processed_1v1(game_id):
                 continue
+            ONEV1_LISTING_STATS["fetched"] += 1
             try:
                 info = await fetch_game_info(session, game_id)
             except Exception:
+                count_event("fetch_errors")
                 continue
             if not is_1v1_game(info):
+                ONEV1_LISTING_STATS["fetched_not_1v1"] += 1
                 await mark_game_processed_1v1(game_id)
                 continue
             winners = get_winner_client_ids(info)
@@ -3566,6 +2735,8 @@ async def refresh_1v1_from_range(start_dt, end_dt):
                 else:
                     await upsert_1v1_stats(username_key, 0, 1)
             await mark_game_processed_1v1(game_id)
+            GAMES_INGESTED.inc(pipeline="1v1")
+            count_event("games")
             processed_in_step += 1
 
         return len(games), processed_in_step
@@ -3594,7 +2765,7 @@ async def run_backfill_step():
     except Exception as exc:
         last_error = str(exc)[:500]
         await set_backfill_state(cursor, False, last_attempt, last_error, 0, 0)
-        print(f"Backfill failed: {exc}")
+        log_exception("backfill_failed", exc, cursor=cursor)
         return {"status": "error", "cursor": cursor, "error": last_error}
 
     new_cursor = end_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -3607,33 +2778,45 @@ async def run_backfill_step():
         last_sessions,
         last_games_processed,
     )
-    print(f"Backfill step: {cursor} -> {new_cursor} (done={completed})")
+    BACKFILL_PROGRESS["team"] = (end_dt, completed)
+    log_event("backfill_step", cursor=cursor, new_cursor=new_cursor, completed=completed, sessions=last_sessions)
     return {"status": "ok", "cursor": new_cursor, "completed": completed}
 
 
 async def backfill_loop():
     while True:
-        await run_backfill_step()
+        with log_span("loop", "backfill"):
+            await run_backfill_step()
         await asyncio.sleep(BACKFILL_INTERVAL_MINUTES * 60)
 
 
 async def live_loop():
     while True:
         loop_start = datetime.now(timezone.utc)
-        try:
-            end_dt = datetime.now(timezone.utc)
-            start_dt = end_dt - timedelta(hours=RANGE_HOURS)
-            await refresh_from_range(start_dt, end_dt)
-            print("Live refresh done")
-            await update_leaderboard_message()
-            await refresh_ffa_stats()
-            await update_leaderboard_message_ffa()
-        except Exception as exc:
-            print(f"Live refresh failed: {exc}")
-        finally:
-            global LAST_LB_LIVE_AT, NEXT_LB_LIVE_AT
-            LAST_LB_LIVE_AT = loop_start
-            NEXT_LB_LIVE_AT = loop_start + timedelta(minutes=REFRESH_MINUTES)
+        iteration_start = time.monotonic()
+        with log_span("loop", "live"):
+            try:
+                end_dt = datetime.now(timezone.utc)
+                start_dt = end_dt - timedelta(hours=RANGE_HOURS)
+                with log_span("step", "refresh"):
+                    await refresh_from_range(start_dt, end_dt)
+                with log_span("step", "prune"):
+                    pruned = await prune_processed_games()
+                if pruned:
+                    log_event("processed_games_pruned", pruned=pruned)
+                with log_span("step", "leaderboard_team"):
+                    await update_leaderboard_message()
+                with log_span("step", "ffa_stats"):
+                    await refresh_ffa_stats()
+                with log_span("step", "leaderboard_ffa"):
+                    await update_leaderboard_message_ffa()
+            except Exception as exc:
+                log_exception("live_refresh_failed", exc)
+            finally:
+                LOOP_ITERATION_SECONDS.observe(time.monotonic() - iteration_start, loop="live")
+                global LAST_LB_LIVE_AT, NEXT_LB_LIVE_AT
+                LAST_LB_LIVE_AT = loop_start
+                NEXT_LB_LIVE_AT = loop_start + timedelta(minutes=REFRESH_MINUTES)
         await asyncio.sleep(REFRESH_MINUTES * 60)
 
 
@@ -3660,7 +2843,7 @@ async def run_backfill_1v1_step():
     except Exception as exc:
         last_error = str(exc)[:500]
         await set_backfill_state_1v1(cursor, False, last_attempt, last_error)
-        print(f"Backfill 1v1 failed: {exc}")
+        log_exception("backfill_1v1_failed", exc, cursor=cursor)
         return {"status": "error", "cursor": cursor, "error": last_error}
 
     new_cursor = end_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -3671,31 +2854,43 @@ async def run_backfill_1v1_step():
         last_attempt,
         last_error,
     )
-    print(f"Backfill 1v1 step: {cursor} -> {new_cursor} (done={completed})")
+    BACKFILL_PROGRESS["1v1"] = (end_dt, completed)
+    log_event("backfill_1v1_step", cursor=cursor, new_cursor=new_cursor, completed=completed)
     return {"status": "ok", "cursor": new_cursor, "completed": completed}
 
 
 async def backfill_1v1_loop():
     while True:
-        await run_backfill_1v1_step()
+        with log_span("loop", "backfill_1v1"):
+            await run_backfill_1v1_step()
         await asyncio.sleep(ONEV1_BACKFILL_INTERVAL_MINUTES * 60)
 
 
 async def live_1v1_loop():
     while True:
         loop_start = datetime.now(timezone.utc)
-        try:
-            end_dt = datetime.now(timezone.utc)
-            start_dt = end_dt - timedelta(hours=48)
-            await refresh_1v1_from_range(start_dt, end_dt)
-            await update_leaderboard_message_1v1()
-            await update_leaderboard_message_1v1_gal()
-        except Exception as exc:
-            print(f"Live 1v1 refresh failed: {exc}")
-        finally:
-            global LAST_LB_1V1_LIVE_AT, NEXT_LB_1V1_LIVE_AT
-            LAST_LB_1V1_LIVE_AT = loop_start
-            NEXT_LB_1V1_LIVE_AT = loop_start + timedelta(minutes=ONEV1_REFRESH_MINUTES)
+        iteration_start = time.monotonic()
+        with log_span("loop", "live_1v1"):
+            try:
+                end_dt = datetime.now(timezone.utc)
+                start_dt = end_dt - timedelta(hours=48)
+                with log_span("step", "refresh"):
+                    await refresh_1v1_from_range(start_dt, end_dt)
+                with log_span("step", "prune"):
+                    pruned = await prune_processed_games_1v1()
+                if pruned:
+                    log_event("processed_games_1v1_pruned", pruned=pruned)
+                with log_span("step", "leaderboard_1v1"):
+                    await update_leaderboard_message_1v1()
+                with log_span("step", "leaderboard_1v1_gal"):
+                    await update_leaderboard_message_1v1_gal()
+            except Exception as exc:
+                log_exception("live_1v1_refresh_failed", exc)
+            finally:
+                LOOP_ITERATION_SECONDS.observe(time.monotonic() - iteration_start, loop="live_1v1")
+                global LAST_LB_1V1_LIVE_AT, NEXT_LB_1V1_LIVE_AT
+                LAST_LB_1V1_LIVE_AT = loop_start
+                NEXT_LB_1V1_LIVE_AT = loop_start + timedelta(minutes=ONEV1_REFRESH_MINUTES)
         await asyncio.sleep(ONEV1_REFRESH_MINUTES * 60)
 
 
@@ -3715,90 +2910,101 @@ async def win_notify_loop():
             "fetch_errors": 0,
         }
         error_text = None
-        try:
-            channel = bot.get_channel(int(WIN_NOTIFY_CHANNEL_ID)) or await bot.fetch_channel(
-                int(WIN_NOTIFY_CHANNEL_ID)
-            )
-            channel_error = get_notify_channel_error(channel)
-            if channel_error:
-                raise RuntimeError(channel_error)
-            end_dt = datetime.now(timezone.utc)
-            start_dt = end_dt - timedelta(hours=WIN_NOTIFY_RANGE_HOURS)
-            start_iso = start_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
-            end_iso = end_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
-
-            headers = {"User-Agent": USER_AGENT}
-            async with aiohttp.ClientSession(headers=headers) as session:
-                sessions = await fetch_clan_sessions(session, start_iso, end_iso)
-                stats["sessions"] = len(sessions)
-                for s in sessions:
-                    game_id = s.get("gameId")
-                    if not game_id:
-                        stats["missing_game_id"] += 1
-                        continue
-                    if await is_win_notified(game_id):
-                        stats["skipped_notified"] += 1
-                        continue
-                    try:
-                        info = await fetch_game_info(session, game_id)
-                    except Exception:
-                        stats["fetch_errors"] += 1
-                        continue
-                    if not clan_won_game(info):
-                        continue
-                    stats["wins_team"] += 1
-                    if bootstrap:
-                        await mark_win_notified(game_id)
-                        continue
-                    embed = build_win_embed(info)
-                    await channel.send(embed=embed)
-                    await mark_win_notified(game_id)
-                    stats["sent_team"] += 1
-
-                ffa_players = await get_ffa_players()
-                for discord_id, pseudo, player_id in ffa_players:
-                    try:
-                        player_sessions = await fetch_player_sessions(player_id)
-                    except Exception:
-                        stats["fetch_errors"] += 1
-                        continue
-                    for ps in player_sessions:
-                        if not is_ffa_session(ps):
-                            continue
-                        if not ps.get("hasWon"):
-                            continue
-                        session_time = get_session_time(ps)
-                        if not session_time:
-                            continue
-                        if session_time < start_dt or session_time > end_dt:
-                            continue
-                        game_id = get_session_game_id(ps)
-                        if not game_id:
-                            stats["missing_game_id"] += 1
-                            continue
-                        if await is_ffa_win_notified(player_id, game_id):
-                            stats["skipped_notified"] += 1
-                            continue
-                        stats["wins_ffa"] += 1
-                        embed = build_ffa_win_embed(pseudo, player_id, ps, game_id, discord_id)
-                        await channel.send(embed=embed)
-                        await mark_ffa_win_notified(player_id, game_id)
-                        stats["sent_ffa"] += 1
-        except Exception as exc:
-            error_text = str(exc)[:500]
-            print(f"Win notify failed: {exc}")
-        finally:
-            scan_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-            await set_last_win_notify_stats(
-                scan_at,
-                stats["sessions"],
-                stats["wins_team"] + stats["wins_ffa"],
-                stats["sent_team"] + stats["sent_ffa"],
-                stats["skipped_notified"],
-                stats["missing_game_id"],
-                stats["fetch_errors"],
-                error_text,
-            )
+        iteration_start = time.monotonic()
+        with log_span("loop", "win_notify") as span:
+            try:
+                channel = bot.get_channel(int(WIN_NOTIFY_CHANNEL_ID)) or await bot.fetch_channel(
+                    int(WIN_NOTIFY_CHANNEL_ID)
+                )
+                channel_error = get_notify_channel_error(channel)
+                if channel_error:
+                    raise RuntimeError(channel_error)
+                end_dt = datetime.now(timezone.utc)
+                start_dt = end_dt - timedelta(hours=WIN_NOTIFY_RANGE_HOURS)
+                start_iso = start_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+                end_iso = end_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+                headers = {"User-Agent": USER_AGENT}
+                async with create_openfront_session(headers) as session:
+                    with log_span("step", "team_wins"):
+                        sessions = await fetch_clan_sessions(session, start_iso, end_iso)
+                        stats["sessions"] = len(sessions)
+                        for s in sessions:
+                            game_id = s.get("gameId")
+                            if not game_id:
+                                stats["missing_game_id"] += 1
+                                continue
+                            if await is_win_notified(game_id):
+                                stats["skipped_notified"] += 1
+                                continue
+                            try:
+                                info = await fetch_game_info(session, game_id)
+                            except Exception:
+                                stats["fetch_errors"] += 1
+                                continue
+                            if not clan_won_game(info):
+                                continue
+                            stats["wins_team"] += 1
+                            if bootstrap:
+                                await mark_win_notified(game_id)
+                                continue
+                            embed = build_win_embed(info)
+                            await channel.send(embed=embed)
+                            DISCORD_MESSAGES.inc(action="send", source="win_notify")
+                            await mark_win_notified(game_id)
+                            stats["sent_team"] += 1
+
+                    with log_span("step", "ffa_wins"):
+                        ffa_players = await get_ffa_players()
+                        for discord_id, pseudo, player_id in ffa_players:
+                            try:
+                                player_sessions = await fetch_player_sessions(player_id)
+                            except Exception:
+                                stats["fetch_errors"] += 1
+                                continue
+                            for ps in player_sessions:
+                                if not is_ffa_session(ps):
+                                    continue
+                                if not ps.get("hasWon"):
+                                    continue
+                                session_time = get_session_time(ps)
+                                if not session_time:
+                                    continue
+                                if session_time < start_dt or session_time > end_dt:
+                                    continue
+                                game_id = get_session_game_id(ps)
+                                if not game_id:
+                                    stats["missing_game_id"] += 1
+                                    continue
+                                if await is_ffa_win_notified(player_id, game_id):
+                                    stats["skipped_notified"] += 1
+                                    continue
+                                stats["wins_ffa"] += 1
+                                embed = build_ffa_win_embed(pseudo, player_id, ps, game_id, discord_id)
+                                await channel.send(embed=embed)
+                                DISCORD_MESSAGES.inc(action="send", source="win_notify")
+                                await mark_ffa_win_notified(player_id, game_id)
+                                stats["sent_ffa"] += 1
+                pruned = await prune_win_notifications()
+                if pruned:
+                    log_event("win_notifications_pruned", pruned=pruned)
+            except Exception as exc:
+                error_text = str(exc)[:500]
+                log_exception("win_notify_failed", exc)
+            finally:
+                LOOP_ITERATION_SECONDS.observe(time.monotonic() - iteration_start, loop="win_notify")
+                span.counters.update(stats)
+                scan_at = datetime.now(timezone.utc)
+                await set_last_win_notify_stats(
+                    scan_at,
+                    stats["sessions"],
+                    stats["wins_team"] + stats["wins_ffa"],
+                    stats["sent_team"] + stats["sent_ffa"],
+                    stats["skipped_notified"],
+                    stats["missing_game_id"],
+                    stats["fetch_errors"],
+                    error_text,
+                )
         bootstrap = False
         await asyncio.sleep(WIN_NOTIFY_POLL_SECONDS)
 
@@ -3828,7 +3034,7 @@ async def run_win_notify_once(force_empty: bool = False):
         "fetch_errors": 0,
     }
     error_text = None
-    async with aiohttp.ClientSession(headers=headers) as session:
+    async with create_openfront_session(headers) as session:
         sessions = await fetch_clan_sessions(session, start_iso, end_iso)
         stats["sessions"] = len(sessions)
         for s in sessions:
@@ -3849,6 +3055,7 @@ async def run_win_notify_once(force_empty: bool = False):
             stats["wins_team"] += 1
             embed = build_win_embed(info)
             await channel.send(embed=embed)
+            DISCORD_MESSAGES.inc(action="send", source="win_notify")
             await mark_win_notified(game_id)
             notified_any = True
             stats["sent_team"] += 1
@@ -3880,11 +3087,12 @@ async def run_win_notify_once(force_empty: bool = False):
                 stats["wins_ffa"] += 1
                 embed = build_ffa_win_embed(pseudo, player_id, ps, game_id, discord_id)
                 await channel.send(embed=embed)
+                DISCORD_MESSAGES.inc(action="send", source="win_notify")
                 await mark_ffa_win_notified(player_id, game_id)
                 notified_any = True
                 stats["sent_ffa"] += 1
 
-    scan_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    scan_at = datetime.now(timezone.utc)
     await set_last_win_notify_stats(
         scan_at,
         stats["sessions"],
@@ -3898,39 +3106,163 @@ async def run_win_notify_once(force_empty: bool = False):
     return {"status": "ok", "notified": notified_any, **stats}
 
 
+def collect_backfill_lag():
+    now = datetime.now(timezone.utc)
+    for pipeline, (cursor_dt, completed) in sorted(BACKFILL_PROGRESS.items()):
+        yield (pipeline,), 0 if completed else max((now - cursor_dt).total_seconds(), 0)
+
+
+def collect_db_pool_connections():
+    for lane in DB_LANES.values():
+        if lane is None:
+            continue
+        lane_stats = lane.snapshot()
+        for state in ("in_use", "idle", "waiting", "max_size"):
+            yield (lane.name, state), lane_stats[state]
+
+
+def collect_db_pool_events():
+    for lane in DB_LANES.values():
+        if lane is None:
+            continue
+        yield (lane.name, "acquired"), lane.acquired
+        yield (lane.name, "saturated"), lane.saturated
+        yield (lane.name, "timeouts"), lane.timeouts
+
+
+def collect_loop_lag():
+    summary = LOOP_MONITOR.lag_summary()
+    if not summary:
+        return
+    for stat in ("p50", "p95", "max"):
+        yield (stat,), summary[f"{stat}_ms"] / 1000
+
+
+def collect_loop_stalls():
+    yield (), LOOP_MONITOR.total_stalls
+
+
+REGISTRY.register(
+    CallbackMetric(
+        "backfill_cursor_lag_seconds",
+        "Retard du curseur de backfill sur l'heure courante.",
+        "gauge",
+        ("pipeline",),
+        collect_backfill_lag,
+    )
+)
+REGISTRY.register(
+    CallbackMetric(
+        "db_pool_connections",
+        "Connexions des pools Postgres par état.",
+        "gauge",
+        ("lane", "state"),
+        collect_db_pool_connections,
+    )
+)
+REGISTRY.register(
+    CallbackMetric(
+        "db_pool_events_total",
+        "Acquisitions, saturations et timeouts des pools Postgres.",
+        "counter",
+        ("lane", "event"),
+        collect_db_pool_events,
+    )
+)
+REGISTRY.register(
+    CallbackMetric(
+        "event_loop_lag_seconds",
+        "Retard de la boucle asyncio sur la fenêtre glissante.",
+        "gauge",
+        ("stat",),
+        collect_loop_lag,
+    )
+)
+REGISTRY.register(
+    CallbackMetric(
+        "event_loop_stalls_total",
+        "Blocages de la boucle asyncio au-delà du seuil.",
+        "counter",
+        (),
+        collect_loop_stalls,
+    )
+)
+
+
 @bot.event
-async def on_ready():
+async def setup_hook():
     await init_db()
+    await start_metrics_server()
+    await load_managed_messages()
+    await load_mod_permissions()
+    await load_guild_config()
+    await load_ofm_channels()
+    await load_ofm_participants()
+    start_chart_pool()
+    bot.loop.create_task(load_seen_games_filters())
+    bot.add_view(LeaderboardView(1, 20))
+    bot.add_view(LeaderboardFfaView(1, 20))
+    bot.add_view(Leaderboard1v1View(1, 20))
+    bot.add_view(OFMInscriptionView())
+    bot.add_view(OFMReviewView())
+    bot.add_view(OFMConfigView())
+    bot.add_view(ModAdminPanelView())
+    LOOP_SUPERVISOR.start("backfill", backfill_loop, bot.wait_until_ready)
+    LOOP_SUPERVISOR.start("live", live_loop, bot.wait_until_ready)
+    LOOP_SUPERVISOR.start("backfill_1v1", backfill_1v1_loop, bot.wait_until_ready)
+    LOOP_SUPERVISOR.start("live_1v1", live_1v1_loop, bot.wait_until_ready)
+    if WIN_NOTIFY_CHANNEL_ID:
+        LOOP_SUPERVISOR.start("win_notify", win_notify_loop, bot.wait_until_ready)
+    ACTION_SCHEDULER.register(ACTION_UNBAN, run_scheduled_unban)
+    LOOP_SUPERVISOR.start("scheduler", ACTION_SCHEDULER.run, bot.wait_until_ready)
+    LOOP_SUPERVISOR.start("loop_monitor", LOOP_MONITOR.run)
+
+
+@bot.event
+async def on_ready():
+    global STARTUP_DONE
+    # on_ready fires again after every gateway reconnect; the one-time work below must not.
+    if STARTUP_DONE:
+        log_event("bot_reconnected", user=str(bot.user))
+        return
+    STARTUP_DONE = True
     try:
         if GUILD_ID:
             guild = discord.Object(id=int(GUILD_ID))
             await bot.tree.sync(guild=guild)
             await bot.tree.sync(guild=None)
-            print(f"Commands synced for guild {GUILD_ID}")
+            log_event("commands_synced", guild_id=GUILD_ID)
         else:
             await bot.tree.sync()
-            print("Commands synced globally")
+            log_event("commands_synced", guild_id=None)
     except Exception as exc:
-        print(f"Command sync error: {exc}")
+        log_exception("command_sync_failed", exc)
 
-    bot.add_view(LeaderboardView(1, 20))
-    bot.add_view(LeaderboardFfaView(1, 20))
-    bot.add_view(Leaderboard1v1View(1, 20))
-    bot.add_view(OFMInscriptionView())
-    bot.add_view(OFMReviewView())
-    bot.add_view(OFMConfigView())
-    bot.add_view(ModAdminPanelView())
     for guild in bot.guilds:
+        bot.loop.create_task(reconcile_ofm_channels(guild))
         bot.loop.create_task(update_ofm_board(guild))
         bot.loop.create_task(update_ofm_admin_panel(guild))
         bot.loop.create_task(update_mod_admin_panel(guild))
-    bot.loop.create_task(backfill_loop())
-    bot.loop.create_task(live_loop())
-    bot.loop.create_task(backfill_1v1_loop())
-    bot.loop.create_task(live_1v1_loop())
-    if WIN_NOTIFY_CHANNEL_ID:
-        bot.loop.create_task(win_notify_loop())
-    print(f"Bot connected: {bot.user}")
+    log_event("bot_connected", user=str(bot.user), guilds=len(bot.guilds))
+
+
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    COMMAND_METRICS.record_interaction(command.qualified_name, "commande", interaction)
+    span = interaction.extras.get("log_span")
+    if span:
+        span.finish()
+
+
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    name = interaction.command.qualified_name if interaction.command else "inconnue"
+    COMMAND_METRICS.record_interaction(name, "commande", interaction, error=True)
+    span = interaction.extras.get("log_span")
+    if span:
+        span.fail(error)
+        span.finish()
+    await app_commands.CommandTree.on_error(bot.tree, interaction, error)
 
 
 @bot.event
@@ -3943,6 +3275,14 @@ async def on_http_ratelimit(data):
         LAST_HTTP_RATELIMIT_PATH = None
 
 
+@bot.event
+async def on_guild_channel_delete(channel):
+    cached = MOD_LOG_CHANNELS.get(channel.guild.id)
+    if cached is not None and cached.id == channel.id:
+        MOD_LOG_CHANNELS.pop(channel.guild.id, None)
+    await clear_ofm_channel(channel.guild.id, channel.id)
+
+
 @bot.tree.command(name="inscriptionofm", description="Inscription tournoi OFM.")
 async def inscription_ofm(interaction: discord.Interaction):
     embed = discord.Embed(
@@ -3979,7 +3319,7 @@ async def removeofm(interaction: discord.Interaction, user: discord.Member):
         "removed",
         team_role.id if team_role else None,
     )
-    await update_ofm_board(interaction.guild)
+    request_ofm_board_refresh(interaction.guild)
     await interaction.response.send_message(
         f"✅ {user.mention} a été retiré du tournoi OFM.",
         ephemeral=True,
@@ -4028,7 +3368,8 @@ async def resyncleaderboards(interaction: discord.Interaction):
     try:
         result = await resync_leaderboards(interaction.guild)
         ffa = result.get("ffa") or {}
-        ffa_updated = result.get("ffa_updated") or "inconnue"
+        ffa_updated = result.get("ffa_updated")
+        ffa_updated = format_local_time(ffa_updated) if ffa_updated else "inconnue"
         onev1_cached_at = result.get("onev1_cached_at")
         onev1_text = onev1_cached_at.strftime("%Y-%m-%d %H:%M") if onev1_cached_at else "inconnue"
         ffa_msg = result.get("ffa_message") or {}
@@ -4068,7 +3409,7 @@ async def setleaderboardffaid(interaction: discord.Interaction, message_id: str)
     if not msg or not channel:
         await interaction.followup.send("Message introuvable dans le serveur.", ephemeral=True)
         return
-    await set_leaderboard_message_ffa(interaction.guild.id, channel.id, msg.id)
+    await set_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD_FFA, channel.id, msg.id)
     await interaction.followup.send("✅ Leaderboard FFA lié.", ephemeral=True)
 
 
@@ -4089,7 +3430,7 @@ async def setleaderboardid(interaction: discord.Interaction, message_id: str):
     if not msg or not channel:
         await interaction.followup.send("Message introuvable dans le serveur.", ephemeral=True)
         return
-    await set_leaderboard_message(interaction.guild.id, channel.id, msg.id)
+    await set_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD, channel.id, msg.id)
     await interaction.followup.send("✅ Leaderboard principal lié.", ephemeral=True)
 
 
@@ -4110,13 +3451,18 @@ async def setleaderboard1v1galid(interaction: discord.Interaction, message_id: s
     if not msg or not channel:
         await interaction.followup.send("Message introuvable dans le serveur.", ephemeral=True)
         return
-    await set_leaderboard_message_1v1_gal(interaction.guild.id, channel.id, msg.id)
+    await set_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD_1V1_GAL, channel.id, msg.id)
     await interaction.followup.send("✅ Leaderboard 1v1 [GAL] lié.", ephemeral=True)
 
 
 @bot.tree.command(name="compare", description="Comparer deux joueurs enregistrés.")
-@app_commands.describe(player1="Joueur 1", player2="Joueur 2")
-async def compare(interaction: discord.Interaction, player1: discord.Member, player2: discord.Member):
+@app_commands.describe(player1="Joueur 1", player2="Joueur 2", hires="Graphique haute résolution")
+async def compare(
+    interaction: discord.Interaction,
+    player1: discord.Member,
+    player2: discord.Member,
+    hires: bool = False,
+):
     if not interaction.guild:
         await interaction.response.send_message("Commande disponible uniquement sur un serveur.", ephemeral=True)
         return
@@ -4130,21 +3476,30 @@ async def compare(interaction: discord.Interaction, player1: discord.Member, pla
         )
         return
     try:
-        sessions1 = await fetch_player_sessions(rec1["player_id"])
-        sessions2 = await fetch_player_sessions(rec2["player_id"])
+        stats1 = await get_player_ffa_summary(rec1["player_id"])
+        stats2 = await get_player_ffa_summary(rec2["player_id"])
     except Exception as exc:
         await interaction.followup.send(f"Erreur OpenFront: {exc}", ephemeral=True)
         return
-    stats1 = summarize_ffa_sessions(sessions1)
-    stats2 = summarize_ffa_sessions(sessions2)
     label1 = f"{rec1['pseudo']} ({player1.display_name})"
     label2 = f"{rec2['pseudo']} ({player2.display_name})"
-    chart = build_compare_chart(
-        {"name": label1, "stats": stats1},
-        {"name": label2, "stats": stats2},
-        CLAN_TAG,
-    )
-    file = discord.File(chart, filename="compare.png")
+    try:
+        chart = await render_compare_chart(
+            {"name": label1, "stats": stats1, "player_id": rec1["player_id"]},
+            {"name": label2, "stats": stats2, "player_id": rec2["player_id"]},
+            CLAN_TAG,
+            hires=hires,
+        )
+    except asyncio.TimeoutError:
+        await interaction.followup.send(
+            "Le graphique prend trop de temps à se générer.",
+            ephemeral=True,
+        )
+        return
+    except Exception as exc:
+        await interaction.followup.send(f"Erreur graphique: {exc}", ephemeral=True)
+        return
+    file = discord.File(BytesIO(chart), filename="compare.png")
     embed = discord.Embed(
         title=f"Comparatif [GAL] {rec1['pseudo']} vs {rec2['pseudo']}",
         description="Comparaison basée sur les stats OpenFront FFA.",
@@ -4164,8 +3519,9 @@ async def warn(interaction: discord.Interaction, member: discord.Member, reason:
     if err:
         await interaction.response.send_message(err, ephemeral=True)
         return
-    record = await add_warning(interaction.guild.id, member.id, interaction.user.id, reason)
-    await add_mod_action(interaction.guild.id, member.id, interaction.user.id, "warn", reason)
+    async with transaction() as conn:
+        record = await add_warning(interaction.guild.id, member.id, interaction.user.id, reason, conn=conn)
+        await add_mod_action(interaction.guild.id, member.id, interaction.user.id, "warn", reason, conn=conn)
     await send_mod_log(
         interaction.guild,
         build_mod_log_embed("warn", member, interaction.user, reason),
@@ -4205,8 +3561,11 @@ async def clearwarn(interaction: discord.Interaction, member: discord.Member, wa
     if not await ensure_mod_permission(interaction, "clearwarn"):
         return
     if warn_id:
-        await delete_warning(interaction.guild.id, member.id, warn_id)
-        await add_mod_action(interaction.guild.id, member.id, interaction.user.id, "clearwarn", f"warn_id={warn_id}")
+        async with transaction() as conn:
+            await delete_warning(interaction.guild.id, member.id, warn_id, conn=conn)
+            await add_mod_action(
+                interaction.guild.id, member.id, interaction.user.id, "clearwarn", f"warn_id={warn_id}", conn=conn
+            )
         await send_mod_log(
             interaction.guild,
             build_mod_log_embed("clearwarn", member, interaction.user, f"warn_id={warn_id}"),
@@ -4215,8 +3574,11 @@ async def clearwarn(interaction: discord.Interaction, member: discord.Member, wa
         return
 
     async def do_clear(interaction_confirm: discord.Interaction):
-        await clear_all_warnings(interaction_confirm.guild.id, member.id)
-        await add_mod_action(interaction_confirm.guild.id, member.id, interaction_confirm.user.id, "clearwarn", "all")
+        async with transaction() as conn:
+            await clear_all_warnings(interaction_confirm.guild.id, member.id, conn=conn)
+            await add_mod_action(
+                interaction_confirm.guild.id, member.id, interaction_confirm.user.id, "clearwarn", "all", conn=conn
+            )
         await send_mod_log(
             interaction_confirm.guild,
             build_mod_log_embed("clearwarn", member, interaction_confirm.user, "all"),
@@ -4306,8 +3668,7 @@ async def ban(interaction: discord.Interaction, member: discord.Member, duration
             confirm_interaction.guild,
             build_mod_log_embed("ban", member, confirm_interaction.user, reason, seconds or None),
         )
-        if seconds:
-            bot.loop.create_task(schedule_unban(confirm_interaction.guild, member.id, seconds))
+        await schedule_unban(confirm_interaction.guild, member.id, seconds)
         await confirm_interaction.response.send_message("✅ Membre banni.", ephemeral=True)
 
     await interaction.response.send_message(
@@ -4329,6 +3690,7 @@ async def unban(interaction: discord.Interaction, user_id: str, reason: Optional
 
     async def do_unban(confirm_interaction: discord.Interaction):
         await confirm_interaction.guild.unban(discord.Object(id=target_id), reason=reason or "Unban")
+        await ACTION_SCHEDULER.cancel(confirm_interaction.guild.id, target_id, ACTION_UNBAN)
         await add_mod_action(confirm_interaction.guild.id, target_id, confirm_interaction.user.id, "unban", reason)
         await send_mod_log(
             confirm_interaction.guild,
@@ -4396,14 +3758,16 @@ async def note(interaction: discord.Interaction, member: discord.Member, note: s
 
 
 @bot.tree.command(name="setleaderboard", description="Show the clan leaderboard.")
+@deferrable()
 async def setleaderboard(interaction: discord.Interaction):
     if not interaction.guild:
-        await interaction.response.send_message("Commande disponible uniquement sur un serveur.", ephemeral=True)
+        await send_reply(interaction, "Commande disponible uniquement sur un serveur.", ephemeral=True)
         return
     
-    record = await get_leaderboard_message(interaction.guild.id)
+    record = await get_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD)
     if record:
-        await interaction.response.send_message(
+        await send_reply(
+            interaction,
             "Un leaderboard est d�j� actif sur ce serveur. Utilise /removeleaderboard.",
             ephemeral=True,
         )
@@ -4411,15 +3775,16 @@ async def setleaderboard(interaction: discord.Interaction):
     
     embed = await build_leaderboard_embed(interaction.guild, 1, 20)
     if not embed:
-        await interaction.response.send_message(
+        await send_reply(
+            interaction,
             f"No data for {CLAN_DISPLAY}. Wait for refresh.",
             ephemeral=True,
         )
         return
     
-    await interaction.response.send_message(embed=embed, view=LeaderboardView(1, 20))
-    message = await interaction.original_response()
-    await set_leaderboard_message(interaction.guild.id, interaction.channel_id, message.id)
+    message = await send_reply(interaction, embed=embed, view=LeaderboardView(1, 20))
+    message = message or await interaction.original_response()
+    await set_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD, interaction.channel_id, message.id)
 
 
 @bot.tree.command(name="register", description="Enregistre un joueur pour le leaderboard FFA.")
@@ -4460,51 +3825,36 @@ async def unregister(interaction: discord.Interaction, user_id: str):
 
 
 @bot.tree.command(name="setleaderboardffa", description="Show the FFA leaderboard.")
+@deferrable()
 async def setleaderboardffa(interaction: discord.Interaction):
     if not interaction.guild:
-        await interaction.response.send_message("Commande disponible uniquement sur un serveur.", ephemeral=True)
+        await send_reply(interaction, "Commande disponible uniquement sur un serveur.", ephemeral=True)
         return
-    await interaction.response.defer(ephemeral=False)
 
-    record = await get_leaderboard_message_ffa(interaction.guild.id)
+    record = await get_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD_FFA)
     if record:
-        await interaction.followup.send(
-            "Un leaderboard FFA est d�j� actif. Utilise /removeleaderboardffa.",
-            ephemeral=True,
-        )
-        return
-
-    embed = await build_leaderboard_ffa_embed(interaction.guild, 1, 20)
-    if not embed:
-        await interaction.followup.send(
-            f"Aucune donn�e FFA. Enregistre-toi avec /register.",
+        await send_reply(
+            interaction,
+            "Un leaderboard FFA est d\u00e9j\u00e0 actif. Utilise /removeleaderboardffa.",
             ephemeral=True,
         )
         return
 
     try:
-        try:
-            embed = await asyncio.wait_for(
-                build_leaderboard_ffa_embed(interaction.guild, 1, 20),
-                timeout=10,
-            )
-        except asyncio.TimeoutError:
-            await interaction.followup.send(
-                "Le leaderboard FFA prend trop de temps à se générer.",
-                ephemeral=True,
-            )
-            return
+        embed = await build_leaderboard_ffa_embed(interaction.guild, 1, 20)
         if not embed:
-            await interaction.followup.send(
-                f"Aucune donn\u00e9e FFA. Enregistre-toi avec /register.",
+            await send_reply(
+                interaction,
+                "Aucune donn\u00e9e FFA. Enregistre-toi avec /register.",
                 ephemeral=True,
             )
             return
-        message = await interaction.followup.send(embed=embed, view=LeaderboardFfaView(1, 20), wait=True)
-        await set_leaderboard_message_ffa(interaction.guild.id, interaction.channel_id, message.id)
+        message = await send_reply(interaction, embed=embed, view=LeaderboardFfaView(1, 20))
+        message = message or await interaction.original_response()
+        await set_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD_FFA, interaction.channel_id, message.id)
         bot.loop.create_task(refresh_ffa_stats())
     except Exception as exc:
-        await interaction.followup.send(f"Erreur leaderboard FFA: {exc}", ephemeral=True)
+        await send_reply(interaction, f"Erreur leaderboard FFA: {exc}", ephemeral=True)
 
 
 @bot.tree.command(name="removeleaderboardffa", description="Supprime le leaderboard FFA du serveur.")
@@ -4513,7 +3863,7 @@ async def removeleaderboardffa(interaction: discord.Interaction):
         await interaction.response.send_message("Commande disponible uniquement sur un serveur.", ephemeral=True)
         return
     await interaction.response.defer(ephemeral=True)
-    record = await get_leaderboard_message_ffa(interaction.guild.id)
+    record = await get_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD_FFA)
     if not record:
         channel = interaction.channel
         if isinstance(channel, discord.TextChannel):
@@ -4523,7 +3873,7 @@ async def removeleaderboardffa(interaction: discord.Interaction):
                         title = msg.embeds[0].title or ""
                         if "Leaderboard FFA" in title:
                             await msg.delete()
-                            await clear_leaderboard_message_ffa(interaction.guild.id)
+                            await clear_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD_FFA)
                             await interaction.followup.send("Leaderboard FFA supprim\u00e9.", ephemeral=True)
                             return
             except Exception:
@@ -4536,7 +3886,7 @@ async def removeleaderboardffa(interaction: discord.Interaction):
         await message.delete()
     except Exception:
         pass
-    await clear_leaderboard_message_ffa(interaction.guild.id)
+    await clear_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD_FFA)
     await interaction.followup.send("Leaderboard FFA supprim\u00e9.", ephemeral=True)
 
 
@@ -4546,7 +3896,7 @@ async def setleaderboard1v1(interaction: discord.Interaction):
         await interaction.response.send_message("Commande disponible uniquement sur un serveur.", ephemeral=True)
         return
 
-    record = await get_leaderboard_message_1v1(interaction.guild.id)
+    record = await get_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD_1V1)
     if record:
         await interaction.response.send_message(
             "Un leaderboard 1v1 est d�j� actif. Utilise /removeleaderboard1v1.",
@@ -4564,7 +3914,7 @@ async def setleaderboard1v1(interaction: discord.Interaction):
 
     await interaction.response.send_message(embed=embed, view=Leaderboard1v1View(1, 20))
     message = await interaction.original_response()
-    await set_leaderboard_message_1v1(interaction.guild.id, interaction.channel_id, message.id)
+    await set_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD_1V1, interaction.channel_id, message.id)
 
 
 @bot.tree.command(name="removeleaderboard1v1", description="Supprime le leaderboard 1v1 du serveur.")
@@ -4572,7 +3922,7 @@ async def removeleaderboard1v1(interaction: discord.Interaction):
     if not interaction.guild:
         await interaction.response.send_message("Commande disponible uniquement sur un serveur.", ephemeral=True)
         return
-    record = await get_leaderboard_message_1v1(interaction.guild.id)
+    record = await get_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD_1V1)
     if not record:
         await interaction.response.send_message("Aucun leaderboard 1v1 actif.", ephemeral=True)
         return
@@ -4582,7 +3932,7 @@ async def removeleaderboard1v1(interaction: discord.Interaction):
         await message.delete()
     except Exception:
         pass
-    await clear_leaderboard_message_1v1(interaction.guild.id)
+    await clear_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD_1V1)
     await interaction.response.send_message("Leaderboard 1v1 supprim�.", ephemeral=True)
 
 
@@ -4592,7 +3942,7 @@ async def setleaderboard1v1gal(interaction: discord.Interaction):
         await interaction.response.send_message("Commande disponible uniquement sur un serveur.", ephemeral=True)
         return
 
-    record = await get_leaderboard_message_1v1_gal(interaction.guild.id)
+    record = await get_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD_1V1_GAL)
     if record:
         await interaction.response.send_message(
             "Un leaderboard 1v1 [GAL] est d�j� actif. Utilise /removeleaderboard1v1gal.",
@@ -4610,7 +3960,7 @@ async def setleaderboard1v1gal(interaction: discord.Interaction):
 
     await interaction.response.send_message(embed=embed)
     message = await interaction.original_response()
-    await set_leaderboard_message_1v1_gal(interaction.guild.id, interaction.channel_id, message.id)
+    await set_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD_1V1_GAL, interaction.channel_id, message.id)
 
 
 @bot.tree.command(name="removeleaderboard1v1gal", description="Supprime le leaderboard 1v1 [GAL] du serveur.")
@@ -4618,7 +3968,7 @@ async def removeleaderboard1v1gal(interaction: discord.Interaction):
     if not interaction.guild:
         await interaction.response.send_message("Commande disponible uniquement sur un serveur.", ephemeral=True)
         return
-    record = await get_leaderboard_message_1v1_gal(interaction.guild.id)
+    record = await get_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD_1V1_GAL)
     if not record:
         await interaction.response.send_message("Aucun leaderboard 1v1 [GAL] actif.", ephemeral=True)
         return
@@ -4628,7 +3978,7 @@ async def removeleaderboard1v1gal(interaction: discord.Interaction):
         await message.delete()
     except Exception:
         pass
-    await clear_leaderboard_message_1v1_gal(interaction.guild.id)
+    await clear_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD_1V1_GAL)
     await interaction.response.send_message("Leaderboard 1v1 [GAL] supprim�.", ephemeral=True)
 
 
@@ -4762,7 +4112,7 @@ async def winscanstatus(interaction: discord.Interaction):
     if not stats:
         await interaction.followup.send("Aucun scan enregistré.", ephemeral=True)
         return
-    scan_at = stats["last_scan_at"] or "inconnu"
+    scan_at = format_local_time(stats["last_scan_at"]) if stats["last_scan_at"] else "inconnu"
     message = (
         f"Dernier scan: {scan_at}\n"
         f"Sessions: {stats['sessions']} | Wins: {stats['wins']} | Envoyées: {stats['sent']}\n"
@@ -4776,8 +4126,38 @@ async def winscanstatus(interaction: discord.Interaction):
 
 
 
+class CommandMetricsView(InstrumentedView):
+    def __init__(self, page: int, page_size: int = COMMAND_METRICS_PAGE_SIZE):
+        super().__init__(timeout=300)
+        self.page = page
+        self.page_size = page_size
+
+    async def update(self, interaction: discord.Interaction, page: int):
+        rows = COMMAND_METRICS.snapshot()
+        self.page = min(max(page, 1), get_total_pages(len(rows), self.page_size))
+        embed = build_command_metrics_embed(rows, self.page, self.page_size, COMMAND_METRICS.window_seconds)
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev(self, interaction: discord.Interaction, _button: discord.ui.Button):
+        await self.update(interaction, self.page - 1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, _button: discord.ui.Button):
+        await self.update(interaction, self.page + 1)
+
+
 @bot.tree.command(name="botstatus", description="Etat du bot (latence, rate limit, scans).")
-async def botstatus(interaction: discord.Interaction):
+@app_commands.describe(section="Section à afficher")
+@app_commands.choices(
+    section=[
+        app_commands.Choice(name="Général", value="general"),
+        app_commands.Choice(name="Commandes (latence, erreurs)", value="commandes"),
+        app_commands.Choice(name="Export JSON des commandes", value="json"),
+        app_commands.Choice(name="Boucle asyncio (lag, blocages)", value="boucle"),
+    ]
+)
+async def botstatus(interaction: discord.Interaction, section: str = "general"):
     await interaction.response.defer(ephemeral=True)
     if not interaction.guild:
         await interaction.followup.send("Commande disponible uniquement sur un serveur.", ephemeral=True)
@@ -4785,6 +4165,24 @@ async def botstatus(interaction: discord.Interaction):
     if not is_admin_member(interaction.user):
         await interaction.followup.send("Accès réservé fondateur/admin.", ephemeral=True)
         return
+    if section == "commandes":
+        rows = COMMAND_METRICS.snapshot()
+        embed = build_command_metrics_embed(rows, 1, COMMAND_METRICS_PAGE_SIZE, COMMAND_METRICS.window_seconds)
+        await interaction.followup.send(embed=embed, view=CommandMetricsView(1), ephemeral=True)
+        return
+    if section == "json":
+        payload = BytesIO(COMMAND_METRICS.to_json().encode("utf-8"))
+        await interaction.followup.send(file=discord.File(payload, filename="commandes.json"), ephemeral=True)
+        return
+    if section == "boucle":
+        embed = build_loop_stalls_embed(
+            LOOP_MONITOR.recent_stalls(5),
+            LOOP_MONITOR.lag_summary(),
+            LOOP_STALL_THRESHOLD_MS,
+            LOOP_MONITOR.total_stalls,
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        return
 
     now = datetime.now(timezone.utc)
     uptime = format_uptime(now - BOT_START_TIME)
@@ -4833,13 +4231,7 @@ async def botstatus(interaction: discord.Interaction):
     win_scan_text = "Aucun"
     if stats and stats.get("last_scan_at"):
         last_scan_at = stats["last_scan_at"]
-        win_scan_text = str(last_scan_at)
-        try:
-            last_dt = datetime.strptime(last_scan_at, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
-            age = format_uptime(now - last_dt)
-            win_scan_text = f"{last_scan_at} (il y a {age})"
-        except Exception:
-            pass
+        win_scan_text = f"{format_local_time(last_scan_at)} (il y a {format_uptime(now - last_scan_at)})"
 
     embed = discord.Embed(
         title="Etat du bot",
@@ -4855,17 +4247,125 @@ async def botstatus(interaction: discord.Interaction):
     embed.add_field(name="Leaderboard 1v1", value=lb_1v1_text, inline=False)
     embed.add_field(name="Leaderboard 1v1 GAL", value=lb_1v1_text, inline=False)
     embed.add_field(name="Dernier scan victoires", value=win_scan_text, inline=False)
+    chart_cache_text = (
+        f"{len(COMPARE_CHART_CACHE.items)}/{COMPARE_CHART_CACHE.max_items} graphiques "
+        f"({COMPARE_CHART_CACHE.size_bytes() // 1024} Ko)\n"
+        f"Hit ratio: {COMPARE_CHART_CACHE.hit_ratio():.0%} "
+        f"({COMPARE_CHART_CACHE.hits}/{COMPARE_CHART_CACHE.hits + COMPARE_CHART_CACHE.misses})"
+    )
+    embed.add_field(name="Cache /compare", value=chart_cache_text, inline=False)
+    filter_lines = []
+    for seen_filter in (PROCESSED_GAMES_FILTER, PROCESSED_GAMES_1V1_FILTER):
+        if not seen_filter.is_ready():
+            filter_lines.append(f"{seen_filter.name}: en construction")
+            continue
+        filter_lines.append(
+            f"{seen_filter.name}: {seen_filter.bloom.count} ids ({seen_filter.bloom.size_bytes() // 1024} Ko), "
+            f"{seen_filter.skip_ratio():.0%} des vérifications sans requête"
+        )
+    embed.add_field(name="Filtre parties vues", value="\n".join(filter_lines), inline=False)
+    listing_text = (
+        f"Listées: {ONEV1_LISTING_STATS['listed']} | Écartées sans fetch: {ONEV1_LISTING_STATS['rejected']}\n"
+        f"Fetchées: {ONEV1_LISTING_STATS['fetched']} (dont non 1v1: {ONEV1_LISTING_STATS['fetched_not_1v1']})"
+    )
+    embed.add_field(name="Pré-filtre 1v1", value=listing_text, inline=False)
+    pool_lines = []
+    for lane in DB_LANES.values():
+        if lane is None:
+            continue
+        lane_stats = lane.snapshot()
+        pool_lines.append(
+            f"{lane_stats['name']}: {lane_stats['in_use']}/{lane_stats['max_size']} utilisées, "
+            f"{lane_stats['waiting']} en attente (pic {lane_stats['peak_in_use']})\n"
+            f"  attente moy. {lane_stats['avg_wait_ms']:.1f} ms, max {lane_stats['max_wait_ms']:.0f} ms, "
+            f"saturé {lane_stats['saturated']}x, timeouts {lane_stats['timeouts']}"
+        )
+    embed.add_field(name="Pools Postgres", value="\n".join(pool_lines) or "Non initialisés", inline=False)
+    loop_lines = []
+    for loop in LOOP_SUPERVISOR.snapshot():
+        line = f"{loop['name']}: {loop['status']} (redémarrages: {loop['restarts']})"
+        if loop["next_restart_at"] and loop["next_restart_at"] > now:
+            line += f", relance dans {format_uptime(loop['next_restart_at'] - now)}"
+        if loop["last_error"]:
+            line += f"\n  ↳ {loop['last_error'][:120]}"
+        loop_lines.append(line)
+    embed.add_field(name="Tâches de fond", value="\n".join(loop_lines) or "Aucune", inline=False)
+    latency_lines = [
+        f"{row['name']}: {row['count']} appels, {row['deferred']} différés, "
+        f"p95 {row['p95_ms']:.0f} ms, max {row['max_ms']:.0f} ms"
+        for row in COMMAND_METRICS.snapshot()
+        if row["deferred"]
+    ]
+    embed.add_field(name="Réponses différées", value="\n".join(latency_lines) or "Aucune", inline=False)
+    loop_text = format_loop_lag(LOOP_MONITOR.lag_summary())
+    stall_lines = [
+        f"{format_local_time(stall['at'])} — {stall['blocked_ms']:.0f} ms dans {stall_culprit(stall)}"
+        for stall in LOOP_MONITOR.recent_stalls(3)
+    ]
+    if stall_lines:
+        loop_text += f"\nBlocages > {LOOP_STALL_THRESHOLD_MS} ms: {LOOP_MONITOR.total_stalls}\n" + "\n".join(stall_lines)
+    embed.add_field(name="Boucle asyncio", value=loop_text[:1024], inline=False)
+
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
 
+@bot.tree.command(name="apitraces", description="Requêtes OpenFront les plus lentes (DNS, connexion, serveur, corps).")
+@app_commands.describe(endpoint="Filtrer sur un endpoint", limit="Nombre de requêtes (1-15)")
+@app_commands.choices(
+    endpoint=[
+        app_commands.Choice(name="Partie", value="game"),
+        app_commands.Choice(name="Liste des parties", value="games"),
+        app_commands.Choice(name="Sessions du clan", value="clan_sessions"),
+        app_commands.Choice(name="Sessions joueur", value="player_sessions"),
+        app_commands.Choice(name="Leaderboard 1v1", value="leaderboard_1v1"),
+    ]
+)
+async def apitraces(interaction: discord.Interaction, endpoint: Optional[str] = None, limit: int = 10):
+    await interaction.response.defer(ephemeral=True)
+    if not interaction.guild:
+        await interaction.followup.send("Commande disponible uniquement sur un serveur.", ephemeral=True)
+        return
+    if not is_admin_member(interaction.user):
+        await interaction.followup.send("Accès réservé fondateur/admin.", ephemeral=True)
+        return
+    limit = min(max(limit, 1), 15)
+    traces = slowest_traces(limit, endpoint)
+    embed = build_openfront_traces_embed(traces, len(OPENFRONT_TRACES), endpoint)
     await interaction.followup.send(embed=embed, ephemeral=True)
 
 
+@bot.tree.command(name="profil", description="Profilage par échantillonnage du bot pendant N secondes (admin).")
+@app_commands.describe(
+    secondes="Durée du profilage",
+    tous_threads="Inclure les threads hors boucle asyncio (logs, exécuteurs, watchdog)",
+)
+async def profil(interaction: discord.Interaction, secondes: int = 30, tous_threads: bool = False):
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    if not interaction.guild:
+        await interaction.followup.send("Commande disponible uniquement sur un serveur.", ephemeral=True)
+        return
+    if not is_admin_member(interaction.user):
+        await interaction.followup.send("Accès réservé fondateur/admin.", ephemeral=True)
+        return
+    secondes = min(max(secondes, 1), PROFILER_MAX_SECONDS)
+    report = await PROFILER.profile(secondes, tous_threads)
+    if report is None:
+        await interaction.followup.send("Un profilage est déjà en cours.", ephemeral=True)
+        return
+    embed = build_profile_embed(report, top_functions(report, 10), top_tasks(report, 8))
+    payload = BytesIO(collapsed_stacks(report).encode("utf-8"))
+    await interaction.followup.send(
+        embed=embed,
+        file=discord.File(payload, filename=f"profil-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.folded"),
+        ephemeral=True,
+    )
+
+
 @bot.tree.command(name="resetwinsnotify", description="Réinitialise les victoires déjà notifiées.")
 async def resetwinsnotify(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
     try:
-        async with pool.acquire() as conn:
-            await conn.execute("TRUNCATE TABLE win_notifications")
-            await conn.execute("TRUNCATE TABLE ffa_win_notifications")
+        await reset_win_notifications()
     except Exception as exc:
         await interaction.followup.send(f"Erreur: {exc}", ephemeral=True)
         return
@@ -4933,7 +4433,7 @@ async def winsessionsdebug(interaction: discord.Interaction):
     start_iso = start_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
     end_iso = end_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
     try:
-        async with aiohttp.ClientSession(headers={"User-Agent": USER_AGENT}) as session:
+        async with create_openfront_session({"User-Agent": USER_AGENT}) as session:
             sessions = await fetch_clan_sessions(session, start_iso, end_iso)
     except Exception as exc:
         await interaction.followup.send(f"Erreur API: {exc}", ephemeral=True)
@@ -4943,7 +4443,7 @@ async def winsessionsdebug(interaction: discord.Interaction):
     wins = sum(1 for s in sessions if s.get("hasWon"))
     samples = []
     try:
-        async with aiohttp.ClientSession(headers={"User-Agent": USER_AGENT}) as game_session:
+        async with create_openfront_session({"User-Agent": USER_AGENT}) as game_session:
             for s in sessions[:5]:
                 game_id = s.get("gameId") or "?"
                 has_won = s.get("hasWon")
@@ -4975,7 +4475,7 @@ async def winsessionsdebug(interaction: discord.Interaction):
 async def wingamedebug(interaction: discord.Interaction, game_id: str):
     await interaction.response.defer(ephemeral=True)
     try:
-        async with aiohttp.ClientSession(headers={"User-Agent": USER_AGENT}) as session:
+        async with create_openfront_session({"User-Agent": USER_AGENT}) as session:
             info = await fetch_game_info(session, game_id)
     except Exception as exc:
         await interaction.followup.send(f"Erreur API: {exc}", ephemeral=True)
@@ -5021,7 +4521,7 @@ async def removeleaderboard(interaction: discord.Interaction):
     if not interaction.guild:
         await interaction.response.send_message("Commande disponible uniquement sur un serveur.", ephemeral=True)
         return
-    record = await get_leaderboard_message(interaction.guild.id)
+    record = await get_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD)
     if not record:
         await interaction.response.send_message("Aucun leaderboard actif.", ephemeral=True)
         return
@@ -5031,7 +4531,7 @@ async def removeleaderboard(interaction: discord.Interaction):
         await message.delete()
     except Exception:
         pass
-    await clear_leaderboard_message(interaction.guild.id)
+    await clear_managed_message(interaction.guild.id, MESSAGE_LEADERBOARD)
     await interaction.response.send_message("Leaderboard supprim�.", ephemeral=True)
 
 
@@ -5086,33 +4586,23 @@ async def stats_progress(interaction: discord.Interaction):
 @bot.tree.command(name="reset_leaderboard", description="R�initialise le leaderboard (Postgres).")
 async def reset_leaderboard(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
-    async with pool.acquire() as conn:
-        await conn.execute("TRUNCATE TABLE player_stats")
-        await conn.execute("TRUNCATE TABLE processed_games")
-        await conn.execute(
-            """
-            INSERT INTO backfill_state (id, cursor, completed, last_attempt, last_error, last_sessions, last_games_processed)
-            VALUES (1, $1, FALSE, NULL, NULL, 0, 0)
-            ON CONFLICT (id) DO UPDATE SET
-                cursor = EXCLUDED.cursor,
-                completed = FALSE,
-                last_attempt = NULL,
-                last_error = NULL,
-                last_sessions = 0,
-                last_games_processed = 0
-            """,
-            BACKFILL_START,
-        )
+    await reset_leaderboard_data(BACKFILL_START)
     await interaction.followup.send(
         f"OK: leaderboard r�initialis�. Nouveau d�part: {BACKFILL_START}",
         ephemeral=True,
     )
 
 
-if __name__ == "__main__":
+def main():
     if not TOKEN:
         raise ValueError("DISCORD_TOKEN missing.")
     if not DB_URL:
         raise ValueError("DATABASE_URL missing (Postgres).")
-bot.run(TOKEN)
+    setup_logging()
+    # discord.py's own handler is skipped so its records go through the same queue and formatter.
+    bot.run(TOKEN, log_handler=None)
+
+
+if __name__ == "__main__":
+    main()
 
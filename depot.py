@@ -0,0 +1,1115 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Optional
+
+from parametres import DB_URL
+from base_donnees import create_pool_lanes
+from filtre_bloom import PROCESSED_GAMES_FILTER, PROCESSED_GAMES_1V1_FILTER
+from migrations import run_migrations
+from journalisation import log_event
+
+
+INTERACTIVE_LANE = "interactif"
+INGEST_LANE = "ingestion"
+DB_LANES = {INTERACTIVE_LANE: None, INGEST_LANE: None}
+
+MESSAGE_LEADERBOARD = "leaderboard"
+MESSAGE_LEADERBOARD_FFA = "leaderboard_ffa"
+MESSAGE_LEADERBOARD_1V1 = "leaderboard_1v1"
+MESSAGE_LEADERBOARD_1V1_GAL = "leaderboard_1v1_gal"
+MESSAGE_OFM_BOARD = "ofm_board"
+MESSAGE_OFM_ADMIN_PANEL = "ofm_admin_panel"
+MESSAGE_MOD_ADMIN_PANEL = "mod_admin_panel"
+# guild_id -> {kind: {"channel_id", "message_id", "content_hash"}}, loaded once then written through.
+MANAGED_MESSAGES = {}
+MANAGED_MESSAGES_STATE = {"loaded": False}
+# guild_id -> {command: {role_id, ...}} for allowed rows only, loaded once then written through.
+MOD_PERMISSIONS = {}
+MOD_PERMISSIONS_STATE = {"loaded": False}
+# guild_id -> {"mod_config": dict or None, "ofm_team_name": str or None}, loaded once then written through.
+GUILD_CONFIG = {}
+GUILD_CONFIG_STATE = {"loaded": False}
+# guild_id -> {user_id: channel_id} for OFM candidature channels, loaded once then written through.
+OFM_CHANNELS = {}
+OFM_CHANNELS_STATE = {"loaded": False}
+# guild_id -> {user_id: participant}, ordered by last update like the board, loaded once then written through.
+OFM_ROSTERS = {}
+OFM_ROSTERS_STATE = {"loaded": False}
+
+
+async def init_db():
+    if DB_LANES[INTERACTIVE_LANE] is not None:
+        return
+    if not DB_URL:
+        raise ValueError("DATABASE_URL manquant (Postgres).")
+    DB_LANES[INTERACTIVE_LANE], DB_LANES[INGEST_LANE] = await create_pool_lanes(DB_URL)
+    applied = await run_migrations(DB_URL)
+    for name in applied:
+        log_event("migration_applied", migration=name)
+
+
+@asynccontextmanager
+async def connection(conn=None, lane: str = INTERACTIVE_LANE):
+    # Helpers take an optional conn so several of them can share one connection (and one
+    # transaction); without it they borrow a connection from the requested lane.
+    if conn is not None:
+        yield conn
+        return
+    async with DB_LANES[lane].acquire() as acquired:
+        yield acquired
+
+
+@asynccontextmanager
+async def transaction(conn=None, lane: str = INTERACTIVE_LANE):
+    async with connection(conn, lane) as conn:
+        async with conn.transaction():
+            yield conn
+
+
+# Every query lives here under a stable name. asyncpg prepares each distinct statement once per
+# connection and reuses it from its statement cache, so these behave as named prepared statements.
+SQL = {
+    "get_backfill_state": """
+        SELECT cursor, completed, last_attempt, last_error, last_sessions, last_games_processed
+        FROM backfill_state WHERE id = 1
+        """,
+    "set_backfill_state": """
+        INSERT INTO backfill_state (
+            id, cursor, completed, last_attempt, last_error, last_sessions, last_games_processed
+        )
+        VALUES (1, $1, $2, $3, $4, $5, $6)
+        ON CONFLICT (id) DO UPDATE SET
+            cursor = EXCLUDED.cursor,
+            completed = EXCLUDED.completed,
+            last_attempt = EXCLUDED.last_attempt,
+            last_error = EXCLUDED.last_error,
+            last_sessions = EXCLUDED.last_sessions,
+            last_games_processed = EXCLUDED.last_games_processed
+        """,
+    "is_game_processed": "SELECT 1 FROM processed_games WHERE game_id = $1",
+    "get_backfill_state_1v1": """
+        SELECT cursor, completed, last_attempt, last_error
+        FROM backfill_state_1v1 WHERE id = 1
+        """,
+    "set_backfill_state_1v1": """
+        INSERT INTO backfill_state_1v1 (id, cursor, completed, last_attempt, last_error)
+        VALUES (1, $1, $2, $3, $4)
+        ON CONFLICT (id) DO UPDATE SET
+            cursor = EXCLUDED.cursor,
+            completed = EXCLUDED.completed,
+            last_attempt = EXCLUDED.last_attempt,
+            last_error = EXCLUDED.last_error
+        """,
+    "mark_game_processed": "INSERT INTO processed_games (game_id) VALUES ($1) ON CONFLICT DO NOTHING",
+    "upsert_player": """
+        INSERT INTO player_stats (
+            username, display_name, wins_ffa, losses_ffa, wins_team, losses_team, updated_at
+        ) VALUES ($1, $2, $3, $4, $5, $6, $7)
+        ON CONFLICT(username) DO UPDATE SET
+            display_name = EXCLUDED.display_name,
+            wins_ffa = player_stats.wins_ffa + EXCLUDED.wins_ffa,
+            losses_ffa = player_stats.losses_ffa + EXCLUDED.losses_ffa,
+            wins_team = player_stats.wins_team + EXCLUDED.wins_team,
+            losses_team = player_stats.losses_team + EXCLUDED.losses_team,
+            updated_at = EXCLUDED.updated_at
+        """,
+    "upsert_ffa_player": """
+        INSERT INTO ffa_players (discord_id, pseudo, player_id)
+        VALUES ($1, $2, $3)
+        ON CONFLICT (discord_id) DO UPDATE SET
+            pseudo = EXCLUDED.pseudo,
+            player_id = EXCLUDED.player_id
+        """,
+    "upsert_ffa_stats": """
+        INSERT INTO ffa_stats (player_id, pseudo, wins_ffa, losses_ffa, updated_at)
+        VALUES ($1, $2, $3, $4, $5)
+        ON CONFLICT (player_id) DO UPDATE SET
+            pseudo = EXCLUDED.pseudo,
+            wins_ffa = EXCLUDED.wins_ffa,
+            losses_ffa = EXCLUDED.losses_ffa,
+            updated_at = EXCLUDED.updated_at
+        """,
+    "get_ffa_players": "SELECT discord_id, pseudo, player_id FROM ffa_players",
+    "get_ffa_player": "SELECT discord_id, pseudo, player_id FROM ffa_players WHERE discord_id = $1",
+    "get_ffa_player_by_player_id": "SELECT discord_id, pseudo, player_id FROM ffa_players WHERE player_id = $1",
+    "delete_ffa_player": "DELETE FROM ffa_players WHERE discord_id = $1 RETURNING player_id",
+    "delete_ffa_stats_by_player_id": "DELETE FROM ffa_stats WHERE player_id = $1",
+    "is_game_processed_1v1": "SELECT 1 FROM processed_games_1v1 WHERE game_id = $1",
+    "mark_game_processed_1v1": "INSERT INTO processed_games_1v1 (game_id) VALUES ($1) ON CONFLICT DO NOTHING",
+    "is_win_notified": "SELECT 1 FROM win_notifications WHERE game_id = $1",
+    "mark_win_notified": "INSERT INTO win_notifications (game_id) VALUES ($1) ON CONFLICT DO NOTHING",
+    "is_ffa_win_notified": "SELECT 1 FROM ffa_win_notifications WHERE player_id = $1 AND game_id = $2",
+    "mark_ffa_win_notified": """
+        INSERT INTO ffa_win_notifications (player_id, game_id)
+        VALUES ($1, $2)
+        ON CONFLICT DO NOTHING
+        """,
+    "get_last_empty_notify": "SELECT last_empty_at FROM win_notify_state WHERE id = 1",
+    "set_last_empty_notify": """
+        INSERT INTO win_notify_state (id, last_empty_at)
+        VALUES (1, $1)
+        ON CONFLICT (id) DO UPDATE SET
+            last_empty_at = EXCLUDED.last_empty_at
+        """,
+    "set_last_win_notify_stats": """
+        INSERT INTO win_notify_state (
+            id,
+            last_scan_at,
+            last_scan_sessions,
+            last_scan_wins,
+            last_scan_sent,
+            last_scan_skipped,
+            last_scan_missing_game_id,
+            last_scan_fetch_errors,
+            last_scan_error
+        )
+        VALUES (1, $1, $2, $3, $4, $5, $6, $7, $8)
+        ON CONFLICT (id) DO UPDATE SET
+            last_scan_at = EXCLUDED.last_scan_at,
+            last_scan_sessions = EXCLUDED.last_scan_sessions,
+            last_scan_wins = EXCLUDED.last_scan_wins,
+            last_scan_sent = EXCLUDED.last_scan_sent,
+            last_scan_skipped = EXCLUDED.last_scan_skipped,
+            last_scan_missing_game_id = EXCLUDED.last_scan_missing_game_id,
+            last_scan_fetch_errors = EXCLUDED.last_scan_fetch_errors,
+            last_scan_error = EXCLUDED.last_scan_error
+        """,
+    "get_last_win_notify_stats": """
+        SELECT
+            last_scan_at,
+            last_scan_sessions,
+            last_scan_wins,
+            last_scan_sent,
+            last_scan_skipped,
+            last_scan_missing_game_id,
+            last_scan_fetch_errors,
+            last_scan_error
+        FROM win_notify_state
+        WHERE id = 1
+        """,
+    "upsert_1v1_stats": """
+        INSERT INTO player_stats_1v1 (username, wins, losses, updated_at)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT(username) DO UPDATE SET
+            wins = player_stats_1v1.wins + EXCLUDED.wins,
+            losses = player_stats_1v1.losses + EXCLUDED.losses,
+            updated_at = EXCLUDED.updated_at
+        """,
+    "upsert_ofm_participant": """
+        INSERT INTO ofm_participants (guild_id, user_id, status, team_role_id, updated_at)
+        VALUES ($1, $2, $3, $4, CURRENT_TIMESTAMP)
+        ON CONFLICT (guild_id, user_id) DO UPDATE SET
+            status = EXCLUDED.status,
+            team_role_id = EXCLUDED.team_role_id,
+            updated_at = CURRENT_TIMESTAMP
+        """,
+    "clear_ofm_participants": "DELETE FROM ofm_participants WHERE guild_id = $1",
+    "load_ofm_participants": """
+        SELECT guild_id, user_id, status, team_role_id
+        FROM ofm_participants
+        ORDER BY updated_at, user_id
+        """,
+    "load_ofm_team_names": "SELECT guild_id, name FROM ofm_team_name",
+    "set_ofm_team_name": """
+        INSERT INTO ofm_team_name (guild_id, name)
+        VALUES ($1, $2)
+        ON CONFLICT (guild_id) DO UPDATE SET
+            name = EXCLUDED.name
+        """,
+    "add_warning": """
+        INSERT INTO mod_warnings (guild_id, user_id, moderator_id, reason)
+        VALUES ($1, $2, $3, $4)
+        RETURNING id, created_at
+        """,
+    "list_warnings": """
+        SELECT id, moderator_id, reason, created_at
+        FROM mod_warnings
+        WHERE guild_id = $1 AND user_id = $2
+        ORDER BY id DESC
+        """,
+    "delete_warning": "DELETE FROM mod_warnings WHERE guild_id = $1 AND user_id = $2 AND id = $3",
+    "clear_all_warnings": "DELETE FROM mod_warnings WHERE guild_id = $1 AND user_id = $2",
+    "add_mod_action": """
+        INSERT INTO mod_actions (guild_id, user_id, moderator_id, action_type, reason, duration_seconds)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        """,
+    "list_mod_actions": """
+        SELECT action_type, reason, duration_seconds, created_at, moderator_id
+        FROM mod_actions
+        WHERE guild_id = $1 AND user_id = $2
+        ORDER BY id DESC
+        """,
+    "set_mod_permission": """
+        INSERT INTO mod_permissions (guild_id, role_id, command, allowed)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (guild_id, role_id, command) DO UPDATE SET
+            allowed = EXCLUDED.allowed
+        """,
+    "load_mod_permissions": """
+        SELECT guild_id, role_id, command
+        FROM mod_permissions
+        WHERE allowed = TRUE
+        """,
+    "load_mod_configs": """
+        SELECT guild_id, log_channel_id, default_mute_seconds, default_ban_seconds
+        FROM mod_config
+        """,
+    "set_mod_config": """
+        INSERT INTO mod_config (guild_id, log_channel_id, default_mute_seconds, default_ban_seconds)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (guild_id) DO UPDATE SET
+            log_channel_id = COALESCE(EXCLUDED.log_channel_id, mod_config.log_channel_id),
+            default_mute_seconds = COALESCE(EXCLUDED.default_mute_seconds, mod_config.default_mute_seconds),
+            default_ban_seconds = COALESCE(EXCLUDED.default_ban_seconds, mod_config.default_ban_seconds)
+        RETURNING log_channel_id, default_mute_seconds, default_ban_seconds
+        """,
+    "add_mod_note": """
+        INSERT INTO mod_notes (guild_id, user_id, moderator_id, note)
+        VALUES ($1, $2, $3, $4)
+        """,
+    "list_mod_notes": """
+        SELECT note, moderator_id, created_at
+        FROM mod_notes
+        WHERE guild_id = $1 AND user_id = $2
+        ORDER BY id DESC
+        """,
+    "get_latest_ffa_updated_at": "SELECT MAX(updated_at) AS last_updated FROM ffa_stats",
+    "get_progress_stats": """
+        SELECT
+            COUNT(*) AS players,
+            COALESCE(SUM(wins_ffa + wins_team), 0) AS wins_total,
+            COALESCE(SUM(losses_ffa + losses_team), 0) AS losses_total
+        FROM player_stats
+        """,
+    "count_processed_games": "SELECT COUNT(*) FROM processed_games",
+    "load_player_stats": """
+        SELECT username, display_name, wins_ffa, losses_ffa, wins_team, losses_team, updated_at
+        FROM player_stats
+        """,
+    "load_ffa_stats": """
+        SELECT s.pseudo, s.wins_ffa, s.losses_ffa, s.updated_at, p.discord_id
+        FROM ffa_stats s
+        LEFT JOIN ffa_players p ON p.player_id = s.player_id
+        """,
+    "list_processed_games": "SELECT game_id FROM processed_games",
+    "list_processed_games_1v1": "SELECT game_id FROM processed_games_1v1",
+    "prune_processed_games": "DELETE FROM processed_games WHERE processed_at < $1",
+    "prune_processed_games_1v1": "DELETE FROM processed_games_1v1 WHERE processed_at < $1",
+    "prune_win_notifications": "DELETE FROM win_notifications WHERE notified_at < $1",
+    "prune_ffa_win_notifications": "DELETE FROM ffa_win_notifications WHERE notified_at < $1",
+    "lock_ofm_participant": """
+        SELECT status FROM ofm_participants
+        WHERE guild_id = $1 AND user_id = $2
+        FOR UPDATE
+        """,
+    "load_managed_messages": "SELECT guild_id, kind, channel_id, message_id, content_hash FROM managed_messages",
+    "set_managed_message": """
+        INSERT INTO managed_messages (guild_id, kind, channel_id, message_id, content_hash)
+        VALUES ($1, $2, $3, $4, $5)
+        ON CONFLICT (guild_id, kind) DO UPDATE SET
+            channel_id = EXCLUDED.channel_id,
+            message_id = EXCLUDED.message_id,
+            content_hash = EXCLUDED.content_hash
+        """,
+    "set_managed_message_hash": "UPDATE managed_messages SET content_hash = $3 WHERE guild_id = $1 AND kind = $2",
+    "clear_managed_message": "DELETE FROM managed_messages WHERE guild_id = $1 AND kind = $2",
+    "schedule_action": """
+        INSERT INTO scheduled_actions (guild_id, user_id, action, due_at)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (guild_id, user_id, action) DO UPDATE SET
+            due_at = EXCLUDED.due_at,
+            attempts = 0,
+            last_error = NULL
+        """,
+    "cancel_scheduled_action": "DELETE FROM scheduled_actions WHERE guild_id = $1 AND user_id = $2 AND action = $3",
+    "get_next_scheduled_action_at": "SELECT MIN(due_at) FROM scheduled_actions",
+    "get_due_scheduled_actions": """
+        SELECT id, guild_id, user_id, action, due_at, attempts
+        FROM scheduled_actions
+        WHERE due_at <= $1
+        ORDER BY due_at
+        LIMIT $2
+        """,
+    "complete_scheduled_action": "DELETE FROM scheduled_actions WHERE id = $1 AND due_at = $2",
+    "retry_scheduled_action": """
+        UPDATE scheduled_actions
+        SET due_at = $3, attempts = attempts + 1, last_error = $4
+        WHERE id = $1 AND due_at = $2
+        """,
+    "count_scheduled_actions": "SELECT COUNT(*) FROM scheduled_actions",
+    "load_ofm_channels": "SELECT guild_id, user_id, channel_id FROM ofm_channels",
+    "set_ofm_channel": """
+        INSERT INTO ofm_channels (guild_id, user_id, channel_id)
+        VALUES ($1, $2, $3)
+        ON CONFLICT (guild_id, user_id) DO UPDATE SET
+            channel_id = EXCLUDED.channel_id
+        """,
+    "clear_ofm_channel": "DELETE FROM ofm_channels WHERE channel_id = $1",
+    "clear_ofm_channels": "DELETE FROM ofm_channels WHERE guild_id = $1",
+    "reset_win_notifications": "TRUNCATE TABLE win_notifications, ffa_win_notifications",
+    "reset_leaderboard_stats": "TRUNCATE TABLE player_stats, processed_games",
+    "reset_backfill_state": """
+        INSERT INTO backfill_state (id, cursor, completed, last_attempt, last_error, last_sessions, last_games_processed)
+        VALUES (1, $1, FALSE, NULL, NULL, 0, 0)
+        ON CONFLICT (id) DO UPDATE SET
+            cursor = EXCLUDED.cursor,
+            completed = FALSE,
+            last_attempt = NULL,
+            last_error = NULL,
+            last_sessions = 0,
+            last_games_processed = 0
+        """,
+}
+
+
+async def get_backfill_state(conn=None):
+    async with connection(conn, INGEST_LANE) as conn:
+        row = await conn.fetchrow(SQL["get_backfill_state"])
+    return row[0], bool(row[1]), row[2], row[3], row[4], row[5]
+
+
+async def set_backfill_state(
+    cursor,
+    completed,
+    last_attempt=None,
+    last_error=None,
+    last_sessions=0,
+    last_games_processed=0,
+    conn=None,
+):
+    async with connection(conn, INGEST_LANE) as conn:
+        await conn.execute(
+            SQL["set_backfill_state"],
+            cursor,
+            completed,
+            last_attempt,
+            last_error,
+            last_sessions,
+            last_games_processed,
+        )
+
+
+async def is_game_processed(game_id: str, conn=None) -> bool:
+    if not PROCESSED_GAMES_FILTER.might_contain(game_id):
+        return False
+    async with connection(conn, INGEST_LANE) as conn:
+        row = await conn.fetchrow(
+            SQL["is_game_processed"],
+            game_id,
+        )
+    return row is not None
+
+
+async def get_backfill_state_1v1(conn=None):
+    async with connection(conn, INGEST_LANE) as conn:
+        row = await conn.fetchrow(SQL["get_backfill_state_1v1"])
+    return row[0], bool(row[1]), row[2], row[3]
+
+
+async def set_backfill_state_1v1(
+    cursor,
+    completed,
+    last_attempt=None,
+    last_error=None,
+    conn=None,
+):
+    async with connection(conn, INGEST_LANE) as conn:
+        await conn.execute(
+            SQL["set_backfill_state_1v1"],
+            cursor,
+            completed,
+            last_attempt,
+            last_error,
+        )
+
+
+async def mark_game_processed(game_id: str, conn=None):
+    async with connection(conn, INGEST_LANE) as conn:
+        await conn.execute(
+            SQL["mark_game_processed"],
+            game_id,
+        )
+    PROCESSED_GAMES_FILTER.add(game_id)
+
+
+async def upsert_player(username_key, display_name, wins_ffa, losses_ffa, wins_team, losses_team, conn=None):
+    async with connection(conn, INGEST_LANE) as conn:
+        await conn.execute(
+            SQL["upsert_player"],
+            username_key,
+            display_name,
+            wins_ffa,
+            losses_ffa,
+            wins_team,
+            losses_team,
+            datetime.now(timezone.utc),
+        )
+
+
+async def upsert_ffa_player(discord_id: int, pseudo: str, player_id: str, conn=None):
+    async with connection(conn) as conn:
+        await conn.execute(
+            SQL["upsert_ffa_player"],
+            discord_id,
+            pseudo,
+            player_id,
+        )
+
+
+async def upsert_ffa_stats(player_id: str, pseudo: str, wins: int, losses: int, conn=None):
+    async with connection(conn, INGEST_LANE) as conn:
+        await conn.execute(
+            SQL["upsert_ffa_stats"],
+            player_id,
+            pseudo,
+            wins,
+            losses,
+            datetime.now(timezone.utc),
+        )
+
+
+async def get_ffa_players(conn=None):
+    async with connection(conn) as conn:
+        return await conn.fetch(SQL["get_ffa_players"])
+
+
+async def get_ffa_player(discord_id: int, conn=None):
+    async with connection(conn) as conn:
+        return await conn.fetchrow(
+            SQL["get_ffa_player"],
+            discord_id,
+        )
+
+
+async def get_ffa_player_by_player_id(player_id: str, conn=None):
+    async with connection(conn) as conn:
+        return await conn.fetchrow(
+            SQL["get_ffa_player_by_player_id"],
+            player_id,
+        )
+
+
+async def delete_ffa_player(discord_id: int, conn=None):
+    async with connection(conn) as conn:
+        return await conn.fetchrow(
+            SQL["delete_ffa_player"],
+            discord_id,
+        )
+
+
+async def delete_ffa_stats_by_player_id(player_id: str, conn=None):
+    async with connection(conn) as conn:
+        await conn.execute(
+            SQL["delete_ffa_stats_by_player_id"],
+            player_id,
+        )
+
+
+async def is_game_processed_1v1(game_id: str, conn=None) -> bool:
+    if not PROCESSED_GAMES_1V1_FILTER.might_contain(game_id):
+        return False
+    async with connection(conn, INGEST_LANE) as conn:
+        row = await conn.fetchrow(
+            SQL["is_game_processed_1v1"],
+            game_id,
+        )
+    return row is not None
+
+
+async def mark_game_processed_1v1(game_id: str, conn=None):
+    async with connection(conn, INGEST_LANE) as conn:
+        await conn.execute(
+            SQL["mark_game_processed_1v1"],
+            game_id,
+        )
+    PROCESSED_GAMES_1V1_FILTER.add(game_id)
+
+
+async def is_win_notified(game_id: str, conn=None) -> bool:
+    async with connection(conn, INGEST_LANE) as conn:
+        row = await conn.fetchrow(
+            SQL["is_win_notified"],
+            game_id,
+        )
+    return row is not None
+
+
+async def mark_win_notified(game_id: str, conn=None):
+    async with connection(conn, INGEST_LANE) as conn:
+        await conn.execute(
+            SQL["mark_win_notified"],
+            game_id,
+        )
+
+
+async def is_ffa_win_notified(player_id: str, game_id: str, conn=None) -> bool:
+    async with connection(conn, INGEST_LANE) as conn:
+        row = await conn.fetchrow(
+            SQL["is_ffa_win_notified"],
+            player_id,
+            game_id,
+        )
+    return row is not None
+
+
+async def mark_ffa_win_notified(player_id: str, game_id: str, conn=None):
+    async with connection(conn, INGEST_LANE) as conn:
+        await conn.execute(
+            SQL["mark_ffa_win_notified"],
+            player_id,
+            game_id,
+        )
+
+
+async def get_last_empty_notify(conn=None):
+    async with connection(conn, INGEST_LANE) as conn:
+        row = await conn.fetchrow(SQL["get_last_empty_notify"])
+    return row[0] if row else None
+
+
+async def set_last_empty_notify(value: datetime, conn=None):
+    async with connection(conn, INGEST_LANE) as conn:
+        await conn.execute(
+            SQL["set_last_empty_notify"],
+            value,
+        )
+
+
+async def set_last_win_notify_stats(
+    scan_at: datetime,
+    sessions: int,
+    wins: int,
+    sent: int,
+    skipped: int,
+    missing_game_id: int,
+    fetch_errors: int,
+    error: Optional[str] = None,
+    conn=None,
+):
+    async with connection(conn, INGEST_LANE) as conn:
+        await conn.execute(
+            SQL["set_last_win_notify_stats"],
+            scan_at,
+            sessions,
+            wins,
+            sent,
+            skipped,
+            missing_game_id,
+            fetch_errors,
+            error,
+        )
+
+
+async def get_last_win_notify_stats(conn=None):
+    async with connection(conn) as conn:
+        row = await conn.fetchrow(SQL["get_last_win_notify_stats"])
+    if not row:
+        return None
+    return {
+        "last_scan_at": row[0],
+        "sessions": row[1],
+        "wins": row[2],
+        "sent": row[3],
+        "skipped": row[4],
+        "missing_game_id": row[5],
+        "fetch_errors": row[6],
+        "error": row[7],
+    }
+
+
+async def upsert_1v1_stats(username: str, wins: int, losses: int, conn=None):
+    async with connection(conn, INGEST_LANE) as conn:
+        await conn.execute(
+            SQL["upsert_1v1_stats"],
+            username,
+            wins,
+            losses,
+            datetime.now(timezone.utc),
+        )
+
+
+async def upsert_ofm_participant(
+    guild_id: int,
+    user_id: int,
+    status: str,
+    team_role_id: Optional[int] = None,
+    conn=None,
+):
+    async with connection(conn) as conn:
+        await conn.execute(
+            SQL["upsert_ofm_participant"],
+            guild_id,
+            user_id,
+            status,
+            team_role_id,
+        )
+    remember_ofm_participant(guild_id, user_id, status, team_role_id)
+
+
+def remember_ofm_participant(guild_id: int, user_id: int, status: str, team_role_id: Optional[int]):
+    roster = OFM_ROSTERS.setdefault(guild_id, {})
+    # Re-inserting moves the participant to the end, matching ORDER BY updated_at on reload.
+    roster.pop(user_id, None)
+    roster[user_id] = {"user_id": user_id, "status": status, "team_role_id": team_role_id}
+
+
+async def set_ofm_participants(guild_id: int, user_ids, status: str, team_role_id: Optional[int] = None):
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+    async with transaction() as conn:
+        await conn.executemany(
+            SQL["upsert_ofm_participant"],
+            [(guild_id, user_id, status, team_role_id) for user_id in user_ids],
+        )
+    for user_id in user_ids:
+        remember_ofm_participant(guild_id, user_id, status, team_role_id)
+    return len(user_ids)
+
+
+async def clear_ofm_participants(guild_id: int) -> int:
+    async with transaction() as conn:
+        result = await conn.execute(SQL["clear_ofm_participants"], guild_id)
+    OFM_ROSTERS.pop(guild_id, None)
+    try:
+        return int(result.split()[-1])
+    except Exception:
+        return 0
+
+
+async def load_ofm_participants(conn=None):
+    async with connection(conn) as conn:
+        rows = await conn.fetch(SQL["load_ofm_participants"])
+    OFM_ROSTERS.clear()
+    for row in rows:
+        OFM_ROSTERS.setdefault(row["guild_id"], {})[row["user_id"]] = {
+            "user_id": row["user_id"],
+            "status": row["status"],
+            "team_role_id": row["team_role_id"],
+        }
+    OFM_ROSTERS_STATE["loaded"] = True
+    return len(rows)
+
+
+async def get_ofm_participants(guild_id: int, status: Optional[str] = None, conn=None):
+    if not OFM_ROSTERS_STATE["loaded"]:
+        await load_ofm_participants(conn=conn)
+    participants = OFM_ROSTERS.get(guild_id, {}).values()
+    if status:
+        return [p for p in participants if p["status"] == status]
+    return list(participants)
+
+
+async def get_ofm_participant(guild_id: int, user_id: int, conn=None):
+    if not OFM_ROSTERS_STATE["loaded"]:
+        await load_ofm_participants(conn=conn)
+    return OFM_ROSTERS.get(guild_id, {}).get(user_id)
+
+
+async def get_ofm_team_name(guild_id: int, conn=None) -> Optional[str]:
+    return (await get_guild_config(guild_id, conn=conn))["ofm_team_name"]
+
+
+async def set_ofm_team_name(guild_id: int, name: str, conn=None):
+    async with connection(conn) as conn:
+        await conn.execute(
+            SQL["set_ofm_team_name"],
+            guild_id,
+            name,
+        )
+    GUILD_CONFIG.setdefault(guild_id, {"mod_config": None, "ofm_team_name": None})["ofm_team_name"] = name
+
+
+async def add_warning(guild_id: int, user_id: int, moderator_id: int, reason: str, conn=None):
+    async with connection(conn) as conn:
+        return await conn.fetchrow(
+            SQL["add_warning"],
+            guild_id,
+            user_id,
+            moderator_id,
+            reason,
+        )
+
+
+async def list_warnings(guild_id: int, user_id: int, conn=None):
+    async with connection(conn) as conn:
+        return await conn.fetch(
+            SQL["list_warnings"],
+            guild_id,
+            user_id,
+        )
+
+
+async def delete_warning(guild_id: int, user_id: int, warn_id: int, conn=None):
+    async with connection(conn) as conn:
+        return await conn.execute(
+            SQL["delete_warning"],
+            guild_id,
+            user_id,
+            warn_id,
+        )
+
+
+async def clear_all_warnings(guild_id: int, user_id: int, conn=None):
+    async with connection(conn) as conn:
+        return await conn.execute(
+            SQL["clear_all_warnings"],
+            guild_id,
+            user_id,
+        )
+
+
+async def add_mod_action(
+    guild_id: int,
+    user_id: int,
+    moderator_id: int,
+    action_type: str,
+    reason: Optional[str] = None,
+    duration_seconds: Optional[int] = None,
+    conn=None,
+):
+    async with connection(conn) as conn:
+        return await conn.execute(
+            SQL["add_mod_action"],
+            guild_id,
+            user_id,
+            moderator_id,
+            action_type,
+            reason,
+            duration_seconds,
+        )
+
+
+async def list_mod_actions(guild_id: int, user_id: int, conn=None):
+    async with connection(conn) as conn:
+        return await conn.fetch(
+            SQL["list_mod_actions"],
+            guild_id,
+            user_id,
+        )
+
+
+async def load_mod_permissions(conn=None):
+    async with connection(conn) as conn:
+        rows = await conn.fetch(SQL["load_mod_permissions"])
+    MOD_PERMISSIONS.clear()
+    for row in rows:
+        MOD_PERMISSIONS.setdefault(row["guild_id"], {}).setdefault(row["command"], set()).add(row["role_id"])
+    MOD_PERMISSIONS_STATE["loaded"] = True
+    return len(rows)
+
+
+async def get_mod_permissions(guild_id: int) -> dict:
+    if not MOD_PERMISSIONS_STATE["loaded"]:
+        await load_mod_permissions()
+    return MOD_PERMISSIONS.get(guild_id, {})
+
+
+async def set_mod_permission(guild_id: int, role_id: int, command: str, allowed: bool, conn=None):
+    async with connection(conn) as conn:
+        await conn.execute(
+            SQL["set_mod_permission"],
+            guild_id,
+            role_id,
+            command,
+            allowed,
+        )
+    roles = MOD_PERMISSIONS.setdefault(guild_id, {}).setdefault(command, set())
+    if allowed:
+        roles.add(role_id)
+    else:
+        roles.discard(role_id)
+
+
+async def get_allowed_commands_for_role(guild_id: int, role_id: int) -> set:
+    return {command for command, roles in (await get_mod_permissions(guild_id)).items() if role_id in roles}
+
+
+async def get_allowed_roles_for_command(guild_id: int, command: str) -> set:
+    return (await get_mod_permissions(guild_id)).get(command, set())
+
+
+async def load_guild_config(conn=None):
+    async with connection(conn) as conn:
+        mod_configs = await conn.fetch(SQL["load_mod_configs"])
+        team_names = await conn.fetch(SQL["load_ofm_team_names"])
+    GUILD_CONFIG.clear()
+    for row in mod_configs:
+        GUILD_CONFIG.setdefault(row["guild_id"], {"mod_config": None, "ofm_team_name": None})["mod_config"] = {
+            "log_channel_id": row["log_channel_id"],
+            "default_mute_seconds": row["default_mute_seconds"],
+            "default_ban_seconds": row["default_ban_seconds"],
+        }
+    for row in team_names:
+        GUILD_CONFIG.setdefault(row["guild_id"], {"mod_config": None, "ofm_team_name": None})["ofm_team_name"] = row["name"]
+    GUILD_CONFIG_STATE["loaded"] = True
+    return len(GUILD_CONFIG)
+
+
+async def get_guild_config(guild_id: int, conn=None) -> dict:
+    if not GUILD_CONFIG_STATE["loaded"]:
+        await load_guild_config(conn=conn)
+    return GUILD_CONFIG.get(guild_id) or {"mod_config": None, "ofm_team_name": None}
+
+
+async def get_mod_config(guild_id: int, conn=None) -> Optional[dict]:
+    return (await get_guild_config(guild_id, conn=conn))["mod_config"]
+
+
+async def set_mod_config(
+    guild_id: int,
+    log_channel_id: Optional[int] = None,
+    default_mute_seconds: Optional[int] = None,
+    default_ban_seconds: Optional[int] = None,
+    conn=None,
+):
+    async with connection(conn) as conn:
+        record = await conn.fetchrow(
+            SQL["set_mod_config"],
+            guild_id,
+            log_channel_id,
+            default_mute_seconds,
+            default_ban_seconds,
+        )
+    GUILD_CONFIG.setdefault(guild_id, {"mod_config": None, "ofm_team_name": None})["mod_config"] = dict(record)
+
+
+async def add_mod_note(guild_id: int, user_id: int, moderator_id: int, note: str, conn=None):
+    async with connection(conn) as conn:
+        return await conn.execute(
+            SQL["add_mod_note"],
+            guild_id,
+            user_id,
+            moderator_id,
+            note,
+        )
+
+
+async def list_mod_notes(guild_id: int, user_id: int, conn=None):
+    async with connection(conn) as conn:
+        return await conn.fetch(
+            SQL["list_mod_notes"],
+            guild_id,
+            user_id,
+        )
+
+
+async def get_latest_ffa_updated_at(conn=None):
+    async with connection(conn) as conn:
+        row = await conn.fetchrow(SQL["get_latest_ffa_updated_at"])
+        return row["last_updated"] if row else None
+
+
+async def get_progress_stats(conn=None):
+    async with connection(conn) as conn:
+        row = await conn.fetchrow(SQL["get_progress_stats"])
+        games_row = await conn.fetchrow(SQL["count_processed_games"])
+    return {
+        "players": row[0] if row else 0,
+        "wins_total": row[1] if row else 0,
+        "losses_total": row[2] if row else 0,
+        "games_processed": games_row[0] if games_row else 0,
+    }
+
+
+async def load_player_stats(conn=None):
+    async with connection(conn) as conn:
+        return await conn.fetch(SQL["load_player_stats"])
+
+
+async def load_ffa_stats(conn=None):
+    async with connection(conn) as conn:
+        return await conn.fetch(SQL["load_ffa_stats"])
+
+
+async def iter_seen_game_ids(statement: str):
+    async with connection(None, INGEST_LANE) as conn:
+        async with conn.transaction():
+            async for row in conn.cursor(SQL[statement], prefetch=5000):
+                yield row[0]
+
+
+async def prune_seen_games(statement: str, horizon: datetime, conn=None) -> int:
+    async with connection(conn, INGEST_LANE) as conn:
+        result = await conn.execute(SQL[statement], horizon)
+    try:
+        return int(result.split()[-1])
+    except Exception:
+        return 0
+
+
+async def decide_ofm_participant(
+    guild_id: int,
+    user_id: int,
+    status: str,
+    team_role_id: Optional[int] = None,
+) -> Optional[str]:
+    # Returns the already recorded decision instead of overwriting it, so two managers
+    # clicking accept/refuse at the same time cannot both win.
+    async with transaction() as conn:
+        previous = await conn.fetchval(SQL["lock_ofm_participant"], guild_id, user_id)
+        if previous in ("accepted", "refused"):
+            return previous
+        await conn.execute(SQL["upsert_ofm_participant"], guild_id, user_id, status, team_role_id)
+    # Only a committed decision reaches the roster cache.
+    remember_ofm_participant(guild_id, user_id, status, team_role_id)
+    return None
+
+
+async def reset_win_notifications():
+    async with connection() as conn:
+        await conn.execute(SQL["reset_win_notifications"])
+
+
+async def reset_leaderboard_data(backfill_start: str):
+    async with transaction() as conn:
+        await conn.execute(SQL["reset_leaderboard_stats"])
+        await conn.execute(SQL["reset_backfill_state"], backfill_start)
+    PROCESSED_GAMES_FILTER.clear()
+
+
+async def load_managed_messages(conn=None):
+    async with connection(conn) as conn:
+        rows = await conn.fetch(SQL["load_managed_messages"])
+    MANAGED_MESSAGES.clear()
+    for row in rows:
+        MANAGED_MESSAGES.setdefault(row["guild_id"], {})[row["kind"]] = {
+            "channel_id": row["channel_id"],
+            "message_id": row["message_id"],
+            "content_hash": row["content_hash"],
+        }
+    MANAGED_MESSAGES_STATE["loaded"] = True
+    return len(rows)
+
+
+async def get_managed_messages(guild_id: int) -> dict:
+    if not MANAGED_MESSAGES_STATE["loaded"]:
+        await load_managed_messages()
+    return MANAGED_MESSAGES.get(guild_id, {})
+
+
+async def get_managed_message(guild_id: int, kind: str) -> Optional[dict]:
+    return (await get_managed_messages(guild_id)).get(kind)
+
+
+async def set_managed_message(
+    guild_id: int,
+    kind: str,
+    channel_id: int,
+    message_id: int,
+    content_hash: Optional[str] = None,
+    conn=None,
+):
+    async with connection(conn) as conn:
+        await conn.execute(SQL["set_managed_message"], guild_id, kind, channel_id, message_id, content_hash)
+    MANAGED_MESSAGES.setdefault(guild_id, {})[kind] = {
+        "channel_id": channel_id,
+        "message_id": message_id,
+        "content_hash": content_hash,
+    }
+
+
+async def set_managed_message_hash(guild_id: int, kind: str, content_hash: Optional[str], conn=None):
+    record = MANAGED_MESSAGES.get(guild_id, {}).get(kind)
+    if record is None or record["content_hash"] == content_hash:
+        return
+    async with connection(conn) as conn:
+        await conn.execute(SQL["set_managed_message_hash"], guild_id, kind, content_hash)
+    record["content_hash"] = content_hash
+
+
+async def clear_managed_message(guild_id: int, kind: str, conn=None):
+    async with connection(conn) as conn:
+        await conn.execute(SQL["clear_managed_message"], guild_id, kind)
+    MANAGED_MESSAGES.get(guild_id, {}).pop(kind, None)
+
+
+async def schedule_action(guild_id: int, user_id: int, action: str, due_at: datetime, conn=None):
+    async with connection(conn) as conn:
+        await conn.execute(SQL["schedule_action"], guild_id, user_id, action, due_at)
+
+
+async def cancel_scheduled_action(guild_id: int, user_id: int, action: str, conn=None):
+    async with connection(conn) as conn:
+        await conn.execute(SQL["cancel_scheduled_action"], guild_id, user_id, action)
+
+
+async def get_next_scheduled_action_at(conn=None) -> Optional[datetime]:
+    async with connection(conn) as conn:
+        return await conn.fetchval(SQL["get_next_scheduled_action_at"])
+
+
+async def get_due_scheduled_actions(now: datetime, limit: int, conn=None):
+    async with connection(conn) as conn:
+        return await conn.fetch(SQL["get_due_scheduled_actions"], now, limit)
+
+
+async def complete_scheduled_action(action_id: int, executed_due_at: datetime, conn=None):
+    # Keyed on the due_at that was executed: a ban re-issued meanwhile upserts a new due_at onto the same row,
+    # and that new schedule must survive.
+    async with connection(conn) as conn:
+        await conn.execute(SQL["complete_scheduled_action"], action_id, executed_due_at)
+
+
+async def retry_scheduled_action(action_id: int, executed_due_at: datetime, due_at: datetime, error: str, conn=None):
+    async with connection(conn) as conn:
+        await conn.execute(SQL["retry_scheduled_action"], action_id, executed_due_at, due_at, error)
+
+
+async def count_scheduled_actions(conn=None) -> int:
+    async with connection(conn) as conn:
+        return await conn.fetchval(SQL["count_scheduled_actions"])
+
+
+async def load_ofm_channels(conn=None):
+    async with connection(conn) as conn:
+        rows = await conn.fetch(SQL["load_ofm_channels"])
+    OFM_CHANNELS.clear()
+    for row in rows:
+        OFM_CHANNELS.setdefault(row["guild_id"], {})[row["user_id"]] = row["channel_id"]
+    OFM_CHANNELS_STATE["loaded"] = True
+    return len(rows)
+
+
+async def get_ofm_channel_id(guild_id: int, user_id: int) -> Optional[int]:
+    if not OFM_CHANNELS_STATE["loaded"]:
+        await load_ofm_channels()
+    return OFM_CHANNELS.get(guild_id, {}).get(user_id)
+
+
+async def get_ofm_channels(guild_id: int) -> dict:
+    if not OFM_CHANNELS_STATE["loaded"]:
+        await load_ofm_channels()
+    return dict(OFM_CHANNELS.get(guild_id, {}))
+
+
+def forget_ofm_channel(guild_id: int, channel_id: int):
+    channels = OFM_CHANNELS.get(guild_id, {})
+    for user_id in [user for user, channel in channels.items() if channel == channel_id]:
+        channels.pop(user_id, None)
+
+
+async def set_ofm_channel(guild_id: int, user_id: int, channel_id: int, conn=None):
+    async with transaction(conn) as conn:
+        await conn.execute(SQL["clear_ofm_channel"], channel_id)
+        await conn.execute(SQL["set_ofm_channel"], guild_id, user_id, channel_id)
+    forget_ofm_channel(guild_id, channel_id)
+    OFM_CHANNELS.setdefault(guild_id, {})[user_id] = channel_id
+
+
+async def clear_ofm_channel(guild_id: int, channel_id: int, conn=None):
+    # The DELETE always runs: the cache may not be loaded yet, and a missing entry proves nothing about the row.
+    async with connection(conn) as conn:
+        await conn.execute(SQL["clear_ofm_channel"], channel_id)
+    forget_ofm_channel(guild_id, channel_id)
+
+
+async def replace_ofm_channels(guild_id: int, channels: dict):
+    async with transaction() as conn:
+        await conn.execute(SQL["clear_ofm_channels"], guild_id)
+        if channels:
+            await conn.executemany(
+                SQL["set_ofm_channel"],
+                [(guild_id, user_id, channel_id) for user_id, channel_id in channels.items()],
+            )
+    OFM_CHANNELS[guild_id] = dict(channels)
@@ -344,7 +344,10 @@ def build_leaderboard_embed_from_data(guild, page: int, page_size: int, top, las
 
     if last_updated:
         try:
-            last_dt = datetime.strptime(last_updated, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+            if isinstance(last_updated, datetime):
+                last_dt = last_updated
+            else:
+                last_dt = datetime.strptime(last_updated, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
             next_dt = last_dt + timedelta(minutes=REFRESH_MINUTES)
             footer = f"Mis � jour le {format_local_time(last_dt)} | Prochaine maj {format_local_time(next_dt)}"
         except Exception:
@@ -411,7 +414,10 @@ async def build_leaderboard_ffa_embed_from_data(guild, page: int, page_size: int
 
     if last_updated:
         try:
-            last_dt = datetime.strptime(last_updated, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+            if isinstance(last_updated, datetime):
+                last_dt = last_updated
+            else:
+                last_dt = datetime.strptime(last_updated, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
             next_dt = last_dt + timedelta(minutes=REFRESH_MINUTES)
             footer = f"Mis � jour le {format_local_time(last_dt)} | Prochaine maj {format_local_time(next_dt)}"
         except Exception:
@@ -602,7 +608,9 @@ def build_ofm_admin_panel_embed_from_data(team_name: str):
             "❌ **Retirer**\n"
             "🔝 **Promouvoir**\n"
             "⬇️ **Rétrograder**\n"
-            "📋 **Voir la liste**"
+            "📋 **Voir la liste**\n"
+            "📥 **Importer / accepter en masse**\n"
+            "♻️ **Réinitialiser**"
         ),
         inline=True,
     )
@@ -676,3 +684,99 @@ def build_mod_log_embed(
         embed.add_field(name="Durée", value=format_duration(duration_seconds), inline=True)
     embed.timestamp = datetime.now(timezone.utc)
     return embed
+
+
+def build_command_metrics_embed(rows: list, page: int, page_size: int, window_seconds: int):
+    total_pages = max(1, (len(rows) + page_size - 1) // page_size)
+    page = min(max(page, 1), total_pages)
+    lines = []
+    for row in rows[(page - 1) * page_size : page * page_size]:
+        lines.append(
+            f"**{row['name']}** ({row['kind']}) — {row['count']} appels, "
+            f"erreurs {row['error_rate']:.0%}\n"
+            f"p50 {row['p50_ms']:.0f} ms · p95 {row['p95_ms']:.0f} ms · p99 {row['p99_ms']:.0f} ms"
+        )
+    embed = discord.Embed(
+        title="Etat du bot — commandes",
+        description="\n".join(lines) or "Aucune interaction sur la fenêtre.",
+        color=discord.Color.blurple(),
+    )
+    embed.set_footer(text=f"Page {page}/{total_pages} • fenêtre glissante {format_duration(window_seconds)}")
+    return embed
+
+
+def format_bytes(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} Mo"
+    if size >= 1024:
+        return f"{size / 1024:.1f} Ko"
+    return f"{size} o"
+
+
+def build_openfront_traces_embed(traces: list, buffered: int, endpoint: Optional[str] = None):
+    lines = []
+    for trace in traces:
+        status = trace["status"] if trace["status"] is not None else "—"
+        retry_text = f" · {trace['attempts']} tentatives" if trace["attempts"] > 1 else ""
+        connection = f"DNS {trace['dns_ms']:.0f} · connexion {trace['connect_ms']:.0f}"
+        if trace["reused"]:
+            connection += " (réutilisée)"
+        lines.append(
+            f"**{trace['total_ms']:.0f} ms** `{trace['endpoint']}` {trace['path'] or ''} — HTTP {status}{retry_text}\n"
+            f"file {trace['queued_ms']:.0f} · {connection} · serveur {trace['server_ms']:.0f} · "
+            f"corps {trace['body_ms']:.0f} ms · {format_bytes(trace['bytes'])} · {format_local_time(trace['started_at'])}"
+        )
+        if trace["error"]:
+            lines.append(f"↳ {trace['error'][:150]}")
+    title = "Requêtes OpenFront les plus lentes"
+    if endpoint:
+        title += f" — {endpoint}"
+    embed = discord.Embed(
+        title=title,
+        description="\n".join(lines)[:4000] or "Aucune requête enregistrée.",
+        color=discord.Color.blurple(),
+    )
+    embed.set_footer(text=f"{buffered} requêtes en mémoire • durées en ms")
+    return embed
+
+
+def format_loop_lag(summary: Optional[dict]) -> str:
+    if not summary:
+        return "Pas encore de mesure."
+    return (
+        f"actuel {summary['current_ms']:.0f} ms · p50 {summary['p50_ms']:.0f} ms · "
+        f"p95 {summary['p95_ms']:.0f} ms · max {summary['max_ms']:.0f} ms"
+    )
+
+
+def build_loop_stalls_embed(stalls: list, summary: Optional[dict], threshold_ms: int, total: int):
+    embed = discord.Embed(
+        title="Etat du bot — boucle asyncio",
+        description=f"Lag: {format_loop_lag(summary)}\nBlocages > {threshold_ms} ms depuis le démarrage: {total}",
+        color=discord.Color.blurple(),
+    )
+    for stall in stalls:
+        frames = "\n".join(f"{frame['file']}:{frame['line']} {frame['function']}" for frame in stall["stack"])
+        state = " (en cours)" if stall["ongoing"] else ""
+        embed.add_field(
+            name=f"{format_local_time(stall['at'])} — {stall['blocked_ms']:.0f} ms{state}"[:256],
+            value=f"```\n{frames[-1000:] or '?'}\n```",
+            inline=False,
+        )
+    if not stalls:
+        embed.add_field(name="Blocages", value="Aucun blocage enregistré.", inline=False)
+    return embed
+
+
+def build_profile_embed(report: dict, functions: list, tasks: list):
+    samples = sum(report["stacks"].values()) or 1
+    embed = discord.Embed(
+        title="Profilage par échantillonnage",
+        description=f"{report['samples']} relevés sur {report['seconds']} s. Fichier joint: piles repliées (flamegraph).",
+        color=discord.Color.blurple(),
+    )
+    task_lines = [f"{count / samples:.0%} {name}" for name, count in tasks]
+    embed.add_field(name="Tâches (boucle asyncio)", value="\n".join(task_lines)[:1024] or "Aucune", inline=False)
+    function_lines = [f"{count / samples:.0%} `{name}`" for name, count in functions]
+    embed.add_field(name="Fonctions (temps propre)", value="\n".join(function_lines)[:1024] or "Aucune", inline=False)
+    return embed
@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import re
+
+import asyncpg
+
+from parametres import DB_URL
+
+
+# Hot lookups touched by migration 0002; run once before deploying it and once after.
+QUERIES = [
+    (
+        "list_warnings",
+        """
+        SELECT id, moderator_id, reason, created_at
+        FROM mod_warnings
+        WHERE guild_id = $1 AND user_id = $2
+        ORDER BY id DESC
+        """,
+        ("guild_id", "user_id"),
+    ),
+    (
+        "list_mod_actions",
+        """
+        SELECT action_type, reason, duration_seconds, created_at, moderator_id
+        FROM mod_actions
+        WHERE guild_id = $1 AND user_id = $2
+        ORDER BY id DESC
+        """,
+        ("guild_id", "user_id"),
+    ),
+    (
+        "get_allowed_roles_for_command",
+        """
+        SELECT role_id
+        FROM mod_permissions
+        WHERE guild_id = $1 AND command = $2 AND allowed = TRUE
+        """,
+        ("guild_id", "command"),
+    ),
+    (
+        "get_latest_ffa_updated_at",
+        "SELECT MAX(updated_at) AS last_updated FROM ffa_stats",
+        (),
+    ),
+]
+
+
+async def explain(conn: asyncpg.Connection, sql: str, args, runs: int):
+    plan = []
+    timings = []
+    for _ in range(runs):
+        rows = await conn.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", *args)
+        plan = [row[0] for row in rows]
+        for line in plan:
+            match = re.search(r"Execution Time: ([0-9.]+) ms", line)
+            if match:
+                timings.append(float(match.group(1)))
+    return plan, sorted(timings)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE des requêtes de modération et de stats.")
+    parser.add_argument("--guild-id", type=int, required=True)
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--command", default="warn")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--label", default="")
+    args = parser.parse_args()
+    if not DB_URL:
+        raise SystemExit("DATABASE_URL manquant (Postgres).")
+
+    values = {"guild_id": args.guild_id, "user_id": args.user_id, "command": args.command}
+    conn = await asyncpg.connect(DB_URL)
+    try:
+        # Before the first versioned deploy there is no schema_version table; that is the "before" run.
+        if await conn.fetchval("SELECT to_regclass('schema_version')") is None:
+            version = "unmigrated"
+        else:
+            version = await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        print(f"== {args.label or 'run'} (schema_version {version}) ==")
+        for name, sql, params in QUERIES:
+            plan, timings = await explain(conn, sql, [values[p] for p in params], args.runs)
+            median = timings[len(timings) // 2] if timings else 0.0
+            print(f"\n-- {name}: median {median:.3f} ms over {len(timings)} runs")
+            for line in plan:
+                print(f"   {line}")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,169 @@
+from aiohttp import web
+
+from parametres import METRICS_HOST, METRICS_PORT
+from journalisation import log_event, log_exception
+
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+
+    def _key(self, labels: dict):
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        super().__init__(name, help_text, labels)
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in sorted(self.values.items())]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series["counts"][i] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+    def render(self):
+        lines = []
+        for key, series in sorted(self.series.items()):
+            for bound, count in zip(self.buckets, series["counts"]):
+                bucket_labels = _format_labels(self.labels, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            bucket_labels = _format_labels(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {series['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {series['count']}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    # Values owned elsewhere (pool lanes, backfill cursors) are read at scrape time instead of mirrored.
+    def __init__(self, name: str, help_text: str, kind: str, labels, collect):
+        super().__init__(name, help_text, labels)
+        self.kind = kind
+        self.collect = collect
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in self.collect()]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            try:
+                samples = metric.render()
+            except Exception as exc:
+                log_exception("metric_render_failed", exc, metric=metric.name)
+                continue
+            lines.extend(metric.header())
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+OPENFRONT_REQUESTS = REGISTRY.register(
+    Counter("openfront_requests_total", "Requêtes vers l'API OpenFront.", ("endpoint", "status"))
+)
+OPENFRONT_REQUEST_SECONDS = REGISTRY.register(
+    Histogram("openfront_request_duration_seconds", "Durée des requêtes OpenFront.", ("endpoint",))
+)
+GAMES_INGESTED = REGISTRY.register(
+    Counter("games_ingested_total", "Parties intégrées aux statistiques.", ("pipeline",))
+)
+DISCORD_MESSAGES = REGISTRY.register(
+    Counter("discord_messages_total", "Messages Discord envoyés ou édités par le bot.", ("action", "source"))
+)
+LOOP_ITERATION_SECONDS = REGISTRY.register(
+    Histogram(
+        "loop_iteration_duration_seconds",
+        "Durée d'une itération des boucles de fond.",
+        ("loop",),
+        buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+    )
+)
+
+
+async def metrics_handler(_request: web.Request) -> web.Response:
+    return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
+
+
+METRICS_SERVER = {"runner": None}
+
+
+async def start_metrics_server():
+    if not METRICS_PORT or METRICS_SERVER["runner"] is not None:
+        return METRICS_SERVER["runner"]
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, METRICS_HOST, METRICS_PORT)
+    try:
+        await site.start()
+    except OSError as exc:
+        # Metrics are optional: a taken port or a bad METRICS_HOST must not keep the bot from starting.
+        log_exception("metrics_endpoint_failed", exc, host=METRICS_HOST, port=METRICS_PORT)
+        await runner.cleanup()
+        return None
+    METRICS_SERVER["runner"] = runner
+    log_event("metrics_endpoint_started", host=METRICS_HOST, port=METRICS_PORT)
+    return runner
+
+
+async def stop_metrics_server():
+    runner, METRICS_SERVER["runner"] = METRICS_SERVER["runner"], None
+    if runner is not None:
+        await runner.cleanup()
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+
+import discord
+
+from parametres import OFM_ROLE_CHANGE_INTERVAL_SECONDS
+from journalisation import log_event
+
+
+class RoleChangeQueue:
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.pending = 0
+        self.applied = 0
+        self.failed = 0
+        self._lock = asyncio.Lock()
+
+    async def apply(self, changes, reason: str):
+        # changes: [(member, roles_to_add, roles_to_remove)]. Only the delta is sent, through the per-role
+        # endpoints: a PATCH of the full role list would be built from a cached member that nothing refreshes
+        # without the members intent, and would revert roles other bots or moderators changed since. Bulk
+        # operations never run concurrently so a second import waits its turn instead of doubling the rate.
+        applied = 0
+        failed = []
+        self.pending += len(changes)
+        async with self._lock:
+            for member, add, remove in changes:
+                self.pending -= 1
+                add = [role for role in add if role and role not in member.roles]
+                remove = [role for role in remove if role and role in member.roles]
+                if not add and not remove:
+                    continue
+                try:
+                    if add:
+                        await member.add_roles(*add, reason=reason)
+                    if remove:
+                        await member.remove_roles(*remove, reason=reason)
+                    applied += 1
+                except discord.HTTPException as exc:
+                    failed.append(member)
+                    log_event("role_change_failed", logging.WARNING, member_id=member.id, error=str(exc))
+                # One request per role, so the pause scales with the number of roles touched.
+                await asyncio.sleep(self.interval_seconds * (len(add) + len(remove)))
+        self.applied += applied
+        self.failed += len(failed)
+        return applied, failed
+
+
+ROLE_CHANGE_QUEUE = RoleChangeQueue(OFM_ROLE_CHANGE_INTERVAL_SECONDS)
@@ -0,0 +1,102 @@
+import asyncio
+import hashlib
+import math
+
+from parametres import SEEN_GAMES_FILTER_CAPACITY, SEEN_GAMES_FILTER_ERROR_RATE
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def size_bytes(self) -> int:
+        return len(self.bits)
+
+
+class SeenIdsFilter:
+    def __init__(
+        self,
+        name: str,
+        capacity: int = SEEN_GAMES_FILTER_CAPACITY,
+        error_rate: float = SEEN_GAMES_FILTER_ERROR_RATE,
+    ):
+        self.name = name
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bloom = None
+        self._pending = []
+        self._rebuild_lock = asyncio.Lock()
+        self.checks = 0
+        self.definitely_new = 0
+
+    def is_ready(self) -> bool:
+        return self.bloom is not None
+
+    def might_contain(self, key: str) -> bool:
+        # Until the first rebuild finishes every ID is a possible hit and goes to the database.
+        if self.bloom is None:
+            return True
+        self.checks += 1
+        if key in self.bloom:
+            return True
+        self.definitely_new += 1
+        return False
+
+    def add(self, key: str):
+        if self.bloom is not None:
+            self.bloom.add(key)
+        for pending in self._pending:
+            pending.append(key)
+
+    def clear(self):
+        self.bloom = BloomFilter(self.capacity, self.error_rate)
+        for pending in self._pending:
+            pending.clear()
+
+    async def rebuild(self, keys):
+        # Marks made from the moment the rebuild is requested are replayed into the new filter; each rebuild
+        # keeps its own list so overlapping ones cannot drop each other's marks. The lock keeps a second
+        # rebuild from streaming the table while the first one still does.
+        pending = []
+        self._pending.append(pending)
+        try:
+            async with self._rebuild_lock:
+                bloom = BloomFilter(self.capacity, self.error_rate)
+                async for key in keys:
+                    bloom.add(key)
+                    if bloom.count % 5000 == 0:
+                        await asyncio.sleep(0)
+                for key in pending:
+                    bloom.add(key)
+                self.bloom = bloom
+        finally:
+            self._pending.remove(pending)
+            # Releases the cursor's connection and transaction when the stream stops early.
+            await keys.aclose()
+        return bloom.count
+
+    def skip_ratio(self) -> float:
+        return self.definitely_new / self.checks if self.checks else 0.0
+
+
+PROCESSED_GAMES_FILTER = SeenIdsFilter("processed_games")
+PROCESSED_GAMES_1V1_FILTER = SeenIdsFilter("processed_games_1v1")
@@ -0,0 +1,339 @@
+import asyncio
+import math
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from parametres import (
+    CHART_CACHE_SIZE,
+    CHART_DPI,
+    CHART_HIRES_DPI,
+    CHART_RENDER_TIMEOUT_SECONDS,
+    CHART_WORKERS,
+)
+
+
+CHART_POOL = None
+CHART_BG = "#0B0F1A"
+CHART_GRID = "#1E2638"
+CHART_COLOR_A = "#19E6FF"
+CHART_COLOR_B = "#FF2ED1"
+COMPARE_METRICS = ["Wins", "Losses", "Games", "Winrate%", "Streak"]
+COMPARE_RADAR_LABELS = ["Wins", "Winrate", "Games", "Streak", "Losses"]
+
+_CHART_TEMPLATES = {}
+_CHART_TEMPLATE_LOCK = threading.Lock()
+
+
+class ChartCache:
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        png = self.items.get(key)
+        if png is None:
+            self.misses += 1
+            return None
+        self.items.move_to_end(key)
+        self.hits += 1
+        return png
+
+    def put(self, key, png: bytes):
+        self.items[key] = png
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def size_bytes(self) -> int:
+        return sum(len(png) for png in self.items.values())
+
+
+COMPARE_CHART_CACHE = ChartCache(CHART_CACHE_SIZE)
+
+
+def stats_fingerprint(stats: dict):
+    return tuple(sorted(stats.items()))
+
+
+def compare_chart_key(player_a: dict, player_b: dict, clan_tag: str, dpi: int):
+    return (
+        player_a.get("player_id"),
+        player_b.get("player_id"),
+        player_a["name"],
+        player_b["name"],
+        stats_fingerprint(player_a["stats"]),
+        stats_fingerprint(player_b["stats"]),
+        clan_tag,
+        dpi,
+    )
+
+
+def _init_chart_worker():
+    # Pay the matplotlib import and the figure styling once per worker instead of once per chart.
+    with _CHART_TEMPLATE_LOCK:
+        _get_compare_template()
+
+
+def _warm_chart_worker():
+    return True
+
+
+# Legacy pyplot renderer, kept as the reference for bench_graphiques.py.
+def build_compare_chart(player_a: dict, player_b: dict, clan_tag: str) -> BytesIO:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    bg = "#0B0F1A"
+    grid = "#1E2638"
+    color_a = "#19E6FF"
+    color_b = "#FF2ED1"
+
+    stats_a = player_a["stats"]
+    stats_b = player_b["stats"]
+
+    fig = plt.figure(figsize=(12, 7), facecolor=bg)
+    fig.subplots_adjust(left=0.06, right=0.97, top=0.9, bottom=0.08)
+
+    ax_bar = fig.add_subplot(1, 2, 1)
+    ax_radar = fig.add_subplot(1, 2, 2, polar=True)
+
+    fig.text(0.02, 0.94, f"[{clan_tag}]", color=color_a, fontsize=14, fontweight="bold")
+    fig.text(0.5, 0.94, "DUEL COMPARATIF", ha="center", color="white", fontsize=16, fontweight="bold")
+    fig.text(
+        0.5,
+        0.90,
+        f"{player_a['name']}  vs  {player_b['name']}",
+        ha="center",
+        color="#B5C3D6",
+        fontsize=11,
+    )
+
+    metrics = ["Wins", "Losses", "Games", "Winrate%", "Streak"]
+    values_a = [stats_a["wins"], stats_a["losses"], stats_a["games"], stats_a["winrate"], stats_a["streak"]]
+    values_b = [stats_b["wins"], stats_b["losses"], stats_b["games"], stats_b["winrate"], stats_b["streak"]]
+
+    y = range(len(metrics))
+    ax_bar.barh([i + 0.15 for i in y], values_a, height=0.28, color=color_a, alpha=0.85, label=player_a["name"])
+    ax_bar.barh([i - 0.15 for i in y], values_b, height=0.28, color=color_b, alpha=0.85, label=player_b["name"])
+    ax_bar.set_yticks(list(y))
+    ax_bar.set_yticklabels(metrics, color="white")
+    ax_bar.tick_params(axis="x", colors="#9FB3C8")
+    ax_bar.set_facecolor(bg)
+    ax_bar.grid(axis="x", color=grid, alpha=0.4)
+    ax_bar.spines["top"].set_visible(False)
+    ax_bar.spines["right"].set_visible(False)
+    ax_bar.spines["left"].set_color(grid)
+    ax_bar.spines["bottom"].set_color(grid)
+    ax_bar.legend(loc="lower right", frameon=False, fontsize=9, labelcolor="white")
+
+    radar_labels = ["Wins", "Winrate", "Games", "Streak", "Losses"]
+    loss_max = max(stats_a["losses"], stats_b["losses"], 1)
+    radar_a = [
+        stats_a["wins"],
+        stats_a["winrate"],
+        stats_a["games"],
+        stats_a["streak"],
+        loss_max - stats_a["losses"],
+    ]
+    radar_b = [
+        stats_b["wins"],
+        stats_b["winrate"],
+        stats_b["games"],
+        stats_b["streak"],
+        loss_max - stats_b["losses"],
+    ]
+    max_vals = [max(radar_a[i], radar_b[i], 1) for i in range(len(radar_labels))]
+    norm_a = [radar_a[i] / max_vals[i] for i in range(len(radar_labels))]
+    norm_b = [radar_b[i] / max_vals[i] for i in range(len(radar_labels))]
+    angles = [n / float(len(radar_labels)) * 2 * 3.14159 for n in range(len(radar_labels))]
+    angles += angles[:1]
+    norm_a += norm_a[:1]
+    norm_b += norm_b[:1]
+
+    ax_radar.set_facecolor(bg)
+    ax_radar.set_theta_offset(3.14159 / 2)
+    ax_radar.set_theta_direction(-1)
+    ax_radar.set_xticks(angles[:-1])
+    ax_radar.set_xticklabels(radar_labels, color="white", fontsize=9)
+    ax_radar.set_yticklabels([])
+    ax_radar.grid(color=grid, alpha=0.4)
+    ax_radar.plot(angles, norm_a, color=color_a, linewidth=2)
+    ax_radar.fill(angles, norm_a, color=color_a, alpha=0.25)
+    ax_radar.plot(angles, norm_b, color=color_b, linewidth=2)
+    ax_radar.fill(angles, norm_b, color=color_b, alpha=0.25)
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png", dpi=160, facecolor=bg)
+    plt.close(fig)
+    buffer.seek(0)
+    return buffer
+
+
+def _style_axis(ax):
+    ax.set_facecolor(CHART_BG)
+    for side in ("top", "right"):
+        ax.spines[side].set_visible(False)
+    for side in ("left", "bottom"):
+        ax.spines[side].set_color(CHART_GRID)
+
+
+def _build_compare_template():
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 7), facecolor=CHART_BG)
+    FigureCanvasAgg(fig)
+    fig.subplots_adjust(left=0.06, right=0.97, top=0.9, bottom=0.08)
+
+    ax_bar = fig.add_subplot(1, 2, 1)
+    ax_bar.set_yticks(list(range(len(COMPARE_METRICS))))
+    ax_bar.set_yticklabels(COMPARE_METRICS, color="white")
+    ax_bar.tick_params(axis="x", colors="#9FB3C8")
+    ax_bar.grid(axis="x", color=CHART_GRID, alpha=0.4)
+    _style_axis(ax_bar)
+
+    ax_radar = fig.add_subplot(1, 2, 2, polar=True)
+    angles = [n / float(len(COMPARE_RADAR_LABELS)) * 2 * math.pi for n in range(len(COMPARE_RADAR_LABELS))]
+    ax_radar.set_facecolor(CHART_BG)
+    ax_radar.set_theta_offset(math.pi / 2)
+    ax_radar.set_theta_direction(-1)
+    ax_radar.set_xticks(angles)
+    ax_radar.set_xticklabels(COMPARE_RADAR_LABELS, color="white", fontsize=9)
+    ax_radar.set_yticklabels([])
+    ax_radar.grid(color=CHART_GRID, alpha=0.4)
+
+    tag_text = fig.text(0.02, 0.94, "", color=CHART_COLOR_A, fontsize=14, fontweight="bold")
+    fig.text(0.5, 0.94, "DUEL COMPARATIF", ha="center", color="white", fontsize=16, fontweight="bold")
+    subtitle_text = fig.text(0.5, 0.90, "", ha="center", color="#B5C3D6", fontsize=11)
+    return {
+        "figure": fig,
+        "bar": ax_bar,
+        "radar": ax_radar,
+        "angles": angles + angles[:1],
+        "tag": tag_text,
+        "subtitle": subtitle_text,
+    }
+
+
+def _get_compare_template():
+    template = _CHART_TEMPLATES.get("compare")
+    if template is None:
+        template = _build_compare_template()
+        _CHART_TEMPLATES["compare"] = template
+    return template
+
+
+def _clear_data_artists(ax):
+    for container in list(ax.containers):
+        container.remove()
+    for artist in list(ax.patches) + list(ax.lines):
+        artist.remove()
+    legend = ax.get_legend()
+    if legend:
+        legend.remove()
+
+
+def _compare_radar_values(stats_a: dict, stats_b: dict):
+    loss_max = max(stats_a["losses"], stats_b["losses"], 1)
+    radar_a = [stats_a["wins"], stats_a["winrate"], stats_a["games"], stats_a["streak"], loss_max - stats_a["losses"]]
+    radar_b = [stats_b["wins"], stats_b["winrate"], stats_b["games"], stats_b["streak"], loss_max - stats_b["losses"]]
+    max_vals = [max(a, b, 1) for a, b in zip(radar_a, radar_b)]
+    norm_a = [v / m for v, m in zip(radar_a, max_vals)]
+    norm_b = [v / m for v, m in zip(radar_b, max_vals)]
+    return norm_a + norm_a[:1], norm_b + norm_b[:1]
+
+
+def render_compare_png(player_a: dict, player_b: dict, clan_tag: str, dpi: int = CHART_DPI) -> bytes:
+    stats_a = player_a["stats"]
+    stats_b = player_b["stats"]
+    values_a = [stats_a["wins"], stats_a["losses"], stats_a["games"], stats_a["winrate"], stats_a["streak"]]
+    values_b = [stats_b["wins"], stats_b["losses"], stats_b["games"], stats_b["winrate"], stats_b["streak"]]
+    norm_a, norm_b = _compare_radar_values(stats_a, stats_b)
+    y = range(len(COMPARE_METRICS))
+
+    with _CHART_TEMPLATE_LOCK:
+        template = _get_compare_template()
+        fig = template["figure"]
+        ax_bar = template["bar"]
+        ax_radar = template["radar"]
+        angles = template["angles"]
+        template["tag"].set_text(f"[{clan_tag}]")
+        template["subtitle"].set_text(f"{player_a['name']}  vs  {player_b['name']}")
+
+        _clear_data_artists(ax_bar)
+        ax_bar.barh([i + 0.15 for i in y], values_a, height=0.28, color=CHART_COLOR_A, alpha=0.85, label=player_a["name"])
+        ax_bar.barh([i - 0.15 for i in y], values_b, height=0.28, color=CHART_COLOR_B, alpha=0.85, label=player_b["name"])
+        ax_bar.relim()
+        ax_bar.autoscale_view()
+        ax_bar.legend(loc="lower right", frameon=False, fontsize=9, labelcolor="white")
+
+        _clear_data_artists(ax_radar)
+        ax_radar.plot(angles, norm_a, color=CHART_COLOR_A, linewidth=2)
+        ax_radar.fill(angles, norm_a, color=CHART_COLOR_A, alpha=0.25)
+        ax_radar.plot(angles, norm_b, color=CHART_COLOR_B, linewidth=2)
+        ax_radar.fill(angles, norm_b, color=CHART_COLOR_B, alpha=0.25)
+        ax_radar.relim()
+        ax_radar.autoscale_view()
+
+        buffer = BytesIO()
+        fig.savefig(buffer, format="png", dpi=dpi, facecolor=CHART_BG)
+    return buffer.getvalue()
+
+
+def start_chart_pool():
+    global CHART_POOL
+    if CHART_POOL is not None:
+        return CHART_POOL
+    # Forking would copy the log listener and loop watchdog threads' locks into the workers. A fresh
+    # interpreter re-runs the main module as __mp_main__, which is why the Procfile starts lanceur.py
+    # rather than bot.py: workers then only import this module and parametres.
+    start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    CHART_POOL = ProcessPoolExecutor(
+        max_workers=CHART_WORKERS,
+        mp_context=multiprocessing.get_context(start_method),
+        initializer=_init_chart_worker,
+    )
+    for _ in range(CHART_WORKERS):
+        CHART_POOL.submit(_warm_chart_worker)
+    return CHART_POOL
+
+
+def stop_chart_pool():
+    global CHART_POOL
+    if CHART_POOL is None:
+        return
+    pool, CHART_POOL = CHART_POOL, None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def render_compare_chart(player_a: dict, player_b: dict, clan_tag: str, hires: bool = False) -> bytes:
+    dpi = CHART_HIRES_DPI if hires else CHART_DPI
+    key = compare_chart_key(player_a, player_b, clan_tag, dpi)
+    cached = COMPARE_CHART_CACHE.get(key)
+    if cached is not None:
+        return cached
+    executor = start_chart_pool()
+    loop = asyncio.get_running_loop()
+    try:
+        # On a timeout wait_for cancels only this render: a queued one never starts, a running one finishes
+        # in its worker and is dropped, and the pool keeps serving everyone else.
+        png = await asyncio.wait_for(
+            loop.run_in_executor(executor, render_compare_png, player_a, player_b, clan_tag, dpi),
+            timeout=CHART_RENDER_TIMEOUT_SECONDS,
+        )
+    except BrokenProcessPool:
+        stop_chart_pool()
+        raise
+    COMPARE_CHART_CACHE.put(key, png)
+    return png
@@ -0,0 +1,187 @@
+import asyncio
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from discord import app_commands
+
+from parametres import LOG_FORMAT, LOG_LEVEL
+
+
+LOGGER = logging.getLogger("gaulois")
+CURRENT_SPAN = contextvars.ContextVar("log_span", default=None)
+
+
+class LogSpan:
+    # One span per loop iteration, backfill step or command; nested spans share the root correlation id so
+    # every line of a slow cycle can be pulled out with a single filter.
+    def __init__(self, kind: str, name: str, parent=None):
+        self.kind = kind
+        self.name = name
+        self.parent = parent
+        self.span_id = uuid.uuid4().hex[:8]
+        self.correlation_id = parent.correlation_id if parent else self.span_id
+        self.counters = {}
+        self.error = None
+        self.start = time.monotonic()
+
+    def root(self):
+        span = self
+        while span.parent:
+            span = span.parent
+        return span
+
+    def count(self, name: str, amount=1):
+        span = self
+        while span:
+            span.counters[name] = span.counters.get(name, 0) + amount
+            span = span.parent
+
+    def context(self) -> dict:
+        root = self.root()
+        context = {"correlation_id": self.correlation_id, "span_id": self.span_id, "scope": f"{root.kind}:{root.name}"}
+        if self is not root:
+            context["step"] = self.name
+        return context
+
+    def fail(self, exc: BaseException):
+        self.error = f"{type(exc).__name__}: {exc}"[:500]
+
+    def finish(self, **fields):
+        fields.setdefault("status", "error" if self.error else "ok")
+        if self.error:
+            fields.setdefault("error", self.error)
+        log_event(
+            f"{self.kind}_done",
+            level=logging.WARNING if self.error else logging.INFO,
+            duration_ms=round((time.monotonic() - self.start) * 1000, 1),
+            **self.counters,
+            **fields,
+        )
+
+
+def current_span():
+    return CURRENT_SPAN.get()
+
+
+def start_span(kind: str, name: str) -> LogSpan:
+    # For spans that outlive the function that opens them (commands end in separate callbacks).
+    span = LogSpan(kind, name, current_span())
+    CURRENT_SPAN.set(span)
+    return span
+
+
+@contextmanager
+def log_span(kind: str, name: str, **fields):
+    span = LogSpan(kind, name, current_span())
+    token = CURRENT_SPAN.set(span)
+    try:
+        yield span
+    except Exception as exc:
+        span.fail(exc)
+        raise
+    except BaseException:
+        fields["status"] = "cancelled"
+        raise
+    finally:
+        span.finish(**fields)
+        CURRENT_SPAN.reset(token)
+
+
+def count_event(name: str, amount=1):
+    span = current_span()
+    if span:
+        span.count(name, amount)
+
+
+def log_event(event: str, level=logging.INFO, exc_info=None, **fields):
+    LOGGER.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+
+def log_exception(event: str, exc: BaseException, **fields):
+    span = current_span()
+    if span:
+        span.fail(exc)
+    log_event(event, logging.ERROR, exc_info=(type(exc), exc, exc.__traceback__), **fields)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    # Runs on the event loop: capture the span and flatten the record, leave formatting and I/O to the
+    # listener thread.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        span = current_span()
+        record.log_context = span.context() if span else {}
+        return record
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        payload.update(getattr(record, "log_context", None) or {})
+        payload.update(getattr(record, "fields", None) or {})
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=_json_default)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        extra = {**(getattr(record, "log_context", None) or {}), **(getattr(record, "fields", None) or {})}
+        line = f"{self.formatTime(record)} {record.levelname} {record.name} {record.getMessage()}"
+        if extra:
+            line += " " + " ".join(f"{key}={value}" for key, value in extra.items())
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+def setup_logging():
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    root = logging.getLogger()
+    root.handlers = [ContextQueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class LoggedCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction) -> bool:
+        # Runs inside the command's own task, so the span set here covers the whole invocation.
+        name = interaction.command.qualified_name if interaction.command else "inconnue"
+        span = start_span("command", name)
+        task = asyncio.current_task()
+        if task:
+            # Named tasks let the sampling profiler attribute samples to the command.
+            task.set_name(f"command:{name}")
+        log_event("command_start", user_id=interaction.user.id, guild_id=interaction.guild_id)
+        interaction.extras["log_span"] = span
+        return True
@@ -0,0 +1,6 @@
+# Entry point. Chart workers started with spawn or forkserver re-run the main module as __mp_main__;
+# keeping it this small means they never import discord.py or the rest of the bot.
+if __name__ == "__main__":
+    from bot import main
+
+    main()
@@ -0,0 +1,124 @@
+import json
+import time
+from collections import deque
+
+import discord
+
+from parametres import COMMAND_METRICS_MAX_SAMPLES, COMMAND_METRICS_WINDOW_SECONDS
+from journalisation import log_span
+from reponse_differee import DEFERRED_REPLY_KEY
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class CommandMetrics:
+    def __init__(self, window_seconds: int, max_samples: int):
+        self.window_seconds = window_seconds
+        self.max_samples = max_samples
+        self.samples = {}
+
+    def record(self, name: str, kind: str, elapsed_ms: float, error: bool = False, deferred: bool = False):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = {"kind": kind, "samples": deque(maxlen=self.max_samples)}
+        samples["samples"].append((time.monotonic(), elapsed_ms, error, deferred))
+
+    def record_interaction(self, name: str, kind: str, interaction: discord.Interaction, error: bool = False):
+        # Measured from interaction creation so gateway and queueing delay count, as the user sees it.
+        elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds() * 1000
+        reply = interaction.extras.get(DEFERRED_REPLY_KEY)
+        self.record(name, kind, max(elapsed, 0.0), error, deferred=bool(reply and reply.auto_deferred))
+
+    def _trim(self, samples: deque):
+        horizon = time.monotonic() - self.window_seconds
+        while samples and samples[0][0] < horizon:
+            samples.popleft()
+
+    def snapshot(self):
+        rows = []
+        for name, entry in list(self.samples.items()):
+            samples = entry["samples"]
+            self._trim(samples)
+            if not samples:
+                # Names come from commands and components that may never fire again; don't keep them forever.
+                del self.samples[name]
+                continue
+            latencies = sorted(sample[1] for sample in samples)
+            errors = sum(1 for sample in samples if sample[2])
+            deferred = sum(1 for sample in samples if sample[3])
+            rows.append(
+                {
+                    "name": name,
+                    "kind": entry["kind"],
+                    "count": len(samples),
+                    "errors": errors,
+                    "error_rate": errors / len(samples),
+                    "deferred": deferred,
+                    "p50_ms": percentile(latencies, 0.50),
+                    "p95_ms": percentile(latencies, 0.95),
+                    "p99_ms": percentile(latencies, 0.99),
+                    "max_ms": latencies[-1],
+                }
+            )
+        rows.sort(key=lambda row: (-row["count"], row["name"]))
+        return rows
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"window_seconds": self.window_seconds, "commands": self.snapshot()},
+            indent=2,
+            ensure_ascii=False,
+        )
+
+
+COMMAND_METRICS = CommandMetrics(COMMAND_METRICS_WINDOW_SECONDS, COMMAND_METRICS_MAX_SAMPLES)
+
+
+def component_metric_name(view: discord.ui.View, item: discord.ui.Item) -> str:
+    # discord.py fills in a random custom_id when none is given; only explicit ones are stable names.
+    if getattr(item, "_provided_custom_id", False):
+        return item.custom_id
+    return f"{type(view).__name__}.{getattr(item, 'label', None) or type(item).__name__}"
+
+
+def instrument_callback(callback, span_kind: str, kind: str, name):
+    # name is called when the interaction fires, so components whose label changes are recorded as they are.
+    async def instrumented(interaction: discord.Interaction):
+        metric = name()
+        error = False
+        with log_span(span_kind, metric):
+            try:
+                return await callback(interaction)
+            except Exception:
+                error = True
+                raise
+            finally:
+                COMMAND_METRICS.record_interaction(metric, kind, interaction, error=error)
+
+    return instrumented
+
+
+class InstrumentedView(discord.ui.View):
+    # Each item's public callback is wrapped; the error still reaches on_error, after it has been counted.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for item in self.children:
+            self._instrument(item)
+
+    def _instrument(self, item: discord.ui.Item):
+        item.callback = instrument_callback(item.callback, "component", "bouton", lambda: component_metric_name(self, item))
+
+    def add_item(self, item: discord.ui.Item):
+        self._instrument(item)
+        return super().add_item(item)
+
+
+class InstrumentedModal(discord.ui.Modal):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_submit = instrument_callback(self.on_submit, "modal", "modal", lambda: type(self).__name__)
@@ -0,0 +1,492 @@
+import asyncpg
+
+from parametres import BACKFILL_START, ONEV1_BACKFILL_START
+
+
+# Arbitrary key shared by every bot process so only one of them migrates at a time.
+MIGRATION_LOCK_KEY = 4_170_512_001
+
+
+async def migration_0001_baseline(conn: asyncpg.Connection):
+    # Schema as it existed before versioned migrations; every statement is a no-op on
+    # databases created by the old init_db.
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS player_stats (
+            username TEXT PRIMARY KEY,
+            display_name TEXT,
+            wins_ffa INTEGER DEFAULT 0,
+            losses_ffa INTEGER DEFAULT 0,
+            wins_team INTEGER DEFAULT 0,
+            losses_team INTEGER DEFAULT 0,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    await conn.execute("ALTER TABLE player_stats ADD COLUMN IF NOT EXISTS display_name TEXT")
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS processed_games (
+            game_id TEXT PRIMARY KEY
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS backfill_state (
+            id INTEGER PRIMARY KEY,
+            cursor TEXT NOT NULL,
+            completed BOOLEAN NOT NULL DEFAULT FALSE,
+            last_attempt TEXT,
+            last_error TEXT,
+            last_sessions INTEGER DEFAULT 0,
+            last_games_processed INTEGER DEFAULT 0
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS leaderboard_message (
+            guild_id BIGINT PRIMARY KEY,
+            channel_id BIGINT NOT NULL,
+            message_id BIGINT NOT NULL
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS leaderboard_message_ffa (
+            guild_id BIGINT PRIMARY KEY,
+            channel_id BIGINT NOT NULL,
+            message_id BIGINT NOT NULL
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS leaderboard_message_1v1 (
+            guild_id BIGINT PRIMARY KEY,
+            channel_id BIGINT NOT NULL,
+            message_id BIGINT NOT NULL
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS leaderboard_message_1v1_gal (
+            guild_id BIGINT PRIMARY KEY,
+            channel_id BIGINT NOT NULL,
+            message_id BIGINT NOT NULL
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS win_notifications (
+            game_id TEXT PRIMARY KEY,
+            notified_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ffa_win_notifications (
+            player_id TEXT NOT NULL,
+            game_id TEXT NOT NULL,
+            notified_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (player_id, game_id)
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS win_notify_state (
+            id INTEGER PRIMARY KEY,
+            last_empty_at TEXT,
+            last_scan_at TEXT,
+            last_scan_sessions INTEGER DEFAULT 0,
+            last_scan_wins INTEGER DEFAULT 0,
+            last_scan_sent INTEGER DEFAULT 0,
+            last_scan_skipped INTEGER DEFAULT 0,
+            last_scan_missing_game_id INTEGER DEFAULT 0,
+            last_scan_fetch_errors INTEGER DEFAULT 0,
+            last_scan_error TEXT
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ofm_board_message (
+            guild_id BIGINT PRIMARY KEY,
+            channel_id BIGINT NOT NULL,
+            message_id BIGINT NOT NULL
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ofm_participants (
+            guild_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            status TEXT NOT NULL,
+            team_role_id BIGINT,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (guild_id, user_id)
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ofm_admin_panel_message (
+            guild_id BIGINT PRIMARY KEY,
+            channel_id BIGINT NOT NULL,
+            message_id BIGINT NOT NULL
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ofm_team_name (
+            guild_id BIGINT PRIMARY KEY,
+            name TEXT NOT NULL
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mod_admin_panel_message (
+            guild_id BIGINT PRIMARY KEY,
+            channel_id BIGINT NOT NULL,
+            message_id BIGINT NOT NULL
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mod_warnings (
+            id BIGSERIAL PRIMARY KEY,
+            guild_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            moderator_id BIGINT NOT NULL,
+            reason TEXT NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mod_actions (
+            id BIGSERIAL PRIMARY KEY,
+            guild_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            moderator_id BIGINT NOT NULL,
+            action_type TEXT NOT NULL,
+            reason TEXT,
+            duration_seconds INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mod_permissions (
+            guild_id BIGINT NOT NULL,
+            role_id BIGINT NOT NULL,
+            command TEXT NOT NULL,
+            allowed BOOLEAN NOT NULL DEFAULT TRUE,
+            PRIMARY KEY (guild_id, role_id, command)
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mod_config (
+            guild_id BIGINT PRIMARY KEY,
+            log_channel_id BIGINT,
+            default_mute_seconds INTEGER DEFAULT 3600,
+            default_ban_seconds INTEGER DEFAULT 0
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mod_notes (
+            id BIGSERIAL PRIMARY KEY,
+            guild_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            moderator_id BIGINT NOT NULL,
+            note TEXT NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    await conn.execute("ALTER TABLE win_notify_state ADD COLUMN IF NOT EXISTS last_scan_at TEXT")
+    await conn.execute("ALTER TABLE win_notify_state ADD COLUMN IF NOT EXISTS last_scan_sessions INTEGER DEFAULT 0")
+    await conn.execute("ALTER TABLE win_notify_state ADD COLUMN IF NOT EXISTS last_scan_wins INTEGER DEFAULT 0")
+    await conn.execute("ALTER TABLE win_notify_state ADD COLUMN IF NOT EXISTS last_scan_sent INTEGER DEFAULT 0")
+    await conn.execute("ALTER TABLE win_notify_state ADD COLUMN IF NOT EXISTS last_scan_skipped INTEGER DEFAULT 0")
+    await conn.execute("ALTER TABLE win_notify_state ADD COLUMN IF NOT EXISTS last_scan_missing_game_id INTEGER DEFAULT 0")
+    await conn.execute("ALTER TABLE win_notify_state ADD COLUMN IF NOT EXISTS last_scan_fetch_errors INTEGER DEFAULT 0")
+    await conn.execute("ALTER TABLE win_notify_state ADD COLUMN IF NOT EXISTS last_scan_error TEXT")
+    await conn.execute(
+        """
+        INSERT INTO win_notify_state (id)
+        VALUES (1)
+        ON CONFLICT (id) DO NOTHING
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ffa_players (
+            discord_id BIGINT PRIMARY KEY,
+            pseudo TEXT NOT NULL,
+            player_id TEXT NOT NULL
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ffa_stats (
+            player_id TEXT PRIMARY KEY,
+            pseudo TEXT NOT NULL,
+            wins_ffa INTEGER DEFAULT 0,
+            losses_ffa INTEGER DEFAULT 0,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS player_stats_1v1 (
+            username TEXT PRIMARY KEY,
+            wins INTEGER DEFAULT 0,
+            losses INTEGER DEFAULT 0,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS processed_games_1v1 (
+            game_id TEXT PRIMARY KEY
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS backfill_state_1v1 (
+            id INTEGER PRIMARY KEY,
+            cursor TEXT NOT NULL,
+            completed BOOLEAN NOT NULL DEFAULT FALSE,
+            last_attempt TEXT,
+            last_error TEXT
+        )
+        """
+    )
+    await conn.execute(
+        """
+        INSERT INTO backfill_state_1v1 (id, cursor, completed)
+        VALUES (1, $1, FALSE)
+        ON CONFLICT (id) DO NOTHING
+        """,
+        ONEV1_BACKFILL_START,
+    )
+    await conn.execute("ALTER TABLE backfill_state ADD COLUMN IF NOT EXISTS last_sessions INTEGER DEFAULT 0")
+    await conn.execute("ALTER TABLE backfill_state ADD COLUMN IF NOT EXISTS last_games_processed INTEGER DEFAULT 0")
+    await conn.execute(
+        """
+        INSERT INTO backfill_state (id, cursor, completed)
+        VALUES (1, $1, FALSE)
+        ON CONFLICT (id) DO NOTHING
+        """,
+        BACKFILL_START,
+    )
+
+
+async def text_column_to_timestamptz(conn: asyncpg.Connection, table: str, column: str):
+    data_type = await conn.fetchval(
+        """
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = $1 AND column_name = $2
+        """,
+        table,
+        column,
+    )
+    if data_type != "text":
+        return
+    # Values were written either as naive UTC "%Y-%m-%d %H:%M:%S" strings or as ISO strings
+    # carrying their own offset (CURRENT_TIMESTAMP defaults, "...Z" scan times).
+    await conn.execute(f"ALTER TABLE {table} ALTER COLUMN {column} DROP DEFAULT")
+    await conn.execute(
+        f"""
+        ALTER TABLE {table} ALTER COLUMN {column} TYPE TIMESTAMPTZ USING (
+            CASE
+                WHEN {column} IS NULL OR btrim({column}) = '' THEN NULL
+                WHEN {column} ~ '(Z|[+-][0-9]{{2}}(:?[0-9]{{2}})?)$' THEN {column}::timestamptz
+                ELSE {column}::timestamp AT TIME ZONE 'UTC'
+            END
+        )
+        """
+    )
+
+
+async def migration_0002_timestamps_and_indexes(conn: asyncpg.Connection):
+    for table in ("player_stats", "ffa_stats", "player_stats_1v1"):
+        await text_column_to_timestamptz(conn, table, "updated_at")
+        await conn.execute(f"ALTER TABLE {table} ALTER COLUMN updated_at SET DEFAULT NOW()")
+    await text_column_to_timestamptz(conn, "win_notify_state", "last_empty_at")
+    await text_column_to_timestamptz(conn, "win_notify_state", "last_scan_at")
+    # get_latest_ffa_updated_at: MAX(updated_at) becomes a single index probe.
+    await conn.execute("CREATE INDEX IF NOT EXISTS ffa_stats_updated_at_idx ON ffa_stats (updated_at)")
+    # list_warnings / list_mod_actions / list_mod_notes: WHERE guild_id, user_id ORDER BY id DESC.
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS mod_warnings_guild_user_idx ON mod_warnings (guild_id, user_id, id DESC)"
+    )
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS mod_actions_guild_user_idx ON mod_actions (guild_id, user_id, id DESC)"
+    )
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS mod_notes_guild_user_idx ON mod_notes (guild_id, user_id, id DESC)"
+    )
+    # get_allowed_roles_for_command: the primary key (guild_id, role_id, command) can only filter
+    # on command after walking every role of the guild; the partial index allows an index-only scan.
+    await conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS mod_permissions_guild_command_idx
+        ON mod_permissions (guild_id, command, role_id)
+        WHERE allowed
+        """
+    )
+
+
+async def migration_0003_seen_games_retention(conn: asyncpg.Connection):
+    # Rows that predate this column get NOW(), so they only become prunable one window later.
+    for table in ("processed_games", "processed_games_1v1"):
+        await conn.execute(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS processed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()"
+        )
+        await conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_processed_at_idx ON {table} (processed_at)")
+    for table in ("win_notifications", "ffa_win_notifications"):
+        await text_column_to_timestamptz(conn, table, "notified_at")
+        await conn.execute(f"UPDATE {table} SET notified_at = NOW() WHERE notified_at IS NULL")
+        await conn.execute(f"ALTER TABLE {table} ALTER COLUMN notified_at SET DEFAULT NOW()")
+        await conn.execute(f"ALTER TABLE {table} ALTER COLUMN notified_at SET NOT NULL")
+        await conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_notified_at_idx ON {table} (notified_at)")
+
+
+async def migration_0004_managed_messages(conn: asyncpg.Connection):
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS managed_messages (
+            guild_id BIGINT NOT NULL,
+            kind TEXT NOT NULL,
+            channel_id BIGINT NOT NULL,
+            message_id BIGINT NOT NULL,
+            content_hash TEXT,
+            PRIMARY KEY (guild_id, kind)
+        )
+        """
+    )
+    # The per-kind tables are copied and left in place. Nothing reads them any more, but dropping them is left
+    # to a later migration. Rolling back to a release older than 0002 is not possible either way.
+    legacy_tables = {
+        "leaderboard_message": "leaderboard",
+        "leaderboard_message_ffa": "leaderboard_ffa",
+        "leaderboard_message_1v1": "leaderboard_1v1",
+        "leaderboard_message_1v1_gal": "leaderboard_1v1_gal",
+        "ofm_board_message": "ofm_board",
+        "ofm_admin_panel_message": "ofm_admin_panel",
+        "mod_admin_panel_message": "mod_admin_panel",
+    }
+    for table, kind in legacy_tables.items():
+        await conn.execute(
+            f"""
+            INSERT INTO managed_messages (guild_id, kind, channel_id, message_id)
+            SELECT guild_id, $1, channel_id, message_id FROM {table}
+            ON CONFLICT (guild_id, kind) DO NOTHING
+            """,
+            kind,
+        )
+
+
+async def migration_0005_scheduled_actions(conn: asyncpg.Connection):
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS scheduled_actions (
+            id BIGSERIAL PRIMARY KEY,
+            guild_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            action TEXT NOT NULL,
+            due_at TIMESTAMPTZ NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            UNIQUE (guild_id, user_id, action)
+        )
+        """
+    )
+    await conn.execute("CREATE INDEX IF NOT EXISTS scheduled_actions_due_at_idx ON scheduled_actions (due_at)")
+
+
+async def migration_0006_ofm_channels(conn: asyncpg.Connection):
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ofm_channels (
+            guild_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            channel_id BIGINT NOT NULL UNIQUE,
+            PRIMARY KEY (guild_id, user_id)
+        )
+        """
+    )
+
+
+MIGRATIONS = [
+    (1, "baseline", migration_0001_baseline),
+    (2, "timestamps_and_indexes", migration_0002_timestamps_and_indexes),
+    (3, "seen_games_retention", migration_0003_seen_games_retention),
+    (4, "managed_messages", migration_0004_managed_messages),
+    (5, "scheduled_actions", migration_0005_scheduled_actions),
+    (6, "ofm_channels", migration_0006_ofm_channels),
+]
+
+
+async def get_schema_version(conn: asyncpg.Connection) -> int:
+    version = await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return int(version or 0)
+
+
+async def run_migrations(dsn: str):
+    applied = []
+    # A dedicated connection without the pools' command_timeout: an ALTER ... USING on a large table must not
+    # be cancelled halfway through.
+    conn = await asyncpg.connect(dsn, command_timeout=None)
+    try:
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+            """
+        )
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_KEY)
+        try:
+            current = await get_schema_version(conn)
+            for version, name, migrate in MIGRATIONS:
+                if version <= current:
+                    continue
+                async with conn.transaction():
+                    await migrate(conn)
+                    await conn.execute(
+                        "INSERT INTO schema_version (version, name) VALUES ($1, $2)",
+                        version,
+                        name,
+                    )
+                applied.append(f"{version:04d}_{name}")
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_KEY)
+    finally:
+        await conn.close()
+    return applied
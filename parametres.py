@@ -16,6 +16,14 @@ DB_URL = (
     or os.getenv("POSTGRESQL_URL")
 )
 
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "5"))
+DB_INGEST_POOL_MIN_SIZE = int(os.getenv("DB_INGEST_POOL_MIN_SIZE", "1"))
+DB_INGEST_POOL_MAX_SIZE = int(os.getenv("DB_INGEST_POOL_MAX_SIZE", "3"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+DB_COMMAND_TIMEOUT_SECONDS = float(os.getenv("DB_COMMAND_TIMEOUT_SECONDS", "30"))
+DB_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("DB_ACQUIRE_TIMEOUT_SECONDS", "10"))
+
 API_BASE = "https://api.openfront.io/public"
 USER_AGENT = "Mozilla/5.0 (GauloisBot/1.1)"
 OPENFRONT_API_KEY = os.getenv("OPENFRONT_API_KEY")
@@ -39,6 +47,7 @@ ONEV1_BACKFILL_START = os.getenv("LEADERBOARD_1V1_BACKFILL_START", "2026-01-01T0
 ONEV1_BACKFILL_INTERVAL_MINUTES = int(os.getenv("LEADERBOARD_1V1_BACKFILL_INTERVAL_MINUTES", "10"))
 ONEV1_MAX_GAMES = int(os.getenv("LEADERBOARD_1V1_MAX_GAMES", "200"))
 ONEV1_REFRESH_MINUTES = int(os.getenv("LEADERBOARD_1V1_REFRESH_MINUTES", "60"))
+ONEV1_LISTING_CACHE_SIZE = int(os.getenv("LEADERBOARD_1V1_LISTING_CACHE_SIZE", "50000"))
 SCORE_RATIO_WEIGHT = float(os.getenv("LEADERBOARD_SCORE_RATIO_WEIGHT", "100"))
 SCORE_GAMES_WEIGHT = float(os.getenv("LEADERBOARD_SCORE_GAMES_WEIGHT", "0.1"))
 
@@ -46,6 +55,54 @@ WIN_NOTIFY_CHANNEL_ID = os.getenv("WIN_NOTIFY_CHANNEL_ID")
 WIN_NOTIFY_POLL_SECONDS = int(os.getenv("WIN_NOTIFY_POLL_SECONDS", "300"))
 WIN_NOTIFY_RANGE_HOURS = int(os.getenv("WIN_NOTIFY_RANGE_HOURS", "24"))
 WIN_NOTIFY_EMPTY_COOLDOWN_MINUTES = int(os.getenv("WIN_NOTIFY_EMPTY_COOLDOWN_MINUTES", "60"))
+SEEN_GAMES_RETENTION_MARGIN_HOURS = int(os.getenv("SEEN_GAMES_RETENTION_MARGIN_HOURS", "48"))
+SEEN_GAMES_FILTER_CAPACITY = int(os.getenv("SEEN_GAMES_FILTER_CAPACITY", "200000"))
+SEEN_GAMES_FILTER_ERROR_RATE = float(os.getenv("SEEN_GAMES_FILTER_ERROR_RATE", "0.01"))
+
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "1"))
+CHART_RENDER_TIMEOUT_SECONDS = int(os.getenv("CHART_RENDER_TIMEOUT_SECONDS", "20"))
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "32"))
+CHART_DPI = int(os.getenv("CHART_DPI", "100"))
+CHART_HIRES_DPI = int(os.getenv("CHART_HIRES_DPI", "160"))
+COMPARE_STATS_TTL_SECONDS = int(os.getenv("COMPARE_STATS_TTL_SECONDS", "300"))
+
+LOOP_RESTART_BASE_SECONDS = int(os.getenv("LOOP_RESTART_BASE_SECONDS", "5"))
+LOOP_RESTART_MAX_SECONDS = int(os.getenv("LOOP_RESTART_MAX_SECONDS", "300"))
+
+LOOP_LAG_SAMPLE_SECONDS = float(os.getenv("LOOP_LAG_SAMPLE_SECONDS", "0.5"))
+LOOP_LAG_WINDOW_SECONDS = int(os.getenv("LOOP_LAG_WINDOW_SECONDS", "600"))
+LOOP_STALL_THRESHOLD_MS = int(os.getenv("LOOP_STALL_THRESHOLD_MS", "250"))
+LOOP_STALL_HISTORY = int(os.getenv("LOOP_STALL_HISTORY", "20"))
+LOOP_STALL_STACK_DEPTH = int(os.getenv("LOOP_STALL_STACK_DEPTH", "12"))
+
+PROFILER_SAMPLE_INTERVAL_MS = int(os.getenv("PROFILER_SAMPLE_INTERVAL_MS", "10"))
+PROFILER_MAX_SECONDS = int(os.getenv("PROFILER_MAX_SECONDS", "120"))
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# /metrics has no authentication: only listen on other interfaces by setting this explicitly.
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+OPENFRONT_TRACE_BUFFER_SIZE = int(os.getenv("OPENFRONT_TRACE_BUFFER_SIZE", "500"))
+OPENFRONT_MAX_RETRIES = int(os.getenv("OPENFRONT_MAX_RETRIES", "2"))
+OPENFRONT_RETRY_BASE_SECONDS = float(os.getenv("OPENFRONT_RETRY_BASE_SECONDS", "1.0"))
+OPENFRONT_RETRY_MAX_SECONDS = float(os.getenv("OPENFRONT_RETRY_MAX_SECONDS", "10.0"))
+
+AUTO_DEFER_AFTER_SECONDS = float(os.getenv("AUTO_DEFER_AFTER_SECONDS", "2.0"))
+COMMAND_METRICS_WINDOW_SECONDS = int(os.getenv("COMMAND_METRICS_WINDOW_SECONDS", "3600"))
+COMMAND_METRICS_MAX_SAMPLES = int(os.getenv("COMMAND_METRICS_MAX_SAMPLES", "1000"))
+COMMAND_METRICS_PAGE_SIZE = int(os.getenv("COMMAND_METRICS_PAGE_SIZE", "10"))
+
+OFM_BOARD_DEBOUNCE_SECONDS = int(os.getenv("OFM_BOARD_DEBOUNCE_SECONDS", "5"))
+OFM_ROLE_CHANGE_INTERVAL_SECONDS = float(os.getenv("OFM_ROLE_CHANGE_INTERVAL_SECONDS", "0.5"))
+OFM_BULK_IMPORT_MAX = int(os.getenv("OFM_BULK_IMPORT_MAX", "100"))
+
+SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", "100"))
+SCHEDULER_MAX_SLEEP_SECONDS = int(os.getenv("SCHEDULER_MAX_SLEEP_SECONDS", "3600"))
+SCHEDULED_ACTION_RETRY_SECONDS = int(os.getenv("SCHEDULED_ACTION_RETRY_SECONDS", "300"))
+SCHEDULED_ACTION_MAX_ATTEMPTS = int(os.getenv("SCHEDULED_ACTION_MAX_ATTEMPTS", "5"))
 
 OFM_ROLE_ID = int(os.getenv("OFM_ROLE_ID", "1469695783790968963"))
 OFM_MANAGER_ROLE_ID = int(os.getenv("OFM_MANAGER_ROLE_ID", "1469701081759219723"))
@@ -96,6 +153,8 @@ if ONEV1_MAX_GAMES > 1000:
     ONEV1_MAX_GAMES = 1000
 if ONEV1_REFRESH_MINUTES < 10:
     ONEV1_REFRESH_MINUTES = 10
+if ONEV1_LISTING_CACHE_SIZE < 1000:
+    ONEV1_LISTING_CACHE_SIZE = 1000
 if WIN_NOTIFY_POLL_SECONDS < 60:
     WIN_NOTIFY_POLL_SECONDS = 60
 if WIN_NOTIFY_RANGE_HOURS < 1:
@@ -104,3 +163,103 @@ if WIN_NOTIFY_RANGE_HOURS > 48:
     WIN_NOTIFY_RANGE_HOURS = 48
 if WIN_NOTIFY_EMPTY_COOLDOWN_MINUTES < 1:
     WIN_NOTIFY_EMPTY_COOLDOWN_MINUTES = 1
+if SEEN_GAMES_RETENTION_MARGIN_HOURS < 1:
+    SEEN_GAMES_RETENTION_MARGIN_HOURS = 1
+if SEEN_GAMES_FILTER_CAPACITY < 1000:
+    SEEN_GAMES_FILTER_CAPACITY = 1000
+if SEEN_GAMES_FILTER_ERROR_RATE < 0.0001:
+    SEEN_GAMES_FILTER_ERROR_RATE = 0.0001
+if SEEN_GAMES_FILTER_ERROR_RATE > 0.2:
+    SEEN_GAMES_FILTER_ERROR_RATE = 0.2
+if CHART_WORKERS < 1:
+    CHART_WORKERS = 1
+if CHART_WORKERS > 4:
+    CHART_WORKERS = 4
+if CHART_RENDER_TIMEOUT_SECONDS < 5:
+    CHART_RENDER_TIMEOUT_SECONDS = 5
+if CHART_CACHE_SIZE < 1:
+    CHART_CACHE_SIZE = 1
+if COMPARE_STATS_TTL_SECONDS < 0:
+    COMPARE_STATS_TTL_SECONDS = 0
+if CHART_DPI < 50:
+    CHART_DPI = 50
+if CHART_HIRES_DPI < CHART_DPI:
+    CHART_HIRES_DPI = CHART_DPI
+if LOOP_RESTART_BASE_SECONDS < 1:
+    LOOP_RESTART_BASE_SECONDS = 1
+if LOOP_RESTART_MAX_SECONDS < LOOP_RESTART_BASE_SECONDS:
+    LOOP_RESTART_MAX_SECONDS = LOOP_RESTART_BASE_SECONDS
+if OFM_BOARD_DEBOUNCE_SECONDS < 0:
+    OFM_BOARD_DEBOUNCE_SECONDS = 0
+if OFM_ROLE_CHANGE_INTERVAL_SECONDS < 0:
+    OFM_ROLE_CHANGE_INTERVAL_SECONDS = 0
+if OFM_BULK_IMPORT_MAX < 1:
+    OFM_BULK_IMPORT_MAX = 1
+if LOOP_LAG_SAMPLE_SECONDS < 0.05:
+    LOOP_LAG_SAMPLE_SECONDS = 0.05
+if LOOP_LAG_WINDOW_SECONDS < 60:
+    LOOP_LAG_WINDOW_SECONDS = 60
+if LOOP_STALL_THRESHOLD_MS < 50:
+    LOOP_STALL_THRESHOLD_MS = 50
+if LOOP_STALL_HISTORY < 1:
+    LOOP_STALL_HISTORY = 1
+if LOOP_STALL_STACK_DEPTH < 1:
+    LOOP_STALL_STACK_DEPTH = 1
+if PROFILER_SAMPLE_INTERVAL_MS < 1:
+    PROFILER_SAMPLE_INTERVAL_MS = 1
+if PROFILER_MAX_SECONDS < 1:
+    PROFILER_MAX_SECONDS = 1
+if PROFILER_MAX_SECONDS > 600:
+    PROFILER_MAX_SECONDS = 600
+if LOG_FORMAT not in ("json", "text"):
+    LOG_FORMAT = "json"
+if LOG_LEVEL not in ("DEBUG", "INFO", "WARNING", "ERROR"):
+    LOG_LEVEL = "INFO"
+if METRICS_PORT < 0 or METRICS_PORT > 65535:
+    METRICS_PORT = 0
+if OPENFRONT_TRACE_BUFFER_SIZE < 10:
+    OPENFRONT_TRACE_BUFFER_SIZE = 10
+if OPENFRONT_MAX_RETRIES < 0:
+    OPENFRONT_MAX_RETRIES = 0
+if OPENFRONT_RETRY_BASE_SECONDS < 0:
+    OPENFRONT_RETRY_BASE_SECONDS = 0
+if OPENFRONT_RETRY_MAX_SECONDS < OPENFRONT_RETRY_BASE_SECONDS:
+    OPENFRONT_RETRY_MAX_SECONDS = OPENFRONT_RETRY_BASE_SECONDS
+if AUTO_DEFER_AFTER_SECONDS < 0:
+    AUTO_DEFER_AFTER_SECONDS = 0
+if AUTO_DEFER_AFTER_SECONDS > 2.8:
+    AUTO_DEFER_AFTER_SECONDS = 2.8
+if COMMAND_METRICS_WINDOW_SECONDS < 60:
+    COMMAND_METRICS_WINDOW_SECONDS = 60
+if COMMAND_METRICS_MAX_SAMPLES < 10:
+    COMMAND_METRICS_MAX_SAMPLES = 10
+if COMMAND_METRICS_PAGE_SIZE < 1:
+    COMMAND_METRICS_PAGE_SIZE = 1
+if COMMAND_METRICS_PAGE_SIZE > 20:
+    COMMAND_METRICS_PAGE_SIZE = 20
+if SCHEDULER_BATCH_SIZE < 1:
+    SCHEDULER_BATCH_SIZE = 1
+if SCHEDULER_MAX_SLEEP_SECONDS < 1:
+    SCHEDULER_MAX_SLEEP_SECONDS = 1
+if SCHEDULED_ACTION_RETRY_SECONDS < 1:
+    SCHEDULED_ACTION_RETRY_SECONDS = 1
+if SCHEDULED_ACTION_MAX_ATTEMPTS < 1:
+    SCHEDULED_ACTION_MAX_ATTEMPTS = 1
+if DB_POOL_MIN_SIZE < 0:
+    DB_POOL_MIN_SIZE = 0
+if DB_POOL_MAX_SIZE < 1:
+    DB_POOL_MAX_SIZE = 1
+if DB_POOL_MIN_SIZE > DB_POOL_MAX_SIZE:
+    DB_POOL_MIN_SIZE = DB_POOL_MAX_SIZE
+if DB_INGEST_POOL_MIN_SIZE < 0:
+    DB_INGEST_POOL_MIN_SIZE = 0
+if DB_INGEST_POOL_MAX_SIZE < 1:
+    DB_INGEST_POOL_MAX_SIZE = 1
+if DB_INGEST_POOL_MIN_SIZE > DB_INGEST_POOL_MAX_SIZE:
+    DB_INGEST_POOL_MIN_SIZE = DB_INGEST_POOL_MAX_SIZE
+if DB_STATEMENT_CACHE_SIZE < 0:
+    DB_STATEMENT_CACHE_SIZE = 0
+if DB_COMMAND_TIMEOUT_SECONDS < 1:
+    DB_COMMAND_TIMEOUT_SECONDS = 1
+if DB_ACQUIRE_TIMEOUT_SECONDS < 1:
+    DB_ACQUIRE_TIMEOUT_SECONDS = 1
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+
+from parametres import (
+    SCHEDULED_ACTION_MAX_ATTEMPTS,
+    SCHEDULED_ACTION_RETRY_SECONDS,
+    SCHEDULER_BATCH_SIZE,
+    SCHEDULER_MAX_SLEEP_SECONDS,
+)
+from depot import (
+    cancel_scheduled_action,
+    complete_scheduled_action,
+    get_due_scheduled_actions,
+    get_next_scheduled_action_at,
+    retry_scheduled_action,
+    schedule_action,
+)
+from journalisation import log_event, log_exception
+
+
+ACTION_UNBAN = "unban"
+
+
+class ActionScheduler:
+    def __init__(self):
+        self.handlers = {}
+        self.next_due_at = None
+        self.executed = 0
+        self.retried = 0
+        self.dropped = 0
+        self._wake = asyncio.Event()
+
+    def register(self, action: str, handler):
+        self.handlers[action] = handler
+
+    async def schedule(self, guild_id: int, user_id: int, action: str, delay_seconds: int) -> datetime:
+        due_at = datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)
+        await schedule_action(guild_id, user_id, action, due_at)
+        if self.next_due_at is None or due_at < self.next_due_at:
+            self._wake.set()
+        return due_at
+
+    async def cancel(self, guild_id: int, user_id: int, action: str):
+        # If this was the next due row the sleeper simply wakes up to an empty batch.
+        await cancel_scheduled_action(guild_id, user_id, action)
+
+    async def run(self):
+        # One task for every pending action: sleep until the earliest due_at or until a sooner one is scheduled.
+        # Overdue rows (bot offline when they fell due) are picked up by the first pass.
+        while True:
+            self._wake.clear()
+            await self.run_due()
+            self.next_due_at = await get_next_scheduled_action_at()
+            timeout = SCHEDULER_MAX_SLEEP_SECONDS
+            if self.next_due_at is not None:
+                delay = (self.next_due_at - datetime.now(timezone.utc)).total_seconds()
+                timeout = min(max(delay, 0), SCHEDULER_MAX_SLEEP_SECONDS)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_due(self):
+        while True:
+            rows = await get_due_scheduled_actions(datetime.now(timezone.utc), SCHEDULER_BATCH_SIZE)
+            for row in rows:
+                await self.execute(row)
+            if len(rows) < SCHEDULER_BATCH_SIZE:
+                return
+
+    async def execute(self, row):
+        handler = self.handlers.get(row["action"])
+        if handler is None:
+            log_event("scheduled_action_dropped", logging.WARNING, action_id=row["id"], action=row["action"], reason="unknown")
+            self.dropped += 1
+            await complete_scheduled_action(row["id"], row["due_at"])
+            return
+        try:
+            await handler(row["guild_id"], row["user_id"])
+        except Exception as exc:
+            attempts = row["attempts"] + 1
+            error = f"{type(exc).__name__}: {exc}"
+            log_exception("scheduled_action_failed", exc, action_id=row["id"], action=row["action"], attempts=attempts)
+            if attempts >= SCHEDULED_ACTION_MAX_ATTEMPTS:
+                log_event(
+                    "scheduled_action_dropped",
+                    logging.WARNING,
+                    action_id=row["id"],
+                    action=row["action"],
+                    guild_id=row["guild_id"],
+                    user_id=row["user_id"],
+                    reason="max_attempts",
+                )
+                self.dropped += 1
+                await complete_scheduled_action(row["id"], row["due_at"])
+                return
+            self.retried += 1
+            due_at = datetime.now(timezone.utc) + timedelta(seconds=SCHEDULED_ACTION_RETRY_SECONDS * attempts)
+            await retry_scheduled_action(row["id"], row["due_at"], due_at, error)
+            return
+        self.executed += 1
+        await complete_scheduled_action(row["id"], row["due_at"])
+
+
+ACTION_SCHEDULER = ActionScheduler()
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from parametres import PROFILER_SAMPLE_INTERVAL_MS
+
+
+ANONYMOUS_TASK = re.compile(r"-\d+$")
+
+
+def frame_label(code) -> str:
+    # First line of the function rather than the current line, so samples aggregate per function.
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def task_label(loop) -> str:
+    task = asyncio.current_task(loop)
+    if task is None:
+        return "(hors tâche)"
+    return ANONYMOUS_TASK.sub("", task.get_name())
+
+
+class SamplingProfiler:
+    def __init__(self, interval_ms: int):
+        self.interval_seconds = interval_ms / 1000
+        self.lock = threading.Lock()
+
+    async def profile(self, seconds: int, all_threads: bool = False):
+        if not self.lock.acquire(blocking=False):
+            return None
+        try:
+            # Sampling runs in its own thread so the loop being measured never schedules the sampler.
+            loop = asyncio.get_running_loop()
+            return await asyncio.to_thread(self.sample, seconds, loop, threading.get_ident(), all_threads)
+        finally:
+            self.lock.release()
+
+    def sample(self, seconds: int, loop, loop_thread_id: int, all_threads: bool):
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = Counter()
+        tasks = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frames = sys._current_frames()
+            for thread_id, frame in frames.items():
+                if thread_id == own_id or (not all_threads and thread_id != loop_thread_id):
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                root = [names.get(thread_id, str(thread_id))]
+                if thread_id == loop_thread_id:
+                    task = task_label(loop)
+                    tasks[task] += 1
+                    root.append(task)
+                stacks[";".join(root + labels[::-1])] += 1
+            samples += 1
+            del frames
+            time.sleep(self.interval_seconds)
+        return {"seconds": seconds, "samples": samples, "stacks": stacks, "tasks": tasks}
+
+
+def collapsed_stacks(report: dict) -> str:
+    # Brendan Gregg's folded format: flamegraph.pl, speedscope and inferno read it as is.
+    return "".join(f"{stack} {count}\n" for stack, count in report["stacks"].most_common())
+
+
+def top_functions(report: dict, limit: int):
+    leaves = Counter()
+    for stack, count in report["stacks"].items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    return leaves.most_common(limit)
+
+
+def top_tasks(report: dict, limit: int):
+    return report["tasks"].most_common(limit)
+
+
+PROFILER = SamplingProfiler(PROFILER_SAMPLE_INTERVAL_MS)
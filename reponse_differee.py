@@ -0,0 +1,97 @@
+import asyncio
+import functools
+
+import discord
+
+from parametres import AUTO_DEFER_AFTER_SECONDS
+
+
+DEFERRED_REPLY_KEY = "deferred_reply"
+
+
+class DeferredReply:
+    # Owns the reply of a @deferrable handler. Once the deadline timer has deferred (or a first reply went
+    # out), replies go to the followup webhook or the original response instead of interaction.response.
+    def __init__(self, interaction: discord.Interaction, ephemeral: bool):
+        self._interaction = interaction
+        self._ephemeral = ephemeral
+        self._thinking = interaction.type == discord.InteractionType.application_command
+        self._lock = asyncio.Lock()
+        self.auto_deferred = False
+        self._placeholder_pending = False
+
+    async def auto_defer(self):
+        async with self._lock:
+            if self._interaction.response.is_done():
+                return
+            await self._interaction.response.defer(ephemeral=self._ephemeral, thinking=self._thinking)
+            self.auto_deferred = True
+            self._placeholder_pending = self._thinking
+
+    async def send(self, content=None, **kwargs):
+        async with self._lock:
+            if not self._interaction.response.is_done():
+                await self._interaction.response.send_message(content, **kwargs)
+                return None
+        kwargs.pop("delete_after", None)
+        if self._placeholder_pending:
+            self._placeholder_pending = False
+            # The "thinking" placeholder keeps the visibility chosen at defer time; replace it when the
+            # reply wants the other one instead of leaking an ephemeral error publicly.
+            if kwargs.get("ephemeral", False) != self._ephemeral:
+                await self._interaction.delete_original_response()
+        return await self._interaction.followup.send(content, **kwargs)
+
+    async def edit(self, **kwargs):
+        async with self._lock:
+            if not self._interaction.response.is_done():
+                await self._interaction.response.edit_message(**kwargs)
+                return None
+        kwargs.pop("delete_after", None)
+        return await self._interaction.edit_original_response(**kwargs)
+
+
+def interaction_reply(interaction: discord.Interaction) -> DeferredReply:
+    return interaction.extras.get(DEFERRED_REPLY_KEY) or DeferredReply(interaction, ephemeral=False)
+
+
+async def send_reply(interaction: discord.Interaction, content=None, **kwargs):
+    # What a @deferrable handler calls instead of interaction.response.send_message. Returns the followup
+    # message when the reply went out as a followup, None when it was the initial response.
+    return await interaction_reply(interaction).send(content, **kwargs)
+
+
+async def edit_reply(interaction: discord.Interaction, **kwargs):
+    return await interaction_reply(interaction).edit(**kwargs)
+
+
+async def defer_before_deadline(reply: DeferredReply, interaction: discord.Interaction):
+    # Interactions must be acknowledged within 3 s of creation, not of reaching this handler.
+    elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    await asyncio.sleep(min(max(AUTO_DEFER_AFTER_SECONDS - elapsed, 0), AUTO_DEFER_AFTER_SECONDS))
+    try:
+        await reply.auto_defer()
+    except discord.HTTPException:
+        return
+
+
+def deferrable(ephemeral: bool = False):
+    # The handler must answer through send_reply/edit_reply; interaction.response itself is left untouched,
+    # so a handler that may open a modal should not be deferrable. Latency and auto-defers are recorded by
+    # COMMAND_METRICS, which reads auto_deferred from the reply.
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            interaction = next(arg for arg in args if isinstance(arg, discord.Interaction))
+            reply = interaction.extras.get(DEFERRED_REPLY_KEY)
+            if reply is None:
+                reply = interaction.extras[DEFERRED_REPLY_KEY] = DeferredReply(interaction, ephemeral)
+            timer = asyncio.create_task(defer_before_deadline(reply, interaction))
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                timer.cancel()
+
+        return wrapper
+
+    return decorator
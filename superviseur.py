@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+from parametres import LOOP_RESTART_BASE_SECONDS, LOOP_RESTART_MAX_SECONDS
+from journalisation import log_exception
+
+
+class SupervisedLoop:
+    def __init__(self, name: str, factory, before_start=None):
+        self.name = name
+        self.factory = factory
+        self.before_start = before_start
+        self.task = None
+        self.status = "en attente"
+        self.started_at = None
+        self.restarts = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_error_at = None
+        self.next_restart_at = None
+
+    def is_running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def backoff_seconds(self) -> float:
+        return min(LOOP_RESTART_BASE_SECONDS * (2 ** max(self.failures - 1, 0)), LOOP_RESTART_MAX_SECONDS)
+
+    async def run(self):
+        try:
+            if self.before_start:
+                await self.before_start()
+            while True:
+                self.status = "actif"
+                self.started_at = datetime.now(timezone.utc)
+                self.next_restart_at = None
+                try:
+                    await self.factory()
+                except Exception as exc:
+                    # A loop that survived a full backoff window is considered healthy again.
+                    uptime = (datetime.now(timezone.utc) - self.started_at).total_seconds()
+                    if uptime > LOOP_RESTART_MAX_SECONDS:
+                        self.failures = 0
+                    self.failures += 1
+                    self.restarts += 1
+                    self.last_error = f"{type(exc).__name__}: {exc}"
+                    self.last_error_at = datetime.now(timezone.utc)
+                    delay = self.backoff_seconds()
+                    self.status = "redémarrage"
+                    self.next_restart_at = self.last_error_at + timedelta(seconds=delay)
+                    log_exception("loop_crashed", exc, loop=self.name, restart_in_seconds=delay, restarts=self.restarts)
+                    await asyncio.sleep(delay)
+                    continue
+                self.status = "terminé"
+                return
+        except asyncio.CancelledError:
+            self.status = "arrêté"
+            self.next_restart_at = None
+            raise
+
+
+class LoopSupervisor:
+    def __init__(self):
+        self.loops = {}
+
+    def start(self, name: str, factory, before_start=None) -> SupervisedLoop:
+        loop = self.loops.get(name)
+        if loop and loop.is_running():
+            return loop
+        loop = SupervisedLoop(name, factory, before_start)
+        loop.task = asyncio.create_task(loop.run(), name=f"loop:{name}")
+        self.loops[name] = loop
+        return loop
+
+    async def stop(self):
+        tasks = [loop.task for loop in self.loops.values() if loop.is_running()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def snapshot(self):
+        return [
+            {
+                "name": loop.name,
+                "status": loop.status,
+                "restarts": loop.restarts,
+                "last_error": loop.last_error,
+                "last_error_at": loop.last_error_at,
+                "next_restart_at": loop.next_restart_at,
+            }
+            for loop in self.loops.values()
+        ]
+
+
+LOOP_SUPERVISOR = LoopSupervisor()
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone, timedelta
+
+from parametres import (
+    LOOP_LAG_SAMPLE_SECONDS,
+    LOOP_LAG_WINDOW_SECONDS,
+    LOOP_STALL_HISTORY,
+    LOOP_STALL_STACK_DEPTH,
+    LOOP_STALL_THRESHOLD_MS,
+)
+from metriques import percentile
+from journalisation import log_event
+
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def display_path(filename: str) -> str:
+    if filename.startswith(PROJECT_DIR):
+        return os.path.relpath(filename, PROJECT_DIR)
+    return os.path.basename(filename)
+
+
+def format_frames(frame, depth: int):
+    return [
+        {
+            "file": display_path(entry.filename),
+            "line": entry.lineno,
+            "function": entry.name,
+            "project": entry.filename.startswith(PROJECT_DIR),
+        }
+        for entry in traceback.extract_stack(frame)[-depth:]
+    ]
+
+
+def stall_culprit(stall: dict) -> str:
+    # The innermost frame of our own code is the handler to blame, not the library call it was stuck in.
+    frames = stall["stack"]
+    entry = next((frame for frame in reversed(frames) if frame["project"]), frames[-1] if frames else None)
+    if entry is None:
+        return "?"
+    return f"{entry['function']} ({entry['file']}:{entry['line']})"
+
+
+class LoopMonitor:
+    def __init__(self, interval_seconds: float, threshold_ms: int, window_seconds: int, history: int, depth: int):
+        self.interval_seconds = interval_seconds
+        self.threshold_seconds = threshold_ms / 1000
+        self.depth = depth
+        self.samples = deque(maxlen=max(1, int(window_seconds / interval_seconds)))
+        self.stalls = deque(maxlen=history)
+        self.total_stalls = 0
+        self.last_beat = None
+        self.loop_thread_id = None
+        self.current_stall = None
+        self.thread = None
+
+    async def run(self):
+        # The sampler only measures how late its own wake-ups are; the watchdog thread below is what sees a
+        # callback that never yields, because it does not need the loop to run.
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.watch, name="loop-watchdog", daemon=True)
+            self.thread.start()
+        try:
+            while True:
+                expected = time.monotonic() + self.interval_seconds
+                await asyncio.sleep(self.interval_seconds)
+                now = time.monotonic()
+                self.samples.append(max(now - expected, 0.0) * 1000)
+                self.last_beat = now
+        finally:
+            # A stopped sampler must not read as a loop that stopped beating.
+            self.last_beat = None
+
+    def watch(self):
+        while True:
+            time.sleep(self.threshold_seconds / 2)
+            beat = self.last_beat
+            stall = self.current_stall
+            if beat is None:
+                self.current_stall = None
+                continue
+            if stall is not None and stall["beat"] != beat:
+                stall["blocked_ms"] = max(stall["blocked_ms"], (beat - stall["beat"] - self.interval_seconds) * 1000)
+                stall["ongoing"] = False
+                self.current_stall = None
+                log_event(
+                    "event_loop_blocked",
+                    logging.WARNING,
+                    blocked_ms=round(stall["blocked_ms"]),
+                    culprit=stall_culprit(stall),
+                    stack=[f"{frame['file']}:{frame['line']} {frame['function']}" for frame in stall["stack"]],
+                )
+                continue
+            blocked = time.monotonic() - beat - self.interval_seconds
+            if blocked < self.threshold_seconds:
+                continue
+            if stall is None:
+                # A C extension holding the GIL delays this snapshot until it lets go; the stack is then taken
+                # from whatever Python code is still running.
+                frame = sys._current_frames().get(self.loop_thread_id)
+                stall = {
+                    "at": datetime.now(timezone.utc) - timedelta(seconds=blocked),
+                    "beat": beat,
+                    "blocked_ms": blocked * 1000,
+                    "stack": format_frames(frame, self.depth) if frame else [],
+                    "ongoing": True,
+                }
+                self.stalls.append(stall)
+                self.total_stalls += 1
+                self.current_stall = stall
+            else:
+                stall["blocked_ms"] = blocked * 1000
+
+    def lag_summary(self):
+        lags = sorted(self.samples)
+        if not lags:
+            return None
+        return {
+            "current_ms": self.samples[-1],
+            "p50_ms": percentile(lags, 0.50),
+            "p95_ms": percentile(lags, 0.95),
+            "max_ms": lags[-1],
+            "samples": len(lags),
+        }
+
+    def recent_stalls(self, limit: int):
+        return list(self.stalls)[-limit:][::-1]
+
+
+LOOP_MONITOR = LoopMonitor(
+    LOOP_LAG_SAMPLE_SECONDS,
+    LOOP_STALL_THRESHOLD_MS,
+    LOOP_LAG_WINDOW_SECONDS,
+    LOOP_STALL_HISTORY,
+    LOOP_STALL_STACK_DEPTH,
+)
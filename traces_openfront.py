@@ -0,0 +1,146 @@
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import aiohttp
+
+from parametres import OPENFRONT_TRACE_BUFFER_SIZE
+
+
+OPENFRONT_TRACES = deque(maxlen=OPENFRONT_TRACE_BUFFER_SIZE)
+
+
+def new_trace(endpoint: str) -> dict:
+    return {
+        "endpoint": endpoint,
+        "path": None,
+        "status": None,
+        "attempts": 0,
+        "started_at": datetime.now(timezone.utc),
+        "total_ms": 0.0,
+        "queued_ms": 0.0,
+        "dns_ms": 0.0,
+        "connect_ms": 0.0,
+        "server_ms": 0.0,
+        "body_ms": 0.0,
+        "bytes": 0,
+        "reused": False,
+        "error": None,
+        "_marks": {},
+    }
+
+
+def _trace(params_ctx) -> dict:
+    trace = params_ctx.trace_request_ctx
+    return trace if isinstance(trace, dict) else None
+
+
+def _elapsed_ms(trace: dict, mark: str) -> float:
+    start = trace["_marks"].pop(mark, None)
+    return (time.monotonic() - start) * 1000 if start is not None else 0.0
+
+
+async def _on_request_start(_session, ctx, params):
+    trace = _trace(ctx)
+    if trace is not None:
+        trace["attempts"] += 1
+        trace["path"] = params.url.path
+
+
+async def _on_queued_start(_session, ctx, _params):
+    trace = _trace(ctx)
+    if trace is not None:
+        trace["_marks"]["queued"] = time.monotonic()
+
+
+async def _on_queued_end(_session, ctx, _params):
+    trace = _trace(ctx)
+    if trace is not None:
+        trace["queued_ms"] += _elapsed_ms(trace, "queued")
+
+
+async def _on_dns_start(_session, ctx, _params):
+    trace = _trace(ctx)
+    if trace is not None:
+        trace["_marks"]["dns"] = time.monotonic()
+
+
+async def _on_dns_end(_session, ctx, _params):
+    trace = _trace(ctx)
+    if trace is not None:
+        trace["dns_ms"] += _elapsed_ms(trace, "dns")
+
+
+async def _on_connect_start(_session, ctx, _params):
+    trace = _trace(ctx)
+    if trace is not None:
+        trace["_marks"]["connect"] = time.monotonic()
+
+
+async def _on_connect_end(_session, ctx, _params):
+    # Includes DNS and the TLS handshake; DNS is subtracted when the trace is finished.
+    trace = _trace(ctx)
+    if trace is not None:
+        trace["connect_ms"] += _elapsed_ms(trace, "connect")
+
+
+async def _on_reuse(_session, ctx, _params):
+    trace = _trace(ctx)
+    if trace is not None:
+        trace["reused"] = True
+
+
+async def _on_headers_sent(_session, ctx, _params):
+    trace = _trace(ctx)
+    if trace is not None:
+        trace["_marks"]["server"] = time.monotonic()
+
+
+async def _on_request_end(_session, ctx, params):
+    # Fired once the response headers are in: the gap since our headers left is server + network time.
+    trace = _trace(ctx)
+    if trace is not None:
+        trace["server_ms"] += _elapsed_ms(trace, "server")
+        trace["status"] = params.response.status
+
+
+async def _on_chunk_received(_session, ctx, params):
+    trace = _trace(ctx)
+    if trace is not None:
+        trace["bytes"] += len(params.chunk)
+
+
+async def _on_request_exception(_session, ctx, params):
+    trace = _trace(ctx)
+    if trace is not None:
+        trace["error"] = f"{type(params.exception).__name__}: {params.exception}"[:200]
+
+
+def build_trace_config() -> aiohttp.TraceConfig:
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(_on_request_start)
+    config.on_connection_queued_start.append(_on_queued_start)
+    config.on_connection_queued_end.append(_on_queued_end)
+    config.on_dns_resolvehost_start.append(_on_dns_start)
+    config.on_dns_resolvehost_end.append(_on_dns_end)
+    config.on_connection_create_start.append(_on_connect_start)
+    config.on_connection_create_end.append(_on_connect_end)
+    config.on_connection_reuseconn.append(_on_reuse)
+    config.on_request_headers_sent.append(_on_headers_sent)
+    config.on_request_end.append(_on_request_end)
+    config.on_response_chunk_received.append(_on_chunk_received)
+    config.on_request_exception.append(_on_request_exception)
+    return config
+
+
+def finish_trace(trace: dict, total_seconds: float, body_seconds: float):
+    trace.pop("_marks", None)
+    trace["total_ms"] = total_seconds * 1000
+    trace["body_ms"] = body_seconds * 1000
+    trace["connect_ms"] = max(trace["connect_ms"] - trace["dns_ms"], 0.0)
+    OPENFRONT_TRACES.append(trace)
+
+
+def slowest_traces(limit: int = 10, endpoint: str = None):
+    traces = [trace for trace in OPENFRONT_TRACES if endpoint is None or trace["endpoint"] == endpoint]
+    return sorted(traces, key=lambda trace: trace["total_ms"], reverse=True)[:limit]
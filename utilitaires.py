@@ -1,3 +1,5 @@
+import hashlib
+import json
 import os
 import re
 from typing import Optional
@@ -159,3 +161,8 @@ def get_winner_client_ids(info):
     if all(isinstance(x, str) for x in tail):
         return set(tail)
     return set()
+
+
+def embed_content_hash(embed: discord.Embed) -> str:
+    payload = json.dumps(embed.to_dict(), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()